@@ -0,0 +1,266 @@
+"""
+Benchmarks das análises sobre dados sintéticos (benchmarks/synthetic.py).
+
+Cada benchmark roda em um processo separado (tempo de parede, tempo de CPU, pico de memória,
+tempo da criação do processo até o primeiro resultado e tempo por etapa) e é comparado com a linha
+de base da mesma escala gravada em benchmarks/baseline.json (versionada para --escala 1). Qualquer
+regressão acima das tolerâncias, ou benchmark sem linha de base, faz o comando terminar com código 1.
+
+Uso:
+    python -m benchmarks.run --escala 1                  # roda e compara com a linha de base
+    python -m benchmarks.run --escala 10 --atualizar     # grava/atualiza a linha de base
+    python -m benchmarks.run --only parcelas_e_ltv micro_mercados_zip
+    python -m benchmarks.run --dados /tmp/olist-x10 --escala 10   # CSVs já gerados (só leitura)
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Tolerâncias padrão de regressão (fração sobre a linha de base)
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.20
+# Diferenças de tempo abaixo disto (s) nunca contam como regressão (ruído de medição)
+MIN_TIME_DELTA = 0.2
+
+# nome -> (módulo, função)
+BENCHMARKS = {
+    "load_dataset_frio": ("src.api.data_loader", "load_dataset"),
+    "load_dataset": ("src.api.data_loader", "load_dataset"),
+    "margem_latente_categorias": ("frete_vs_compra", "margem_latente_categorias"),
+    "parcelas_e_ltv": ("frete_vs_compra", "parcelas_e_ltv"),
+    "micro_mercados_zip": ("frete_vs_compra", "micro_mercados_zip"),
+    "fotos_vs_vendas": ("produtos_insights", "fotos_vs_vendas"),
+    "categorias_preco_vendas": ("produtos_insights", "categorias_preco_vendas"),
+    "tamanho_vs_vendas": ("produtos_insights", "tamanho_vs_vendas"),
+    "descricao_vs_vendas": ("produtos_insights", "descricao_vs_vendas"),
+    "dashboard_produtos": ("produtos_insights", "dashboard_produtos"),
+    "frete_por_km": ("src.insights.frete_por_km", "frete_por_km"),
+    "relatorio_vendedores": ("src.insights.customers_order_and_sellers", "relatorio_vendedores"),
+    "vendedores": ("src.insights.vendedores", "analise_vendedores"),
+}
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM é o pico do próprio processo; o ru_maxrss do Linux herda o pico do processo pai
+    # através do fork + exec (aqui, o do gerador de dados sintéticos)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _child(name: str) -> dict:
+    # Executado no processo filho: importa, roda e mede um único benchmark
+    # Nada de matplotlib aqui: o custo de importação das análises faz parte da medição
+    import importlib
+    from src.api import profiling
+    profiling.enable()
+
+    stages = {}
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    module_name, func_name = BENCHMARKS[name]
+
+    module = importlib.import_module(module_name)
+    stages["importar"] = time.perf_counter() - wall0
+    if hasattr(module, "plots_path"):
+        # saídas no diretório de trabalho do benchmark, não em plots/ do repositório
+        module.plots_path = os.path.join(os.getcwd(), "plots", os.path.basename(module.plots_path))
+    start = time.perf_counter()
+    if func_name == "load_dataset":
+        for file_name in module.DATASET_FILES:
+            module.load_dataset(file_name)
+    else:
+        getattr(module, func_name)()
+    stages["executar"] = time.perf_counter() - start
+    # Da criação do processo (antes do interpretador subir) até o primeiro resultado pronto
+    first_result = time.time() - float(os.environ["OLIST_BENCH_T0"])
+
+    # Etapas instrumentadas (src/api/profiling.py): leitura, junções, agregação, renderização...
+    for stage, totals in profiling.summary().items():
+        stages.setdefault(stage, round(totals["wall_s"], 4))
+    return {
+        "wall_s": time.perf_counter() - wall0,
+        "cpu_s": time.process_time() - cpu0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "primeiro_resultado_s": first_result,
+        "etapas": stages,
+    }
+
+
+def _run_child(name: str, env: dict, cwd: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--filho", name],
+        cwd=cwd, env=dict(env, OLIST_BENCH_T0=repr(time.time())), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark '{name}' falhou:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def ensure_data(scale: float, data_dir: str = None) -> str:
+    """
+    Diretório com os CSVs sintéticos da escala pedida.
+
+    Sem data_dir, usa o diretório da escala no cache, gerando os dados na primeira vez. Um
+    data_dir informado é só lido: precisa existir e ter o marcador de geração completa
+    (benchmarks/synthetic.py), e nunca é sobrescrito.
+    """
+    from benchmarks.synthetic import COMPLETE_MARKER, generate
+    if data_dir:
+        if not os.path.exists(os.path.join(data_dir, COMPLETE_MARKER)):
+            raise FileNotFoundError(
+                f"{data_dir} não tem dados sintéticos completos (falta {COMPLETE_MARKER}); "
+                f"gere-os com: python -m benchmarks.synthetic {data_dir} --escala {scale:g}"
+            )
+        return data_dir
+
+    from src.api.data_loader import CACHE_DIR
+    data_dir = os.path.join(CACHE_DIR, "synthetic", f"escala-{scale:g}")
+    if not os.path.exists(os.path.join(data_dir, COMPLETE_MARKER)):
+        start = time.perf_counter()
+        generate(data_dir, scale)
+        print(f"✅ Dados sintéticos (escala {scale:g}) gerados em {time.perf_counter() - start:.1f}s: {data_dir}")
+    return data_dir
+
+
+def run_benchmarks(scale: float = 1.0, names=None, repeat: int = 1, data_dir: str = None) -> dict:
+    """
+    Roda os benchmarks sobre os dados sintéticos da escala pedida.
+
+    Cada benchmark roda em um processo novo, com os snapshots e tabelas fato já preparados
+    (exceto load_dataset_frio, que parte de um cache vazio) e o cache de artefatos desligado.
+    Com repeat > 1, fica a melhor (menor) medição de cada métrica.
+
+    Retorna:
+    - dicionário {benchmark: {"wall_s", "cpu_s", "peak_rss_mb", "primeiro_resultado_s", "etapas"}}
+    """
+    data_dir = ensure_data(scale, data_dir)
+    names = names or list(BENCHMARKS)
+    work = tempfile.mkdtemp(prefix="olist-bench-")
+    try:
+        cache_dir = os.path.join(work, "cache")
+        env = dict(os.environ, OLIST_DATA_DIR=data_dir, OLIST_CACHE_DIR=cache_dir,
+                   OLIST_ARTIFACT_CACHE="0", MPLBACKEND="Agg",
+                   PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]))
+        # Prepara snapshots e tabelas fato uma vez (fora da medição), como no relatório completo
+        prepare = "from src.report_runner import _preparar_entradas; _preparar_entradas()"
+        subprocess.run([sys.executable, "-c", prepare], cwd=work, env=env, check=True, capture_output=True)
+
+        results = {}
+        for name in names:
+            runs = []
+            for _ in range(repeat):
+                child_env = env
+                if name == "load_dataset_frio":
+                    child_env = dict(env, OLIST_CACHE_DIR=tempfile.mkdtemp(dir=work))
+                runs.append(_run_child(name, child_env, work))
+            best = min(runs, key=lambda r: r["wall_s"])
+            best["peak_rss_mb"] = min(r["peak_rss_mb"] for r in runs)
+            best["primeiro_resultado_s"] = min(r["primeiro_resultado_s"] for r in runs)
+            results[name] = best
+            print(f"  {name:<28} {best['wall_s']:8.2f}s  cpu {best['cpu_s']:8.2f}s  pico {best['peak_rss_mb']:8.1f} MB"
+                  f"  1º resultado {best['primeiro_resultado_s']:6.2f}s (importação {best['etapas']['importar']:5.2f}s)")
+        return results
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def compare(results: dict, baseline: dict, time_tolerance: float = TIME_TOLERANCE,
+            memory_tolerance: float = MEMORY_TOLERANCE) -> list:
+    """
+    Compara os resultados com a linha de base da mesma escala.
+
+    Retorna:
+    - lista de mensagens de regressão (vazia quando não há regressões)
+    """
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if r["wall_s"] > base["wall_s"] * (1 + time_tolerance) and r["wall_s"] - base["wall_s"] > MIN_TIME_DELTA:
+            regressions.append(f"{name}: tempo {r['wall_s']:.2f}s > linha de base {base['wall_s']:.2f}s")
+        first, base_first = r.get("primeiro_resultado_s"), base.get("primeiro_resultado_s")
+        if first and base_first and first > base_first * (1 + time_tolerance) and first - base_first > MIN_TIME_DELTA:
+            regressions.append(f"{name}: primeiro resultado {first:.2f}s > linha de base {base_first:.2f}s")
+        if r["peak_rss_mb"] > base["peak_rss_mb"] * (1 + memory_tolerance):
+            regressions.append(f"{name}: memória {r['peak_rss_mb']:.0f} MB > linha de base {base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks das análises sobre dados sintéticos da Olist.")
+    parser.add_argument("--escala", type=float, default=1.0, help="fator de escala dos dados (1, 10, 100...)")
+    parser.add_argument("--only", nargs="*", help="roda apenas estes benchmarks")
+    parser.add_argument("--repeticoes", type=int, default=1, help="repetições por benchmark (fica a melhor)")
+    parser.add_argument("--dados", help="diretório com CSVs sintéticos já gerados, usado só para leitura "
+                        "(padrão: gerados no cache na primeira execução da escala)")
+    parser.add_argument("--linha-de-base", default=BASELINE_PATH, help="arquivo JSON da linha de base")
+    parser.add_argument("--atualizar", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--tolerancia-tempo", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--tolerancia-memoria", type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument("--saida", help="grava os resultados desta execução em JSON")
+    parser.add_argument("--filho", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.filho:
+        print(json.dumps(_child(args.filho)))
+        return 0
+
+    unknown = [n for n in (args.only or []) if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmarks desconhecidos: {unknown}; disponíveis: {list(BENCHMARKS)}")
+
+    key = f"escala_{args.escala:g}"
+    baseline = {}
+    if os.path.exists(args.linha_de_base):
+        with open(args.linha_de_base) as f:
+            baseline = json.load(f)
+    # Sem linha de base não há com o que comparar: falha antes de rodar, salvo com --atualizar
+    missing = [name for name in args.only or BENCHMARKS if name not in baseline.get(key, {})]
+    if missing and not args.atualizar:
+        print(f"❌ Sem linha de base para {key} em {args.linha_de_base}: {missing}; use --atualizar para gravá-la.")
+        return 1
+
+    try:
+        data_dir = ensure_data(args.escala, args.dados)
+    except FileNotFoundError as exc:
+        parser.error(str(exc))
+    results = run_benchmarks(args.escala, args.only, args.repeticoes, data_dir)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump({key: results}, f, indent=2)
+
+    if args.atualizar:
+        baseline.setdefault(key, {}).update(results)
+        with open(args.linha_de_base, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"✅ Linha de base ({key}) gravada em {args.linha_de_base}.")
+        return 0
+
+    regressions = compare(results, baseline[key], args.tolerancia_tempo, args.tolerancia_memoria)
+    for message in regressions:
+        print(f"❌ {message}")
+    if regressions:
+        return 1
+    print("✅ Nenhuma regressão em relação à linha de base.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""
+Gerador de dados sintéticos no formato dos CSVs da Olist, em escala configurável.
+
+Mantém nomes e ordem das colunas, formatos de data, faixas de CEP por estado e as cardinalidades
+do extrato público (escala 1 ~ 99 mil pedidos), com assimetria realista: popularidade de produtos,
+vendedores e categorias segue uma lei de potência e os clientes se concentram em SP/RJ/MG.
+
+Uso:
+    python -m benchmarks.synthetic <diretorio_saida> [--escala 10] [--seed 0]
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+# Cardinalidades do extrato público (escala 1)
+ORDERS_PER_SCALE = 99_441
+PRODUCTS_PER_SCALE = 32_951
+SELLERS_PER_SCALE = 3_095
+GEOLOCATION_ROWS = 1_000_163
+ZIP_PREFIXES = 19_015
+
+# Pedidos gerados por bloco (limita a memória do gerador em escalas grandes)
+BLOCK_ORDERS = 500_000
+
+# Arquivo gravado em out_dir ao final da geração: sem ele, os CSVs estão incompletos
+COMPLETE_MARKER = ".completo"
+
+# Estado: (peso dos clientes, primeiro e último prefixo de CEP, latitude e longitude aproximadas)
+STATES = {
+    "SP": (0.420, 1000, 19999, -23.0, -47.5), "RJ": (0.129, 20000, 28999, -22.5, -43.2),
+    "MG": (0.117, 30000, 39999, -19.5, -44.5), "RS": (0.055, 90000, 99999, -30.0, -52.0),
+    "PR": (0.051, 80000, 87999, -25.0, -51.0), "SC": (0.037, 88000, 89999, -27.3, -49.5),
+    "BA": (0.034, 40000, 48999, -12.5, -40.5), "DF": (0.022, 70000, 72799, -15.8, -47.9),
+    "ES": (0.020, 29000, 29999, -19.8, -40.5), "GO": (0.020, 72800, 76799, -16.5, -49.5),
+    "PE": (0.017, 50000, 56999, -8.3, -36.0), "CE": (0.013, 60000, 63999, -4.5, -39.5),
+    "PA": (0.010, 66000, 68899, -3.5, -50.5), "MT": (0.009, 78000, 78899, -13.5, -56.0),
+    "MA": (0.008, 65000, 65999, -4.5, -44.5), "MS": (0.007, 79000, 79999, -20.5, -54.6),
+    "PB": (0.005, 58000, 58999, -7.1, -36.5), "PI": (0.005, 64000, 64999, -6.5, -42.5),
+    "RN": (0.005, 59000, 59999, -5.8, -36.5), "AL": (0.004, 57000, 57999, -9.6, -36.5),
+    "SE": (0.003, 49000, 49999, -10.6, -37.3), "TO": (0.003, 77000, 77999, -10.2, -48.3),
+    "RO": (0.003, 76800, 76999, -10.9, -62.8), "AM": (0.001, 69000, 69899, -3.1, -60.0),
+    "AC": (0.001, 69900, 69999, -9.0, -70.0), "AP": (0.001, 68900, 68999, 0.9, -51.5),
+    "RR": (0.001, 69300, 69399, 2.8, -60.7),
+}
+
+CATEGORIES = [
+    "cama_mesa_banho", "beleza_saude", "esporte_lazer", "moveis_decoracao", "informatica_acessorios",
+    "utilidades_domesticas", "relogios_presentes", "telefonia", "ferramentas_jardim", "automotivo",
+    "brinquedos", "cool_stuff", "perfumaria", "bebes", "eletronicos", "papelaria",
+    "fashion_bolsas_e_acessorios", "pet_shop", "moveis_escritorio", "consoles_games",
+    "malas_acessorios", "construcao_ferramentas_construcao", "eletrodomesticos",
+    "instrumentos_musicais", "eletroportateis", "casa_construcao", "livros_interesse_geral",
+    "alimentos", "moveis_sala", "casa_conforto", "bebidas", "audio", "market_place",
+    "construcao_ferramentas_iluminacao", "climatizacao", "moveis_cozinha_area_de_servico_jantar_e_jardim",
+    "alimentos_bebidas", "industria_comercio_e_negocios", "livros_tecnicos", "telefonia_fixa",
+    "fashion_calcados", "eletrodomesticos_2", "construcao_ferramentas_jardim", "agro_industria_e_comercio",
+    "artes", "pcs", "sinalizacao_e_seguranca", "construcao_ferramentas_seguranca", "artigos_de_natal",
+    "fashion_roupa_masculina", "moveis_colchao_e_estofado", "portateis_casa_forno_e_cafe",
+    "fashion_underwear_e_moda_praia", "artigos_de_festas", "livros_importados", "fashion_roupa_feminina",
+    "cine_foto", "musica", "dvds_blu_ray", "moveis_quarto", "tablets_impressao_imagem",
+    "artes_e_artesanato", "fashion_esporte", "flores", "casa_conforto_2", "la_cuisine",
+    "portateis_cozinha_e_preparadores_de_alimentos", "pc_gamer", "cds_dvds_musicais",
+    "fashion_roupa_infanto_juvenil", "fraldas_higiene", "seguros_e_servicos", "seguros_e_servicos_2",
+]
+
+ORDER_STATUS = {
+    "delivered": 0.970, "shipped": 0.011, "canceled": 0.006, "unavailable": 0.006,
+    "invoiced": 0.003, "processing": 0.003, "created": 0.0005, "approved": 0.0005,
+}
+PAYMENT_TYPES = {"credit_card": 0.739, "boleto": 0.190, "voucher": 0.056, "debit_card": 0.015}
+# Parcelas dos pagamentos com cartão de crédito
+INSTALLMENTS = {
+    1: 0.34, 2: 0.157, 3: 0.136, 4: 0.096, 5: 0.070, 6: 0.052, 7: 0.022, 8: 0.056,
+    9: 0.009, 10: 0.058, 11: 0.0004, 12: 0.0018, 15: 0.001, 18: 0.0006, 24: 0.0002,
+}
+
+REVIEW_WORDS = [
+    "produto", "chegou", "antes", "do", "prazo", "recomendo", "ótimo", "bom", "entrega", "rápida",
+    "não", "recebi", "atrasado", "veio", "quebrado", "péssimo", "atendimento", "qualidade", "excelente",
+    "vendedor", "correto", "embalagem", "diferente", "anúncio", "satisfeito", "muito",
+]
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+START = pd.Timestamp("2016-09-04")
+PERIOD_SECONDS = 760 * 86400
+
+_HEX = np.array([f"{i:02x}" for i in range(256)])
+
+
+def hex_ids(rng, n: int) -> np.ndarray:
+    """Ids hexadecimais de 32 caracteres (como os da Olist), gerados de forma vetorizada."""
+    codes = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    return np.ascontiguousarray(_HEX[codes]).view("<U32").ravel()
+
+
+def _mix_ids(values, seed: int) -> np.ndarray:
+    # Id hexadecimal determinístico por inteiro (mesmo cliente => mesmo customer_unique_id)
+    v = np.asarray(values, dtype=np.uint64) + np.uint64(seed)
+    with np.errstate(over="ignore"):
+        hi = v * np.uint64(0x9E3779B97F4A7C15)
+        lo = (v ^ np.uint64(0xD1B54A32D192ED03)) * np.uint64(0xBF58476D1CE4E5B9)
+    parts = np.stack([hi, lo], axis=1).view(np.uint8).reshape(len(v), 16)
+    return np.ascontiguousarray(_HEX[parts]).view("<U32").ravel()
+
+
+def _power_weights(rng, n: int, alpha: float) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** alpha
+    rng.shuffle(w)
+    return w / w.sum()
+
+
+def _zip_prefixes(rng, n_prefixes: int):
+    # Prefixos únicos distribuídos entre os estados conforme o peso de cada um
+    names = list(STATES)
+    weights = np.array([STATES[s][0] for s in names])
+    counts = np.maximum(1, np.round(weights / weights.sum() * n_prefixes)).astype(int)
+    prefixes, states = [], []
+    for state, k in zip(names, counts):
+        _, lo, hi, _, _ = STATES[state]
+        k = min(k, hi - lo + 1)
+        prefixes.append(rng.choice(np.arange(lo, hi + 1), size=k, replace=False))
+        states.append(np.full(k, state))
+    return np.concatenate(prefixes), np.concatenate(states)
+
+
+def _fmt(ts) -> np.ndarray:
+    return pd.Series(ts).dt.strftime(DATE_FORMAT).to_numpy()
+
+
+def _write(df: pd.DataFrame, path: str, append: bool = False):
+    df.to_csv(path, index=False, mode="a" if append else "w", header=not append)
+
+
+def generate(out_dir: str, scale: float = 1.0, seed: int = 0) -> str:
+    """
+    Grava os 9 CSVs da Olist em out_dir e, por último, o marcador COMPLETE_MARKER.
+
+    Parâmetros:
+    - out_dir: diretório de saída
+    - scale: fator de escala sobre o extrato público (1, 10, 100, ...). Pedidos, clientes, itens,
+      pagamentos, avaliações, produtos e vendedores crescem linearmente; a tabela de geolocalização
+      é uma referência de CEPs e não passa do tamanho do extrato público
+    - seed: semente do gerador aleatório
+
+    Retorna:
+    - out_dir
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    path = lambda name: os.path.join(out_dir, name)
+
+    n_orders = int(ORDERS_PER_SCALE * scale)
+    n_products = max(1, int(PRODUCTS_PER_SCALE * scale))
+    n_sellers = max(1, int(SELLERS_PER_SCALE * scale))
+
+    # --- CEPs e geolocalização ---
+    zip_prefix, zip_state = _zip_prefixes(rng, ZIP_PREFIXES)
+    state_lat = {s: STATES[s][3] for s in STATES}
+    state_lng = {s: STATES[s][4] for s in STATES}
+    zip_lat = np.array([state_lat[s] for s in zip_state]) + rng.normal(0, 1.2, len(zip_prefix))
+    zip_lng = np.array([state_lng[s] for s in zip_state]) + rng.normal(0, 1.2, len(zip_prefix))
+    zip_weights = _power_weights(rng, len(zip_prefix), 0.8)
+
+    geo_rows = int(GEOLOCATION_ROWS * min(scale, 1.0))
+    g = rng.choice(len(zip_prefix), size=geo_rows, p=zip_weights)
+    _write(pd.DataFrame({
+        "geolocation_zip_code_prefix": zip_prefix[g],
+        "geolocation_lat": zip_lat[g] + rng.normal(0, 0.02, geo_rows),
+        "geolocation_lng": zip_lng[g] + rng.normal(0, 0.02, geo_rows),
+        "geolocation_city": "cidade_" + pd.Series(zip_prefix[g] // 100).astype(str).to_numpy(),
+        "geolocation_state": zip_state[g],
+    }), path("olist_geolocation_dataset.csv"))
+
+    # --- Catálogo: categorias, produtos e vendedores ---
+    category_weights = _power_weights(rng, len(CATEGORIES), 1.1)
+    _write(pd.DataFrame({
+        "product_category_name": CATEGORIES,
+        "product_category_name_english": [c.replace("_", " ") for c in CATEGORIES],
+    }), path("product_category_name_translation.csv"))
+
+    product_ids = hex_ids(rng, n_products)
+    category = np.asarray(CATEGORIES, dtype=object)[rng.choice(len(CATEGORIES), n_products, p=category_weights)]
+    category[rng.random(n_products) < 0.0185] = None
+    weight = np.round(rng.lognormal(6.6, 1.2, n_products))
+    missing_dims = rng.random(n_products) < 0.0001
+    products = pd.DataFrame({
+        "product_id": product_ids,
+        "product_category_name": category,
+        "product_name_lenght": rng.integers(5, 77, n_products).astype(float),
+        "product_description_lenght": np.round(rng.lognormal(6.4, 0.7, n_products)).clip(4, 3992),
+        "product_photos_qty": rng.choice(np.arange(1, 21), n_products, p=_power_weights(rng, 20, 1.8)).astype(float),
+        "product_weight_g": weight.clip(0, 40425),
+        "product_length_cm": rng.integers(7, 106, n_products).astype(float),
+        "product_height_cm": rng.integers(2, 106, n_products).astype(float),
+        "product_width_cm": rng.integers(6, 118, n_products).astype(float),
+    })
+    no_text = products["product_category_name"].isna().to_numpy()
+    products.loc[no_text, ["product_name_lenght", "product_description_lenght", "product_photos_qty"]] = np.nan
+    products.loc[missing_dims, ["product_weight_g", "product_length_cm", "product_height_cm", "product_width_cm"]] = np.nan
+    _write(products, path("olist_products_dataset.csv"))
+    product_popularity = _power_weights(rng, n_products, 0.6)
+    product_base_price = np.round(rng.lognormal(4.3, 1.0, n_products), 2).clip(0.85, 6735)
+
+    seller_ids = hex_ids(rng, n_sellers)
+    seller_zip = rng.choice(len(zip_prefix), n_sellers, p=zip_weights)
+    _write(pd.DataFrame({
+        "seller_id": seller_ids,
+        "seller_zip_code_prefix": zip_prefix[seller_zip],
+        "seller_city": "cidade_" + pd.Series(zip_prefix[seller_zip] // 100).astype(str).to_numpy(),
+        "seller_state": zip_state[seller_zip],
+    }), path("olist_sellers_dataset.csv"))
+    seller_popularity = _power_weights(rng, n_sellers, 0.6)
+    # cada produto é vendido sempre pelo mesmo vendedor; todo vendedor tem ao menos um produto
+    product_seller = rng.choice(n_sellers, n_products, p=seller_popularity)
+    k = min(n_sellers, n_products)
+    product_seller[rng.permutation(n_products)[:k]] = rng.permutation(n_sellers)[:k]
+
+    # --- Pedidos e tabelas dependentes, em blocos ---
+    statuses, status_p = list(ORDER_STATUS), np.array(list(ORDER_STATUS.values()))
+    payment_types, payment_p = list(PAYMENT_TYPES), np.array(list(PAYMENT_TYPES.values()))
+    installment_values = np.array(list(INSTALLMENTS))
+    installment_p = np.array(list(INSTALLMENTS.values()))
+    installment_p = installment_p / installment_p.sum()
+    words = np.array(REVIEW_WORDS, dtype=object)
+
+    for start in range(0, n_orders, BLOCK_ORDERS):
+        n = min(BLOCK_ORDERS, n_orders - start)
+        append = start > 0
+
+        order_ids = hex_ids(rng, n)
+        customer_ids = hex_ids(rng, n)
+        # ~3% dos clientes compram mais de uma vez: customer_unique_id repetido
+        unique_idx = np.where(rng.random(n) < 0.97, start + np.arange(n), rng.integers(0, start + n, n))
+        unique_ids = _mix_ids(unique_idx, seed)
+        customer_zip = rng.choice(len(zip_prefix), n, p=zip_weights)
+        _write(pd.DataFrame({
+            "customer_id": customer_ids,
+            "customer_unique_id": unique_ids,
+            "customer_zip_code_prefix": zip_prefix[customer_zip],
+            "customer_city": "cidade_" + pd.Series(zip_prefix[customer_zip] // 100).astype(str).to_numpy(),
+            "customer_state": zip_state[customer_zip],
+        }), path("olist_customers_dataset.csv"), append)
+
+        # volume crescente ao longo do período (como no extrato real)
+        purchase = START + pd.to_timedelta((np.sqrt(rng.random(n)) * PERIOD_SECONDS).astype("int64"), unit="s")
+        status = np.asarray(statuses, dtype=object)[rng.choice(len(statuses), n, p=status_p)]
+        approved = purchase + pd.to_timedelta(rng.exponential(10 * 3600, n).astype("int64"), unit="s")
+        carrier = approved + pd.to_timedelta(rng.exponential(2.5 * 86400, n).astype("int64"), unit="s")
+        delivered = carrier + pd.to_timedelta(rng.gamma(2.0, 4.5 * 86400, n).astype("int64"), unit="s")
+        estimated = (purchase + pd.to_timedelta(rng.integers(10, 45, n), unit="D")).normalize()
+        is_delivered = status == "delivered"
+        shipped = np.isin(status, ["delivered", "shipped"])
+        _write(pd.DataFrame({
+            "order_id": order_ids,
+            "customer_id": customer_ids,
+            "order_status": status,
+            "order_purchase_timestamp": _fmt(purchase),
+            "order_approved_at": np.where(status != "created", _fmt(approved), None),
+            "order_delivered_carrier_date": np.where(shipped, _fmt(carrier), None),
+            "order_delivered_customer_date": np.where(is_delivered, _fmt(delivered), None),
+            "order_estimated_delivery_date": _fmt(estimated),
+        }), path("olist_orders_dataset.csv"), append)
+
+        # itens: ~1,13 por pedido; pedidos indisponíveis/cancelados muitas vezes sem itens
+        n_items = rng.choice([1, 2, 3, 4, 5, 6], n, p=[0.9, 0.075, 0.014, 0.006, 0.003, 0.002])
+        n_items[np.isin(status, ["unavailable", "created"]) & (rng.random(n) < 0.95)] = 0
+        item_order = np.repeat(np.arange(n), n_items)
+        item_seq = np.arange(len(item_order)) - np.repeat(np.cumsum(n_items) - n_items, n_items) + 1
+        product = rng.choice(n_products, len(item_order), p=product_popularity)
+        # itens repetidos no mesmo pedido são o mesmo produto
+        first = np.repeat(np.cumsum(n_items) - n_items, n_items)
+        same = rng.random(len(item_order)) < 0.6
+        product = np.where(same, product[first], product)
+        price = np.round(product_base_price[product] * rng.uniform(0.9, 1.1, len(product)), 2)
+        freight = np.round(rng.lognormal(2.8, 0.55, len(product)), 2)
+        freight[rng.random(len(product)) < 0.003] = 0.0
+        _write(pd.DataFrame({
+            "order_id": order_ids[item_order],
+            "order_item_id": item_seq,
+            "product_id": product_ids[product],
+            "seller_id": seller_ids[product_seller[product]],
+            "shipping_limit_date": _fmt(purchase[item_order] + pd.Timedelta(days=6)),
+            "price": price,
+            "freight_value": freight,
+        }), path("olist_order_items_dataset.csv"), append)
+
+        # pagamentos: ~1,04 por pedido; parcelas só no cartão de crédito
+        n_pay = rng.choice([1, 2, 3, 4], n, p=[0.965, 0.025, 0.007, 0.003])
+        pay_order = np.repeat(np.arange(n), n_pay)
+        pay_seq = np.arange(len(pay_order)) - np.repeat(np.cumsum(n_pay) - n_pay, n_pay) + 1
+        pay_type = np.asarray(payment_types, dtype=object)[rng.choice(len(payment_types), len(pay_order), p=payment_p)]
+        pay_type[pay_seq > 1] = "voucher"
+        installments = np.where(
+            pay_type == "credit_card",
+            rng.choice(installment_values, len(pay_order), p=installment_p),
+            1,
+        )
+        order_total = np.bincount(item_order, price + freight, minlength=n)
+        value = np.where(order_total[pay_order] > 0, order_total[pay_order], rng.lognormal(4.5, 0.8, len(pay_order)))
+        _write(pd.DataFrame({
+            "order_id": order_ids[pay_order],
+            "payment_sequential": pay_seq,
+            "payment_type": pay_type,
+            "payment_installments": installments,
+            "payment_value": np.round(value / n_pay[pay_order], 2),
+        }), path("olist_order_payments_dataset.csv"), append)
+
+        # avaliações: uma por pedido; ~41% com comentário, nota pior com atraso
+        late = is_delivered & (delivered > estimated + pd.Timedelta(days=1))
+        score = np.where(late, rng.choice([1, 2, 3, 4, 5], n, p=[0.45, 0.1, 0.15, 0.15, 0.15]),
+                         rng.choice([1, 2, 3, 4, 5], n, p=[0.09, 0.03, 0.08, 0.2, 0.6]))
+        has_comment = rng.random(n) < 0.41
+        n_words = rng.integers(2, 12, n)
+        word_idx = rng.integers(0, len(words), n_words.sum())
+        text = pd.Series(words[word_idx]).groupby(np.repeat(np.arange(n), n_words)).agg(" ".join).to_numpy()
+        created = (pd.DatetimeIndex(np.where(is_delivered, delivered, estimated)) + pd.Timedelta(days=1)).normalize()
+        _write(pd.DataFrame({
+            "review_id": hex_ids(rng, n),
+            "order_id": order_ids,
+            "review_score": score,
+            "review_comment_title": np.where(rng.random(n) < 0.12, "recomendo", None),
+            "review_comment_message": np.where(has_comment, text, None),
+            "review_creation_date": _fmt(created),
+            "review_answer_timestamp": _fmt(created + pd.to_timedelta(rng.exponential(3 * 86400, n).astype("int64"), unit="s")),
+        }), path("olist_order_reviews_dataset.csv"), append)
+
+    open(path(COMPLETE_MARKER), "w").close()
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera CSVs sintéticos no formato da Olist.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--escala", type=float, default=1.0, help="fator de escala (1 ~ extrato público)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.out_dir, args.escala, args.seed)
+    print(f"✅ Dados sintéticos (escala {args.escala:g}) gravados em {args.out_dir}.")
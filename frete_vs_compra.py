@@ -1,48 +1,52 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from src.api.data_loader import load_dataset
-
-os.makedirs("plots/insights", exist_ok=True)
-sns.set(style="whitegrid")
-
-def _to_datetime(df, cols):
-    for c in cols:
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce")
-    return df
-
-# 11) Margem latente por categoria de produto
-def margem_latente_categorias(cost_ratio_default=0.6, price_increase_scenarios=[0.05, 0.10]):
-    """
-    Agrega por product_category_name e:
-      - calcula volume (qty), preço médio, frete médio, peso/volume médios
-      - estima custo proxy por categoria usando cost_ratio_default e fatores de peso/volume
-      - estima elasticidade preço-demanda por categoria (quando houver variação interna suficiente)
-      - simula aumentos de preço por categoria e calcula delta de margem total
-    Saídas:
-      - CSV com ranking de categorias candidatas
-      - Gráfico com top categorias por ganho de margem no cenário +5%
-    """
-    # Carregar dados
-    items = load_dataset("olist_order_items_dataset.csv")
-    products = load_dataset("olist_products_dataset.csv")
+from src.api.order_facts import SOURCES, load_item_facts, load_order_facts
+from src.api.artifacts import cached_artifacts
+from src.api.profiling import etapa, perfilado
+from src.rendering import pyplot, seaborn
+from src.api.incremental import refresh_aggregate
+from src.api.streaming import chunked_aggregate
+from src.api.engine import run_plan
+from src.api.plans import PLANS
+from src.api.geolocation import GEOLOCATION_FILE, load_zip_centroids
+from src.analytics.elasticity import price_elasticity
+from src.analytics.scenarios import scenario_columns, scenario_grid
+from src.analytics.aggregations import group_summary, segment
+from src.analytics.cohorts import Cohorts
+from src.api.keys import key_dictionary
+
+# Código de apoio comum às análises (entra na chave do cache de artefatos, junto com o código
+# deste módulo e as constantes abaixo)
+CODIGO_BASE = [
+    "src.api.data_loader", "src.api.schemas", "src.api.keys", "src.api.order_facts", "src.api.incremental",
+    "src.api.streaming", "src.api.engine", "src.api.plans", "src.analytics.aggregations", "src.rendering"
+]
+
+# Funções executadas pelo relatório completo (src/report_runner.py)
+ANALISES = ["margem_latente_categorias", "parcelas_e_ltv", "micro_mercados_zip", "coortes_e_recompra"]
+
+# Segmentos de parcelas (média arredondada de parcelas por pagamento): <=1, 2-3, 4-6, 7+
+INSTALLMENT_BINS = [-np.inf, 1, 3, 6, np.inf]
+INSTALLMENT_SEGMENTS = ["sem_parcelas", "parcelas_baixas_2_3", "parcelas_medias_4_6", "parcelas_altas_7_plus"]
+
+def _agregados_categoria():
+    # Carregar itens já unidos aos atributos de produto
+    df = load_item_facts(columns=[
+        "order_id", "product_id", "price", "freight_value", "product_category_name",
+        "product_weight_g", "product_length_cm", "product_height_cm", "product_width_cm"
+    ])
 
     # Tipos e limpeza
-    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0)
-    items["freight_value"] = pd.to_numeric(items["freight_value"], errors="coerce").fillna(0)
-    products["product_weight_g"] = pd.to_numeric(products.get("product_weight_g", pd.Series()), errors="coerce")
-    products["product_length_cm"] = pd.to_numeric(products.get("product_length_cm", pd.Series()), errors="coerce")
-    products["product_height_cm"] = pd.to_numeric(products.get("product_height_cm", pd.Series()), errors="coerce")
-    products["product_width_cm"] = pd.to_numeric(products.get("product_width_cm", pd.Series()), errors="coerce")
-
-    # Juntar items + produtos para ter categoria e atributos
-    df = items.merge(products, on="product_id", how="left")
+    df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0)
+    df["freight_value"] = pd.to_numeric(df["freight_value"], errors="coerce").fillna(0)
+    df["product_weight_g"] = pd.to_numeric(df["product_weight_g"], errors="coerce")
+    df["product_length_cm"] = pd.to_numeric(df["product_length_cm"], errors="coerce")
+    df["product_height_cm"] = pd.to_numeric(df["product_height_cm"], errors="coerce")
+    df["product_width_cm"] = pd.to_numeric(df["product_width_cm"], errors="coerce")
 
     # Agregar por categoria
-    cat = df.groupby("product_category_name").agg(
+    cat = df.groupby("product_category_name", observed=True).agg(
         qty_sold=("order_id", "count"),
         avg_price=("price", "mean"),
         median_price=("price", "median"),
@@ -51,7 +55,64 @@ def margem_latente_categorias(cost_ratio_default=0.6, price_increase_scenarios=[
         avg_length_cm=("product_length_cm", "median"),
         avg_height_cm=("product_height_cm", "median"),
         avg_width_cm=("product_width_cm", "median")
-    ).reset_index().rename(columns={"product_category_name":"category"})
+    ).reset_index()
+
+    # Agregar por product_id dentro da categoria
+    prod_agg = df.groupby(["product_category_name","product_id"], observed=True).agg(
+        qty_sold_prod=("order_id","count"),
+        avg_price_prod=("price","mean")
+    ).reset_index()
+    return cat, prod_agg
+
+def agregados_margem(incremental=False, chunked=False, engine=None):
+    """
+    Agregados por categoria e por produto usados na margem latente, na fonte escolhida
+    (ver margem_latente_categorias).
+
+    Retorna:
+    - (cat, prod_agg)
+    """
+    if incremental:
+        return refresh_aggregate("category_summary"), refresh_aggregate("category_product_summary")
+    if chunked:
+        return chunked_aggregate("category_summary"), chunked_aggregate("category_product_summary")
+    if engine:
+        return run_plan(PLANS["category_summary"](), engine), run_plan(PLANS["category_product_summary"](), engine)
+    return _agregados_categoria()
+
+def _nomes_cenarios(price_increase_scenarios):
+    return [f"inc_{int(inc*100)}pct" for inc in price_increase_scenarios]
+
+def colunas_ranking(price_increase_scenarios):
+    """
+    Colunas relevantes do ranking de margem latente (as gravadas no CSV), com as do cenário de
+    cada aumento de preço.
+    """
+    out_cols = [
+        "category","qty_sold","avg_price","avg_freight","estimated_cost_unit",
+        "realized_margin_unit","current_revenue_total","current_margin_total","price_elasticity"
+    ]
+    for s in _nomes_cenarios(price_increase_scenarios):
+        out_cols += [f"sim_price_{s}", f"sim_qty_{s}", f"sim_margin_unit_{s}", f"sim_margin_total_{s}", f"delta_margin_total_{s}"]
+    return out_cols
+
+def ranking_margem_latente(cat, prod_agg, cost_ratio_default=0.6, price_increase_scenarios=(0.05, 0.10)):
+    """
+    Ranking de categorias por ganho de margem a partir dos agregados de agregados_margem
+    (não altera os DataFrames recebidos).
+
+    Parâmetros:
+    - cat, prod_agg: agregados por categoria e por (categoria, produto)
+    - cost_ratio_default: custo proxy como fração do preço médio
+    - price_increase_scenarios: aumentos de preço simulados (ex: 0.05 = +5%)
+
+    Retorna:
+    - DataFrame com uma linha por categoria, ordenado pelo ganho de margem no cenário +5%
+      (ou pela margem atual, sem esse cenário)
+    """
+    cat = cat.rename(columns={"product_category_name":"category"})
+    cat["category"] = cat["category"].astype(str)
+    prod_agg = prod_agg.rename(columns={"product_category_name":"category"})
 
     # Calcular volume médio por categoria (cm3) e preencher NaNs com mediana global
     cat["volume_cm3"] = (cat["avg_length_cm"].fillna(cat["avg_length_cm"].median()) *
@@ -74,46 +135,23 @@ def margem_latente_categorias(cost_ratio_default=0.6, price_increase_scenarios=[
     cat["current_margin_total"] = cat["realized_margin_unit"] * cat["qty_sold"]
 
     # Estimar elasticidade preço-demanda por categoria
-    # Aqui usamos variação interna entre produtos da mesma categoria: regressão log(qty) ~ log(price)
-    # Para isso, agregamos por product_id dentro da categoria
-    prod_agg = df.groupby(["product_category_name","product_id"]).agg(
-        qty_sold_prod=("order_id","count"),
-        avg_price_prod=("price","mean")
-    ).reset_index().rename(columns={"product_category_name":"category"})
-
-    elasticity_map = {}
-    for category, g in prod_agg.groupby("category"):
-        if g.shape[0] < 5:
-            elasticity_map[category] = np.nan
-            continue
-        g = g[(g["avg_price_prod"] > 0) & (g["qty_sold_prod"] > 0)]
-        if g.shape[0] < 5:
-            elasticity_map[category] = np.nan
-            continue
-        x = np.log(g["avg_price_prod"].values)
-        y = np.log(g["qty_sold_prod"].values)
-        try:
-            slope = np.polyfit(x, y, 1)[0]
-            elasticity_map[category] = float(slope)
-        except Exception:
-            elasticity_map[category] = np.nan
-
-    cat["price_elasticity"] = cat["category"].map(elasticity_map).fillna(np.nan)
-
-    # Simular cenários de aumento de preço por categoria
-    scenario_names = []
-    for inc in price_increase_scenarios:
-        sname = f"inc_{int(inc*100)}pct"
-        scenario_names.append(sname)
-        cat[f"sim_price_{sname}"] = cat["avg_price"] * (1 + inc)
-        # preencher elasticidade faltante com valor conservador -1.5
-        cat["elasticity_filled"] = cat["price_elasticity"].fillna(-1.5)
-        # nova quantidade estimada (aprox): qty * (1+inc)^{elasticity}
-        cat[f"sim_qty_{sname}"] = (cat["qty_sold"] * ((1 + inc) ** cat["elasticity_filled"])).clip(lower=0)
-        cat[f"sim_margin_unit_{sname}"] = cat[f"sim_price_{sname}"] - cat["avg_freight"] - cat["estimated_cost_unit"]
-        cat[f"sim_revenue_total_{sname}"] = cat[f"sim_price_{sname}"] * cat[f"sim_qty_{sname}"]
-        cat[f"sim_margin_total_{sname}"] = cat[f"sim_margin_unit_{sname}"] * cat[f"sim_qty_{sname}"]
-        cat[f"delta_margin_total_{sname}"] = cat[f"sim_margin_total_{sname}"] - cat["current_margin_total"]
+    # Aqui usamos variação interna entre produtos da mesma categoria: regressão log(qty) ~ log(price),
+    # sobre prod_agg (agregado por product_id dentro da categoria)
+
+    # Todas as categorias de uma vez, a partir de somas por grupo (mínimo de 5 produtos por categoria)
+    with etapa("margem_latente_categorias.elasticidade", rows_in=prod_agg) as e:
+        elasticity = e.saida(price_elasticity(prod_agg, group_col="category", min_products=5))
+    cat["price_elasticity"] = cat["category"].map(elasticity["elasticity"])
+    cat["price_elasticity_se"] = cat["category"].map(elasticity["elasticity_se"])
+
+    # Simular cenários de aumento de preço por categoria, todos de uma vez (src/analytics/scenarios.py)
+    # preencher elasticidade faltante com valor conservador -1.5
+    cat["elasticity_filled"] = cat["price_elasticity"].fillna(-1.5)
+    # nova quantidade estimada (aprox): qty * (1+inc)^{elasticity}
+    scenario_names = _nomes_cenarios(price_increase_scenarios)
+    with etapa("margem_latente_categorias.cenarios", rows_in=cat):
+        scenarios = scenario_grid(price_increase_scenarios, cost_ratios=[cost_ratio_default], elasticity_priors=[-1.5])
+        cat = pd.concat([cat, scenario_columns(cat, scenarios, scenario_names)], axis=1)
 
     # Ranking por ganho de margem no cenário +5%
     sort_col = "delta_margin_total_inc_5pct" if "delta_margin_total_inc_5pct" in cat.columns else None
@@ -122,150 +160,322 @@ def margem_latente_categorias(cost_ratio_default=0.6, price_increase_scenarios=[
         ranking = ranking.sort_values(by=sort_col, ascending=False).reset_index(drop=True)
     else:
         ranking = ranking.sort_values(by="current_margin_total", ascending=False).reset_index(drop=True)
+    return ranking
 
-    # Salvar CSV com colunas relevantes
-    out_cols = [
-        "category","qty_sold","avg_price","avg_freight","estimated_cost_unit",
-        "realized_margin_unit","current_revenue_total","current_margin_total","price_elasticity"
-    ]
-    for s in scenario_names:
-        out_cols += [f"sim_price_{s}", f"sim_qty_{s}", f"sim_margin_unit_{s}", f"sim_margin_total_{s}", f"delta_margin_total_{s}"]
+# 11) Margem latente por categoria de produto
+@cached_artifacts(
+    outputs=["plots/insights/margem_latente_categorias_ranking.csv", "plots/insights/margem_latente_categorias_top15_inc5pct.png"],
+    inputs=SOURCES,
+    code=[_agregados_categoria, agregados_margem, colunas_ranking, ranking_margem_latente, "src.analytics.elasticity", "src.analytics.scenarios"] + CODIGO_BASE
+)
+@perfilado()
+def margem_latente_categorias(cost_ratio_default=0.6, price_increase_scenarios=[0.05, 0.10], incremental=False, chunked=False, engine=None):
+    """
+    Agrega por product_category_name e:
+      - calcula volume (qty), preço médio, frete médio, peso/volume médios
+      - estima custo proxy por categoria usando cost_ratio_default e fatores de peso/volume
+      - estima elasticidade preço-demanda por categoria (quando houver variação interna suficiente)
+      - simula aumentos de preço por categoria e calcula delta de margem total
+    Com incremental=True, os agregados por categoria e por produto vêm do estado incremental
+    (src/api/incremental.py), que processa apenas os pedidos novos desde a última execução.
+    Com chunked=True, os mesmos agregados são calculados lendo os CSVs em blocos
+    (src/api/streaming.py), com memória limitada independentemente do tamanho do extrato.
+    Com engine='pandas' | 'polars' | 'duckdb', os agregados vêm do plano relacional equivalente
+    (src/api/plans.py) executado no engine escolhido.
+    Saídas:
+      - CSV com ranking de categorias candidatas
+      - Gráfico com top categorias por ganho de margem no cenário +5%
+    """
+    with etapa("margem_latente_categorias.agregar") as e:
+        cat, prod_agg = agregados_margem(incremental, chunked, engine)
+        e.saida(cat)
+    ranking = ranking_margem_latente(cat, prod_agg, cost_ratio_default, price_increase_scenarios)
 
+    # Salvar CSV com colunas relevantes
+    out_cols = colunas_ranking(price_increase_scenarios)
+    os.makedirs("plots/insights", exist_ok=True)
     ranking[out_cols].to_csv("plots/insights/margem_latente_categorias_ranking.csv", index=False)
 
     # Plot: top 15 categorias por ganho de margem no cenário +5%
     if "delta_margin_total_inc_5pct" in ranking.columns:
-        top = ranking.head(15)
-        plt.figure(figsize=(12,8))
-        sns.barplot(
-            x="delta_margin_total_inc_5pct",
-            y="category",
-            data=top,
-            palette="coolwarm"
-        )
-        plt.xlabel("Ganho estimado de margem total (R$) — +5% preço")
-        plt.ylabel("Categoria")
-        plt.title("Top 15 categorias com maior ganho de margem estimado (+5% preço)")
-        plt.tight_layout()
-        plt.savefig("plots/insights/margem_latente_categorias_top15_inc5pct.png")
-        print("✅ Gráfico 'margem_latente_categorias_top15_inc5pct' salvo.")
+        with etapa("margem_latente_categorias.renderizar"):
+            plt, sns = pyplot(), seaborn(style="whitegrid")
+            top = ranking.head(15)
+            plt.figure(figsize=(12,8))
+            sns.barplot(
+                x="delta_margin_total_inc_5pct",
+                y="category",
+                data=top,
+                palette="coolwarm"
+            )
+            plt.xlabel("Ganho estimado de margem total (R$) — +5% preço")
+            plt.ylabel("Categoria")
+            plt.title("Top 15 categorias com maior ganho de margem estimado (+5% preço)")
+            plt.tight_layout()
+            plt.savefig("plots/insights/margem_latente_categorias_top15_inc5pct.png")
+            print("✅ Gráfico 'margem_latente_categorias_top15_inc5pct' salvo.")
     else:
         print("⚠️ Cenário +5% não disponível para plotagem.")
 
     print("✅ CSV 'margem_latente_categorias_ranking.csv' salvo.")
     return ranking
 
-# 6) Segmento sensível a parcelas e LTV (mantido)
-def parcelas_e_ltv():
-    orders = load_dataset("olist_orders_dataset.csv")
-    payments = load_dataset("olist_order_payments_dataset.csv")
-    customers = load_dataset("olist_customers_dataset.csv")
-
-    orders = _to_datetime(orders, ["order_purchase_timestamp", "order_delivered_customer_date"])
-    payments["payment_value"] = pd.to_numeric(payments["payment_value"], errors="coerce").fillna(0)
-    payments["payment_installments"] = pd.to_numeric(payments["payment_installments"], errors="coerce").fillna(1)
-
-    payments_orders = payments.merge(orders[["order_id","customer_id","order_purchase_timestamp"]], on="order_id", how="left")
-    ltv_by_customer = payments_orders.groupby("customer_id").agg(
-        total_revenue=("payment_value", "sum"),
-        n_orders=("order_id", lambda x: x.nunique()),
-        avg_installments=("payment_installments", "mean"),
-        max_installments=("payment_installments", "max")
-    ).reset_index()
+def ltv_por_cliente(incremental=False, chunked=False, engine=None):
+    """
+    LTV, pedidos e parcelas por cliente (apenas pedidos com pagamento), na fonte escolhida
+    (ver parcelas_e_ltv).
+    """
+    if incremental:
+        # LTV por cliente mantido incrementalmente (src/api/incremental.py)
+        return refresh_aggregate("ltv_by_customer")
+    if chunked:
+        # Mesmo agregado calculado em blocos, particionado por order_id (src/api/streaming.py)
+        return chunked_aggregate("ltv_by_customer")
+    if engine:
+        # Plano relacional equivalente executado em pandas, Polars ou DuckDB (src/api/engine.py)
+        return run_plan(PLANS["ltv_by_customer"](), engine)
+    # Pedidos com pagamento registrado, já com os agregados de pagamento por pedido
+    payments_orders = load_order_facts(columns=[
+        "order_id", "customer_id", "payment_value_total", "payment_count",
+        "payment_installments_sum", "payment_installments_max"
+    ])
+    payments_orders = payments_orders[payments_orders["payment_count"] > 0]
+
+    return group_summary(payments_orders, "customer_id", {
+        "total_revenue": ("payment_value_total", "sum"),
+        "n_orders": ("order_id", "nunique"),
+        "installments_sum": ("payment_installments_sum", "sum"),
+        "payments_count": ("payment_count", "sum"),
+        "max_installments": ("payment_installments_max", "max"),
+    })
+
+def resumo_parcelas_ltv(ltv_by_customer, cliente="customer_id"):
+    """
+    Clientes, LTV médio/mediano e pedidos médios por segmento de parcelas, a partir do
+    resultado de ltv_por_cliente ou de ltv_por_cliente_unico (não altera o DataFrame recebido).
 
-    def seg_install(x):
-        if x <= 1:
-            return "sem_parcelas"
-        if 1 < x <= 3:
-            return "parcelas_baixas_2_3"
-        if 3 < x <= 6:
-            return "parcelas_medias_4_6"
-        return "parcelas_altas_7_plus"
-
-    ltv_by_customer["install_segment"] = ltv_by_customer["avg_installments"].round().apply(seg_install)
-
-    seg_summary = ltv_by_customer.groupby("install_segment").agg(
-        clientes=("customer_id", "count"),
-        avg_ltv=("total_revenue", "mean"),
-        median_ltv=("total_revenue", "median"),
-        avg_orders=("n_orders", "mean")
-    ).reset_index()
+    Parâmetros:
+    - ltv_by_customer: agregados por cliente
+    - cliente: coluna que identifica o cliente ('customer_id' ou 'customer_unique_key')
+    """
+    # média de parcelas por pagamento (e não por pedido), como na agregação sobre a tabela de pagamentos
+    ltv_by_customer = ltv_by_customer.assign(
+        avg_installments=ltv_by_customer["installments_sum"] / ltv_by_customer["payments_count"]
+    )
 
-    plt.figure(figsize=(10,6))
-    sns.barplot(x="install_segment", y="avg_ltv", data=seg_summary, palette="magma")
-    plt.title("LTV médio por segmento de parcelas")
-    plt.xlabel("Segmento de parcelas")
-    plt.ylabel("LTV médio (R$)")
-    plt.xticks(rotation=20)
-    plt.tight_layout()
-    plt.savefig("plots/insights/parcelas_e_ltv.png")
+    # sem média de parcelas conta como parcelas_altas_7_plus, como no if/elif original
+    ltv_by_customer["install_segment"] = segment(
+        ltv_by_customer["avg_installments"].round(), INSTALLMENT_BINS, INSTALLMENT_SEGMENTS,
+        na_label="parcelas_altas_7_plus"
+    )
+
+    seg_summary = group_summary(ltv_by_customer, "install_segment", {
+        "clientes": (cliente, "count"),
+        "avg_ltv": ("total_revenue", "mean"),
+        "median_ltv": ("total_revenue", "median"),
+        "avg_orders": ("n_orders", "mean"),
+    })
+    return seg_summary
+
+# 6) Segmento sensível a parcelas e LTV (mantido)
+@cached_artifacts(
+    outputs=["plots/insights/parcelas_e_ltv.png", "plots/insights/parcelas_e_ltv_summary.csv"],
+    inputs=SOURCES,
+    code=[ltv_por_cliente, resumo_parcelas_ltv] + CODIGO_BASE
+)
+@perfilado()
+def parcelas_e_ltv(incremental=False, chunked=False, engine=None):
+    with etapa("parcelas_e_ltv.agregar") as e:
+        ltv_by_customer = e.saida(ltv_por_cliente(incremental, chunked, engine))
+    seg_summary = resumo_parcelas_ltv(ltv_by_customer)
+
+    os.makedirs("plots/insights", exist_ok=True)
+    with etapa("parcelas_e_ltv.renderizar"):
+        plt, sns = pyplot(), seaborn(style="whitegrid")
+        plt.figure(figsize=(10,6))
+        sns.barplot(x="install_segment", y="avg_ltv", data=seg_summary, palette="magma")
+        plt.title("LTV médio por segmento de parcelas")
+        plt.xlabel("Segmento de parcelas")
+        plt.ylabel("LTV médio (R$)")
+        plt.xticks(rotation=20)
+        plt.tight_layout()
+        plt.savefig("plots/insights/parcelas_e_ltv.png")
     seg_summary.to_csv("plots/insights/parcelas_e_ltv_summary.csv", index=False)
     print("✅ Gráfico 'parcelas_e_ltv' e CSV salvos.")
     return seg_summary
 
-# 9) Micro‑mercados por zip prefix (mantido)
-def micro_mercados_zip():
-    orders = load_dataset("olist_orders_dataset.csv")
-    items = load_dataset("olist_order_items_dataset.csv")
-    customers = load_dataset("olist_customers_dataset.csv")
-    geoloc = load_dataset("olist_geolocation_dataset.csv")
+def resumo_zip(incremental=False, chunked=False, engine=None):
+    """
+    Pedidos, ticket, tempo de entrega e clientes por prefixo de CEP, na fonte escolhida
+    (ver micro_mercados_zip).
+    """
+    if incremental:
+        # Resumo por zip mantido incrementalmente (src/api/incremental.py)
+        return refresh_aggregate("zip_summary")
+    if chunked:
+        # Mesmo resumo calculado em blocos, particionado por order_id (src/api/streaming.py)
+        return chunked_aggregate("zip_summary")
+    if engine:
+        # Plano relacional equivalente executado em pandas, Polars ou DuckDB (src/api/engine.py)
+        return run_plan(PLANS["zip_summary"](), engine)
+    orders_ticket = load_order_facts(columns=[
+        "order_id", "customer_id", "customer_zip_code_prefix", "order_value",
+        "order_purchase_timestamp", "order_delivered_customer_date"
+    ])
+    orders_ticket["delivery_time_days"] = (orders_ticket["order_delivered_customer_date"] - orders_ticket["order_purchase_timestamp"]).dt.days
 
-    orders = _to_datetime(orders, ["order_purchase_timestamp", "order_delivered_customer_date", "order_estimated_delivery_date"])
-    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0)
-    items["freight_value"] = pd.to_numeric(items["freight_value"], errors="coerce").fillna(0)
+    return group_summary(orders_ticket, "customer_zip_code_prefix", {
+        "pedidos_count": ("order_id", "count"),
+        "avg_ticket": ("order_value", "mean"),
+        "median_ticket": ("order_value", "median"),
+        "avg_delivery_days": ("delivery_time_days", "mean"),
+        "unique_customers": ("customer_id", "nunique"),
+    })
 
-    ticket = items.groupby("order_id").agg(order_value=("price", "sum")).reset_index()
-    orders_ticket = orders.merge(ticket, on="order_id", how="left").merge(customers[["customer_id","customer_zip_code_prefix"]], on="customer_id", how="left")
+def candidatos_micro_mercados(zip_summary, min_pedidos=None):
+    """
+    Prefixos de CEP candidatos a micro-mercado, com as coordenadas do centroide, a partir do
+    resultado de resumo_zip.
 
-    orders_ticket["delivery_time_days"] = (orders_ticket["order_delivered_customer_date"] - orders_ticket["order_purchase_timestamp"]).dt.days
+    Parâmetros:
+    - zip_summary: resumo por prefixo de CEP
+    - min_pedidos: mínimo de pedidos do prefixo (padrão: o maior entre 50 e o 3º quartil)
 
-    zip_summary = orders_ticket.groupby("customer_zip_code_prefix").agg(
-        pedidos_count=("order_id", "count"),
-        avg_ticket=("order_value", "mean"),
-        median_ticket=("order_value", "median"),
-        avg_delivery_days=("delivery_time_days", "mean"),
-        unique_customers=("customer_id", lambda x: x.nunique())
-    ).reset_index()
+    Retorna:
+    - DataFrame com os candidatos, do maior para o menor número de pedidos
+    """
+    # Coordenadas (mediana por prefixo) da tabela de centroides pré-calculada (src/api/geolocation.py)
+    zip_map = load_zip_centroids().attach(zip_summary, "customer_zip_code_prefix", lat_col="lat_med", lng_col="lng_med")
 
-    geoloc_med = geoloc.groupby("geolocation_zip_code_prefix").agg(
-        lat_med=("geolocation_lat", "median"),
-        lng_med=("geolocation_lng", "median")
-    ).reset_index().rename(columns={"geolocation_zip_code_prefix":"customer_zip_code_prefix"})
-
-    try:
-        zip_summary["customer_zip_code_prefix"] = zip_summary["customer_zip_code_prefix"].astype(int)
-        geoloc_med["customer_zip_code_prefix"] = geoloc_med["customer_zip_code_prefix"].astype(int)
-    except Exception:
-        pass
-
-    zip_map = zip_summary.merge(geoloc_med, on="customer_zip_code_prefix", how="left")
-
-    threshold_pedidos = max(50, int(zip_map["pedidos_count"].quantile(0.75)))
-    candidates = zip_map[(zip_map["pedidos_count"] >= threshold_pedidos)].copy()
-    candidates = candidates.sort_values("pedidos_count", ascending=False)
-
-    plt.figure(figsize=(10,8))
-    sc = plt.scatter(
-        candidates["lng_med"], candidates["lat_med"],
-        s=candidates["pedidos_count"] / candidates["pedidos_count"].max() * 1000 + 50,
-        c=candidates["avg_ticket"],
-        cmap="viridis",
-        alpha=0.8,
-        edgecolor="k"
-    )
-    plt.colorbar(sc, label="Ticket médio (R$)")
-    plt.title("Micro‑mercados candidatos (zip prefixes) — tamanho ~ pedidos, cor ~ ticket médio")
-    plt.xlabel("Longitude (mediana)")
-    plt.ylabel("Latitude (mediana)")
-    plt.tight_layout()
-    plt.savefig("plots/insights/micro_mercados_zip.png")
+    if min_pedidos is None:
+        min_pedidos = max(50, int(zip_map["pedidos_count"].quantile(0.75)))
+    candidates = zip_map[(zip_map["pedidos_count"] >= min_pedidos)].copy()
+    return candidates.sort_values("pedidos_count", ascending=False)
+
+# 9) Micro‑mercados por zip prefix (mantido)
+@cached_artifacts(
+    outputs=["plots/insights/micro_mercados_zip.png", "plots/insights/micro_mercados_candidates.csv"],
+    inputs=SOURCES + [GEOLOCATION_FILE],
+    code=[resumo_zip, candidatos_micro_mercados, "src.api.geolocation"] + CODIGO_BASE
+)
+@perfilado()
+def micro_mercados_zip(incremental=False, chunked=False, engine=None):
+    with etapa("micro_mercados_zip.agregar") as e:
+        zip_summary = e.saida(resumo_zip(incremental, chunked, engine))
+    candidates = candidatos_micro_mercados(zip_summary)
+
+    os.makedirs("plots/insights", exist_ok=True)
+    with etapa("micro_mercados_zip.renderizar", rows_in=candidates):
+        seaborn(style="whitegrid")  # mesmo estilo dos demais gráficos do módulo
+        plt = pyplot()
+        plt.figure(figsize=(10,8))
+        sc = plt.scatter(
+            candidates["lng_med"], candidates["lat_med"],
+            s=candidates["pedidos_count"] / candidates["pedidos_count"].max() * 1000 + 50,
+            c=candidates["avg_ticket"],
+            cmap="viridis",
+            alpha=0.8,
+            edgecolor="k"
+        )
+        plt.colorbar(sc, label="Ticket médio (R$)")
+        plt.title("Micro‑mercados candidatos (zip prefixes) — tamanho ~ pedidos, cor ~ ticket médio")
+        plt.xlabel("Longitude (mediana)")
+        plt.ylabel("Latitude (mediana)")
+        plt.tight_layout()
+        plt.savefig("plots/insights/micro_mercados_zip.png")
     candidates.to_csv("plots/insights/micro_mercados_candidates.csv", index=False)
     print("✅ Gráfico 'micro_mercados_zip' e CSV salvos.")
     return candidates
 
+def coortes_clientes():
+    """
+    Coortes de primeira compra por customer_unique_id (a pessoa; customer_id muda a cada
+    pedido), sobre os pedidos com pagamento, como em ltv_por_cliente.
+
+    Retorna:
+    - (Cohorts, pedidos usados), com os pedidos alinhados às compras do motor de coortes
+    """
+    orders = load_order_facts(columns=[
+        "customer_unique_key", "order_purchase_timestamp", "payment_value_total",
+        "payment_count", "payment_installments_sum"
+    ])
+    orders = orders[orders["payment_count"] > 0]
+    cohorts = Cohorts(
+        orders["customer_unique_key"], orders["order_purchase_timestamp"], orders["payment_value_total"],
+        n_customers=len(key_dictionary("customer_unique_id"))
+    )
+    return cohorts, orders
+
+def ltv_por_cliente_unico(cohorts, orders):
+    """
+    LTV, pedidos e parcelas por customer_unique_id, com as colunas de ltv_por_cliente usadas por
+    resumo_parcelas_ltv (cliente identificado por customer_unique_key).
+    """
+    totals = cohorts.customer_totals(
+        installments_sum=orders["payment_installments_sum"], payments_count=orders["payment_count"]
+    )
+    return pd.DataFrame({
+        "customer_unique_key": totals.index.to_numpy(),
+        "total_revenue": totals["revenue"].to_numpy(),
+        "n_orders": totals["orders"].to_numpy(),
+        "installments_sum": totals["installments_sum"].to_numpy(),
+        "payments_count": totals["payments_count"].to_numpy(),
+    })
+
+def _heatmap_retencao(retention, path):
+    plt, sns = pyplot(), seaborn(style="whitegrid")
+    plt.figure(figsize=(12,8))
+    sns.heatmap(retention * 100, cmap="magma_r", cbar_kws={"label": "% da coorte"})
+    plt.title("Retenção mensal por coorte de primeira compra (customer_unique_id)")
+    plt.xlabel("Meses desde a primeira compra")
+    plt.ylabel("Coorte")
+    plt.tight_layout()
+    plt.savefig(path)
+
+# Coortes de primeira compra e recompra por cliente único
+@cached_artifacts(
+    outputs=[
+        "plots/insights/coortes_retencao.png", "plots/insights/coortes_retencao.csv",
+        "plots/insights/coortes_receita_acumulada.csv", "plots/insights/coortes_resumo.csv",
+        "plots/insights/parcelas_e_ltv_clientes_unicos_summary.csv",
+    ],
+    inputs=SOURCES,
+    code=[coortes_clientes, ltv_por_cliente_unico, resumo_parcelas_ltv, _heatmap_retencao,
+          "src.analytics.cohorts"] + CODIGO_BASE
+)
+@perfilado()
+def coortes_e_recompra():
+    """
+    Retenção mês a mês, receita acumulada por cliente e taxas de recompra de cada coorte de
+    primeira compra, e o resumo por segmento de parcelas (mesmas colunas de parcelas_e_ltv)
+    com o cliente identificado por customer_unique_id, que mede recompra de fato.
+    """
+    with etapa("coortes_e_recompra.agregar") as e:
+        cohorts, orders = coortes_clientes()
+        e.saida(orders)
+        retention = cohorts.retention()
+        revenue = cohorts.revenue_curve()
+        summary = cohorts.summary()
+        seg_summary = resumo_parcelas_ltv(ltv_por_cliente_unico(cohorts, orders), cliente="customer_unique_key")
+
+    os.makedirs("plots/insights", exist_ok=True)
+    with etapa("coortes_e_recompra.renderizar"):
+        # Período 0 é sempre 100%: o gráfico mostra a partir do primeiro mês seguinte
+        _heatmap_retencao(retention.iloc[:, 1:13], "plots/insights/coortes_retencao.png")
+    retention.to_csv("plots/insights/coortes_retencao.csv")
+    revenue.to_csv("plots/insights/coortes_receita_acumulada.csv")
+    summary.to_csv("plots/insights/coortes_resumo.csv")
+    seg_summary.to_csv("plots/insights/parcelas_e_ltv_clientes_unicos_summary.csv", index=False)
+    total = summary["customers"].sum()
+    print(f"✅ {total} clientes únicos em {len(summary)} coortes; "
+          f"recompra: {summary['repeat_customers'].sum() / max(total, 1):.1%}.")
+    print("✅ Gráfico 'coortes_retencao' e CSVs de coortes salvos.")
+    return summary
+
 if __name__ == "__main__":
-    print("Iniciando análises: margem latente por categoria (11), parcelas e LTV (6), micro‑mercados (9).")
+    print("Iniciando análises: margem latente por categoria (11), parcelas e LTV (6), micro‑mercados (9), coortes e recompra.")
     ranking_cat = margem_latente_categorias()
     seg_summary = parcelas_e_ltv()
     candidates = micro_mercados_zip()
+    cohort_summary = coortes_e_recompra()
     print("✅ Todas as análises concluídas. Resultados salvos em plots/insights.")
@@ -1,44 +1,46 @@
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-import matplotlib.image as mpimg
-from src.api.data_loader import load_dataset
+import time
+from src.api.order_facts import SOURCES, load_item_facts
+from src.api.artifacts import cached_artifacts
+from src.api.profiling import etapa, perfilado
+from src.rendering import compose, render, render_parallel, seaborn
 
-os.makedirs("plots/produtos-insights", exist_ok=True)
+PLOTS_DIR = "plots/produtos-insights"
 
-def fotos_vs_vendas():
-    df_items = load_dataset("olist_order_items_dataset.csv")
-    df_products = load_dataset("olist_products_dataset.csv")
-    df = df_items.merge(df_products, on="product_id", how="left")
+# Funções executadas pelo relatório completo (src/report_runner.py)
+ANALISES = ["fotos_vs_vendas", "categorias_preco_vendas", "tamanho_vs_vendas", "descricao_vs_vendas", "dashboard_produtos"]
 
-    vendas_fotos = df.groupby("product_photos_qty")["order_id"].count()
+# Cada gráfico separa o cálculo (agregados pequenos, a partir da tabela fato de itens) do desenho
+# em um eixo: os gráficos avulsos, o dashboard e a renderização paralela usam o mesmo código
 
-    plt.figure(figsize=(10,6))
-    sns.barplot(x=vendas_fotos.index, y=vendas_fotos.values, palette="rocket", edgecolor=None)
-    plt.title("Quantidade de fotos vs. Vendas", fontsize=16, fontweight="bold")
-    plt.xlabel("Número de fotos do produto", fontsize=12)
-    plt.ylabel("Quantidade de pedidos", fontsize=12)
+def _agregar_fotos(df):
+    return df.groupby("product_photos_qty")["order_id"].count()
 
-    for i, v in enumerate(vendas_fotos.values):
-        plt.text(vendas_fotos.index[i], v + 500, str(v), ha='center', fontsize=10)
+def _desenhar_fotos(ax, vendas_fotos):
+    sns = seaborn()
+    sns.barplot(x=vendas_fotos.index, y=vendas_fotos.values, palette="rocket", edgecolor=None, ax=ax)
+    ax.set_title("Quantidade de fotos vs. Vendas", fontsize=16, fontweight="bold")
+    ax.set_xlabel("Número de fotos do produto", fontsize=12)
+    ax.set_ylabel("Quantidade de pedidos", fontsize=12)
 
-    plt.grid(axis='y', linestyle='--', alpha=0.3)
-    plt.tight_layout()
-    plt.savefig("plots/produtos-insights/fotos_vs_vendas.png")
-    print("✅ Gráfico 'fotos_vs_vendas' salvo.")
+    for i, v in enumerate(vendas_fotos.values):
+        ax.text(vendas_fotos.index[i], v + 500, str(v), ha='center', fontsize=10)
 
-def categorias_preco_vendas():
-    df_items = load_dataset("olist_order_items_dataset.csv")
-    df_products = load_dataset("olist_products_dataset.csv")
-    df = df_items.merge(df_products, on="product_id", how="left")
+    ax.grid(axis='y', linestyle='--', alpha=0.3)
 
-    vendas_categoria = df.groupby("product_category_name")["order_id"].count()
-    preco_categoria = df.groupby("product_category_name")["price"].mean()
+def _agregar_categorias(df):
+    vendas_categoria = df.groupby("product_category_name", observed=True)["order_id"].count()
+    preco_categoria = df.groupby("product_category_name", observed=True)["price"].mean()
+    vendas_categoria.index = vendas_categoria.index.astype(str)
+    preco_categoria.index = preco_categoria.index.astype(str)
 
     top_categorias = vendas_categoria.sort_values(ascending=False).head(8)
     preco_top = preco_categoria[top_categorias.index]
+    return top_categorias, preco_top
 
-    fig, ax1 = plt.subplots(figsize=(10,6))
+def _desenhar_categorias(ax1, dados):
+    sns = seaborn()
+    top_categorias, preco_top = dados
 
     sns.barplot(
         x=top_categorias.values,
@@ -65,78 +67,126 @@ def categorias_preco_vendas():
     for i, v in enumerate(preco_top.values):
         ax2.text(v + 2, preco_top.index[i], f"R${v:.2f}", va='center', fontsize=9, color="#d62728")
 
-    plt.title("Top categorias mais vendidas e preço médio", fontsize=16, fontweight="bold")
+    ax2.set_title("Top categorias mais vendidas e preço médio", fontsize=16, fontweight="bold")
 
     ax1.grid(axis='x', linestyle='--', alpha=0.3)
     ax2.grid(False)
-    sns.despine(left=True, bottom=True)
-    plt.tight_layout()
-    plt.savefig("plots/produtos-insights/categorias_preco_vendas.png")
-    print("✅ Gráfico 'categorias_preco_vendas' salvo.")
+    for ax in (ax1, ax2):
+        sns.despine(ax=ax, left=True, bottom=True)
+
+def _agregar_tamanho(df):
+    volume = df["product_length_cm"] * df["product_height_cm"] * df["product_width_cm"]
+    return df.assign(product_volume=volume).groupby("product_volume")["order_id"].count().reset_index()
+
+def _desenhar_tamanho(ax, vendas_volume):
+    sns = seaborn()
+    sns.scatterplot(data=vendas_volume, x="product_volume", y="order_id", alpha=0.6, color="#1f77b4", ax=ax)
+    ax.set_title("Tamanho do produto vs. Vendas", fontsize=16, fontweight="bold")
+    ax.set_xlabel("Volume do produto (cm³)", fontsize=12)
+    ax.set_ylabel("Quantidade de pedidos", fontsize=12)
+    ax.grid(axis='both', linestyle='--', alpha=0.3)
+
+def _agregar_descricao(df):
+    return df.groupby("product_description_lenght")["order_id"].count().reset_index()
+
+def _desenhar_descricao(ax, vendas_descricao):
+    sns = seaborn()
+    sns.scatterplot(data=vendas_descricao, x="product_description_lenght", y="order_id", alpha=0.6, color="#ff7f0e", ax=ax)
+    ax.set_title("Descrição do produto vs. Vendas", fontsize=16, fontweight="bold")
+    ax.set_xlabel("Comprimento da descrição do produto", fontsize=12)
+    ax.set_ylabel("Quantidade de pedidos", fontsize=12)
+    ax.grid(axis='both', linestyle='--', alpha=0.3)
+
+# gráfico -> (colunas da tabela fato, agregação, desenho)
+GRAFICOS = {
+    "fotos_vs_vendas": (["order_id", "product_photos_qty"], _agregar_fotos, _desenhar_fotos),
+    "categorias_preco_vendas": (["order_id", "price", "product_category_name"], _agregar_categorias, _desenhar_categorias),
+    "tamanho_vs_vendas": (["order_id", "product_length_cm", "product_height_cm", "product_width_cm"], _agregar_tamanho, _desenhar_tamanho),
+    "descricao_vs_vendas": (["order_id", "product_description_lenght"], _agregar_descricao, _desenhar_descricao),
+}
+
+DASHBOARD = [f"{PLOTS_DIR}/dashboard_produtos.png", f"{PLOTS_DIR}/dashboard_produtos.pdf"]
+
+def _agregados(nomes):
+    # Uma única leitura da tabela fato com a união das colunas dos gráficos pedidos
+    colunas = list(dict.fromkeys(c for nome in nomes for c in GRAFICOS[nome][0]))
+    df = load_item_facts(columns=colunas)
+    return {nome: GRAFICOS[nome][1](df) for nome in nomes}
+
+def _grafico(nome):
+    dados = _agregados([nome])[nome]
+    os.makedirs(PLOTS_DIR, exist_ok=True)
+    with etapa("savefig", arquivo=f"{nome}.png"):
+        render(GRAFICOS[nome][2], dados, f"{PLOTS_DIR}/{nome}.png")
+    print(f"✅ Gráfico '{nome}' salvo.")
+
+def _dashboard(agregados):
+    # Os quatro gráficos desenhados direto nos eixos de uma única figura, sem reler PNGs
+    os.makedirs(PLOTS_DIR, exist_ok=True)
+    with etapa("savefig", arquivo="dashboard_produtos"):
+        compose(
+            [(GRAFICOS[nome][2], agregados[nome]) for nome in GRAFICOS], DASHBOARD,
+            nrows=2, ncols=2, figsize=(18, 12), title="ANÁLISE DE PRODUTOS – OLIST"
+        )
+
+def _codigo(*nomes):
+    return ["src.api.data_loader", "src.api.schemas", "src.api.keys", "src.api.order_facts", "src.rendering",
+            _agregados, _grafico, _dashboard] + [f for n in nomes for f in GRAFICOS[n][1:]]
+
+@cached_artifacts(outputs=[f"{PLOTS_DIR}/fotos_vs_vendas.png"], inputs=SOURCES, code=_codigo("fotos_vs_vendas"))
+@perfilado()
+def fotos_vs_vendas():
+    _grafico("fotos_vs_vendas")
+
+@cached_artifacts(outputs=[f"{PLOTS_DIR}/categorias_preco_vendas.png"], inputs=SOURCES, code=_codigo("categorias_preco_vendas"))
+@perfilado()
+def categorias_preco_vendas():
+    _grafico("categorias_preco_vendas")
 
+@cached_artifacts(outputs=[f"{PLOTS_DIR}/tamanho_vs_vendas.png"], inputs=SOURCES, code=_codigo("tamanho_vs_vendas"))
+@perfilado()
 def tamanho_vs_vendas():
-    df_items = load_dataset("olist_order_items_dataset.csv")
-    df_products = load_dataset("olist_products_dataset.csv")
-    df = df_items.merge(df_products, on="product_id", how="left")
-
-    df["product_volume"] = df["product_length_cm"] * df["product_height_cm"] * df["product_width_cm"]
-    vendas_volume = df.groupby("product_volume")["order_id"].count().reset_index()
-
-    plt.figure(figsize=(10,6))
-    sns.scatterplot(data=vendas_volume, x="product_volume", y="order_id", alpha=0.6, color="#1f77b4")
-    plt.title("Tamanho do produto vs. Vendas", fontsize=16, fontweight="bold")
-    plt.xlabel("Volume do produto (cm³)", fontsize=12)
-    plt.ylabel("Quantidade de pedidos", fontsize=12)
-    plt.grid(axis='both', linestyle='--', alpha=0.3)
-    plt.tight_layout()
-    plt.savefig("plots/produtos-insights/tamanho_vs_vendas.png")
-    print("✅ Gráfico 'tamanho_vs_vendas' salvo.")
+    _grafico("tamanho_vs_vendas")
 
+@cached_artifacts(outputs=[f"{PLOTS_DIR}/descricao_vs_vendas.png"], inputs=SOURCES, code=_codigo("descricao_vs_vendas"))
+@perfilado()
 def descricao_vs_vendas():
-    df_items = load_dataset("olist_order_items_dataset.csv")
-    df_products = load_dataset("olist_products_dataset.csv")
-    df = df_items.merge(df_products, on="product_id", how="left")
-
-    vendas_descricao = df.groupby("product_description_lenght")["order_id"].count().reset_index()
-
-    plt.figure(figsize=(10,6))
-    sns.scatterplot(data=vendas_descricao, x="product_description_lenght", y="order_id", alpha=0.6, color="#ff7f0e")
-    plt.title("Descrição do produto vs. Vendas", fontsize=16, fontweight="bold")
-    plt.xlabel("Comprimento da descrição do produto", fontsize=12)
-    plt.ylabel("Quantidade de pedidos", fontsize=12)
-    plt.grid(axis='both', linestyle='--', alpha=0.3)
-    plt.tight_layout()
-    plt.savefig("plots/produtos-insights/descricao_vs_vendas.png")
-    print("✅ Gráfico 'descricao_vs_vendas' salvo.")
+    _grafico("descricao_vs_vendas")
 
+@cached_artifacts(outputs=DASHBOARD, inputs=SOURCES, code=_codigo(*GRAFICOS))
+@perfilado()
 def dashboard_produtos():
-    fig, axs = plt.subplots(2, 2, figsize=(18, 12))
-
-    img1 = mpimg.imread("plots/produtos-insights/fotos_vs_vendas.png")
-    img2 = mpimg.imread("plots/produtos-insights/categorias_preco_vendas.png")
-    img3 = mpimg.imread("plots/produtos-insights/tamanho_vs_vendas.png")
-    img4 = mpimg.imread("plots/produtos-insights/descricao_vs_vendas.png")
-
-    axs[0, 0].imshow(img1)
-    axs[0, 0].axis('off')
-
-    axs[0, 1].imshow(img2)
-    axs[0, 1].axis('off')
-
-    axs[1, 0].imshow(img3)
-    axs[1, 0].axis('off')
-
-    axs[1, 1].imshow(img4)
-    axs[1, 1].axis('off')
-
-    plt.suptitle("ANÁLISE DE PRODUTOS – OLIST", fontsize=20, fontweight="bold")
-    plt.subplots_adjust(wspace=0.1, hspace=0.1)  # aumenta espaçamento entre gráficos
-    plt.savefig("plots/produtos-insights/dashboard_produtos.png")
-    print("✅ Dashboard final com espaçamento maior salva.")
+    """
+    Dashboard com os quatro gráficos de produtos, montado a partir dos agregados (não depende
+    dos PNGs individuais). Saídas: dashboard_produtos.png e dashboard_produtos.pdf (vetorial).
+    """
+    _dashboard(_agregados(list(GRAFICOS)))
+    print("✅ Dashboard de produtos salvo (PNG e PDF vetorial).")
+
+def renderizar_produtos(workers=None):
+    """
+    Gera os quatro gráficos e o dashboard com uma única leitura da tabela fato: os gráficos
+    avulsos são renderizados em paralelo (um processo por gráfico), enquanto o dashboard é
+    montado no processo atual. Saídas ainda válidas no cache de artefatos (o mesmo das funções
+    decoradas acima) são apenas restauradas, sem ler a tabela fato nem redesenhar.
+    """
+    funcoes = {f.__name__: f for f in (fotos_vs_vendas, categorias_preco_vendas, tamanho_vs_vendas,
+                                       descricao_vs_vendas, dashboard_produtos)}
+    pendentes = [nome for nome, funcao in funcoes.items() if not funcao.restore()]
+    if pendentes:
+        inicio = time.time()
+        graficos = [nome for nome in pendentes if nome in GRAFICOS]
+        agregados = _agregados(list(GRAFICOS) if "dashboard_produtos" in pendentes else graficos)
+        os.makedirs(PLOTS_DIR, exist_ok=True)
+        jobs = [{"draw": GRAFICOS[nome][2], "data": agregados[nome], "path": f"{PLOTS_DIR}/{nome}.png"} for nome in graficos]
+        with etapa("renderizar_paralelo", rows_in=len(jobs)):
+            render_parallel(jobs, workers)
+        if "dashboard_produtos" in pendentes:
+            _dashboard(agregados)
+        for nome in pendentes:
+            funcoes[nome].record(since=inicio)
+    for nome, funcao in funcoes.items():
+        print(f"✅ {nome}: {funcao.last_status}")
 
 if __name__ == "__main__":
-    fotos_vs_vendas()
-    categorias_preco_vendas()
-    tamanho_vs_vendas()
-    descricao_vs_vendas()
-    dashboard_produtos()
+    renderizar_produtos()
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+
+def segment(values, bins, labels, right: bool = True, na_label=None) -> pd.Series:
+    """
+    Segmentação por faixas, vetorizada (substitui um .apply linha a linha com if/elif).
+
+    Parâmetros:
+    - values: Series (ou array) numérica
+    - bins: limites das faixas em ordem crescente, incluindo os extremos (ex: [-np.inf, 1, 3, 6, np.inf])
+    - labels: rótulo de cada faixa (len(bins) - 1 rótulos)
+    - right: faixas fechadas à direita, (a, b] (padrão), ou à esquerda, [a, b)
+    - na_label: rótulo dos valores ausentes ou fora das faixas (padrão: NaN)
+
+    Retorna:
+    - Series com o rótulo da faixa de cada valor (mesmo índice de values, quando for Series)
+    """
+    if len(labels) != len(bins) - 1:
+        raise ValueError("labels deve ter exatamente len(bins) - 1 rótulos")
+    index = values.index if isinstance(values, pd.Series) else None
+    v = pd.Series(values).to_numpy(dtype="float64", na_value=np.nan)
+    edges = np.asarray(bins, dtype="float64")
+
+    # Posição da faixa de cada valor: (edges[i], edges[i+1]] quando right=True.
+    # Extremos infinitos são inclusivos (-inf cai na primeira faixa, +inf na última).
+    pos = np.searchsorted(edges, v, side="left" if right else "right") - 1
+    if right and edges[0] == -np.inf:
+        pos[v == -np.inf] = 0
+    if not right and edges[-1] == np.inf:
+        pos[v == np.inf] = len(labels) - 1
+    valid = ~np.isnan(v) & (pos >= 0) & (pos < len(labels))
+
+    out = np.empty(len(v), dtype=object)
+    out[:] = na_label if na_label is not None else np.nan
+    out[valid] = np.asarray(labels, dtype=object)[pos[valid]]
+    return pd.Series(out, index=index)
+
+
+def distinct_count(df: pd.DataFrame, keys, column: str) -> pd.Series:
+    """
+    Quantidade de valores distintos (não nulos) de column em cada grupo, com o nunique nativo
+    do groupby em vez de lambda x: x.nunique().
+    """
+    return df.groupby(keys, observed=True)[column].nunique()
+
+
+def group_summary(df: pd.DataFrame, keys, aggs: dict) -> pd.DataFrame:
+    """
+    Agregação por grupo no formato do named aggregation do pandas ({saida: (coluna, funcao)}),
+    aceitando apenas reduções nativas (nomes como 'sum', 'mean', 'median', 'nunique'), que rodam
+    em código compilado sem chamar Python por grupo.
+
+    Retorna:
+    - DataFrame com as chaves como colunas
+    """
+    for name, (column, func) in aggs.items():
+        if not isinstance(func, str):
+            raise TypeError(f"Agregação '{name}' deve usar o nome de uma redução nativa, não uma função Python")
+    return df.groupby(keys, observed=True).agg(**aggs).reset_index()
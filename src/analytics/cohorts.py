@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+# Combinações (cliente, período) marcadas em array denso até este tamanho; acima, ordenação
+_DENSE_LIMIT = 1 << 24
+
+_NAT = np.iinfo(np.int64).min
+
+
+def _months(values) -> np.ndarray:
+    # Meses desde 1970-01 (mesmo ordinal de pd.Period com freq='M'); NaT vira o mínimo de int64
+    values = pd.Series(values)
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values, errors="coerce")
+    days = values.to_numpy().astype("datetime64[D]").view(np.int64)
+    months = np.full(len(days), _NAT)
+    valid = days != _NAT
+    if valid.any():
+        # Mês de cada dia do intervalo (alguns milhares de dias), consultado por posição: a
+        # conversão direta de cada data para datetime64[M] é ~10x mais lenta
+        first, last = days[valid].min(), days[valid].max()
+        table = np.arange(first, last + 1).astype("datetime64[D]").astype("datetime64[M]").view(np.int64)
+        months[valid] = table[days[valid] - first]
+    return months
+
+
+def _distinct_pairs(customer, period, n_periods: int) -> np.ndarray:
+    # Pares (cliente, período) distintos, codificados como cliente * n_periods + período
+    key = customer.astype(np.int64) * n_periods + period
+    size = (int(customer.max()) + 1) * n_periods if len(customer) else 0
+    if size > _DENSE_LIMIT:
+        # Ordenação + vizinhos distintos (np.unique, que aqui usa hash, é bem mais lento)
+        key = np.sort(key)
+        return key[np.concatenate([[True], key[1:] != key[:-1]])]
+    present = np.zeros(size, dtype=bool)
+    present[key] = True
+    return np.flatnonzero(present)
+
+
+class Cohorts:
+    """
+    Coortes de primeira compra: cada cliente entra na coorte do mês da sua primeira compra, e
+    cada compra cai no período (meses desde essa primeira compra) em que aconteceu.
+
+    Tudo é calculado sobre arrays de inteiros, com bincount e reduções por código de cliente
+    (np.minimum.at), em tempo linear no número de compras e sem laço Python por cliente.
+
+    Parâmetros:
+    - customer: código inteiro do cliente de cada compra (ex: customer_unique_key das tabelas
+      fato; negativo = ausente)
+    - purchased_at: data/hora de cada compra (compras sem data são ignoradas)
+    - revenue: valor de cada compra (padrão: 0)
+    - n_customers: tamanho do espaço de códigos de cliente (padrão: maior código + 1)
+    """
+
+    def __init__(self, customer, purchased_at, revenue=None, n_customers: int = None):
+        customer = np.asarray(customer)
+        month = _months(purchased_at)
+        revenue = np.zeros(len(customer)) if revenue is None else np.asarray(revenue, dtype="float64")
+        valid = (customer >= 0) & (month != _NAT)
+        self.rows = np.flatnonzero(valid)
+        self.customer = customer[valid].astype(np.int64)
+        month = month[valid]
+        self.revenue = np.nan_to_num(revenue[valid])
+        self.n_customers = n_customers if n_customers is not None else int(self.customer.max(initial=-1)) + 1
+
+        self.orders = np.bincount(self.customer, minlength=self.n_customers)
+        first = np.full(self.n_customers, np.iinfo(np.int64).max)
+        np.minimum.at(first, self.customer, month)
+        self.buyers = np.flatnonzero(self.orders)
+        self.first_month = int(first[self.buyers].min()) if len(self.buyers) else 0
+        self.last_month = int(month.max()) if len(month) else 0
+        # Coorte de cada cliente (meses desde a primeira coorte) e período de cada compra
+        self.customer_cohort = np.where(self.orders > 0, first - self.first_month, -1)
+        self.cohort = self.customer_cohort[self.customer]
+        self.period = month - first[self.customer]
+        self.n_cohorts = self.last_month - self.first_month + 1 if len(self.buyers) else 0
+        self.n_periods = self.n_cohorts
+
+    @property
+    def labels(self) -> pd.PeriodIndex:
+        # Mês de cada coorte
+        return pd.PeriodIndex.from_ordinals(self.first_month + np.arange(self.n_cohorts), freq="M")
+
+    def _horizon(self) -> np.ndarray:
+        # Máscara coorte × período com os períodos já observáveis (o triângulo das coortes)
+        periods = np.arange(self.n_periods)
+        return periods[None, :] <= (self.n_cohorts - 1 - np.arange(self.n_cohorts))[:, None]
+
+    def _matrix(self, values: np.ndarray, name: str) -> pd.DataFrame:
+        values = np.where(self._horizon(), values, np.nan)
+        return pd.DataFrame(values, index=pd.Index(self.labels, name="cohort"),
+                            columns=pd.RangeIndex(self.n_periods, name=name))
+
+    def sizes(self) -> np.ndarray:
+        """
+        Clientes em cada coorte.
+        """
+        return np.bincount(self.customer_cohort[self.buyers], minlength=self.n_cohorts)
+
+    def retention(self, normalize: bool = True) -> pd.DataFrame:
+        """
+        Matriz de retenção mês a mês: clientes distintos de cada coorte que compraram em cada
+        período (0 = mês da primeira compra). Períodos ainda não observados ficam NaN.
+
+        Parâmetros:
+        - normalize: fração do tamanho da coorte (padrão) ou contagem de clientes
+
+        Retorna:
+        - DataFrame coorte × período (vazio quando não há compras)
+        """
+        if self.n_cohorts == 0:
+            return self._matrix(np.zeros((0, 0)), "period")
+        counts = np.zeros(self.n_cohorts * self.n_periods)
+        counts[::self.n_periods] = self.sizes()
+        # No período 0 todo cliente está ativo; os pares distintos só são necessários para as
+        # compras posteriores, em geral uma pequena fração das compras
+        later = self.period > 0
+        if later.any():
+            pairs = _distinct_pairs(self.customer[later], self.period[later], self.n_periods)
+            cells = self.customer_cohort[pairs // self.n_periods] * self.n_periods + pairs % self.n_periods
+            counts += np.bincount(cells, minlength=len(counts))
+        counts = counts.reshape(self.n_cohorts, self.n_periods)
+        if normalize:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                counts = counts / counts[:, :1]
+        return self._matrix(counts, "period")
+
+    def revenue_curve(self, cumulative: bool = True, per_customer: bool = True) -> pd.DataFrame:
+        """
+        Receita de cada coorte por período desde a primeira compra.
+
+        Parâmetros:
+        - cumulative: receita acumulada até o período (padrão) ou apenas a do período
+        - per_customer: dividida pelo tamanho da coorte (LTV médio acumulado, padrão) ou total
+
+        Retorna:
+        - DataFrame coorte × período (vazio quando não há compras)
+        """
+        if self.n_cohorts == 0:
+            return self._matrix(np.zeros((0, 0)), "period")
+        cells = self.cohort * self.n_periods + self.period
+        revenue = np.bincount(cells, weights=self.revenue, minlength=self.n_cohorts * self.n_periods)
+        revenue = revenue.reshape(self.n_cohorts, self.n_periods)
+        if cumulative:
+            revenue = np.cumsum(revenue, axis=1)
+        if per_customer:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                revenue = revenue / self.sizes()[:, None]
+        return self._matrix(revenue, "period")
+
+    def second_purchase_period(self) -> np.ndarray:
+        """
+        Período (meses desde a primeira compra) da segunda compra de cada cliente (-1 = não
+        recomprou). Duas compras no mesmo mês da primeira contam como recompra no período 0.
+        """
+        first_period = self.period == 0
+        second = np.full(self.n_customers, np.iinfo(np.int64).max)
+        np.minimum.at(second, self.customer[~first_period], self.period[~first_period])
+        second[np.bincount(self.customer[first_period], minlength=self.n_customers) > 1] = 0
+        return np.where(second == np.iinfo(np.int64).max, -1, second)
+
+    def summary(self, repeat_within=(3, 6, 12)) -> pd.DataFrame:
+        """
+        Resumo por coorte: clientes, compras, receita, taxa de recompra (clientes com duas ou mais
+        compras) e taxa de recompra em até N meses da primeira compra.
+
+        Parâmetros:
+        - repeat_within: janelas, em meses, das taxas de recompra repeat_rate_<N>m
+
+        Retorna:
+        - DataFrame indexado pela coorte (sem linhas quando não há compras)
+        """
+        sizes = self.sizes()
+        cohort = self.customer_cohort[self.buyers]
+        second = self.second_purchase_period()[self.buyers]
+        repeat = np.bincount(cohort[second >= 0], minlength=self.n_cohorts)
+        orders = np.bincount(self.cohort, minlength=self.n_cohorts)
+        revenue = np.bincount(self.cohort, weights=self.revenue, minlength=self.n_cohorts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df = pd.DataFrame({
+                "customers": sizes,
+                "orders": orders,
+                "revenue": revenue,
+                "repeat_customers": repeat,
+                "repeat_rate": repeat / sizes,
+                "orders_per_customer": orders / sizes,
+                "revenue_per_customer": revenue / sizes,
+            }, index=pd.Index(self.labels, name="cohort"))
+            observed = self.n_cohorts - 1 - np.arange(self.n_cohorts)
+            for months in repeat_within:
+                within = np.bincount(cohort[(second >= 0) & (second <= months)], minlength=self.n_cohorts)
+                # NaN enquanto a janela ainda não foi observada por inteiro para a coorte
+                df[f"repeat_rate_{months}m"] = np.where(observed >= months, within / sizes, np.nan)
+        return df
+
+    def customer_totals(self, **weights) -> pd.DataFrame:
+        """
+        Totais por cliente (apenas clientes com compra): compras, coorte e a soma de cada
+        coluna em weights.
+
+        Parâmetros:
+        - weights: arrays alinhados com as compras recebidas no construtor
+          (ex: installments_sum=...)
+
+        Retorna:
+        - DataFrame indexado pelo código do cliente
+        """
+        df = pd.DataFrame({
+            "orders": self.orders[self.buyers],
+            "cohort": pd.PeriodIndex.from_ordinals(self.first_month + self.customer_cohort[self.buyers], freq="M"),
+            "revenue": np.bincount(self.customer, weights=self.revenue, minlength=self.n_customers)[self.buyers],
+        }, index=pd.Index(self.buyers, name="customer"))
+        for name, values in weights.items():
+            values = np.nan_to_num(np.asarray(values, dtype="float64")[self.rows])
+            df[name] = np.bincount(self.customer, weights=values, minlength=self.n_customers)[self.buyers]
+        return df
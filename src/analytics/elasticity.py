@@ -0,0 +1,124 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# Limite de elementos (linhas x réplicas) processados por vez no bootstrap
+BOOTSTRAP_CHUNK_ELEMENTS = 5_000_000
+
+
+def grouped_ols(groups, x, y, min_obs: int = 2) -> pd.DataFrame:
+    """
+    Ajusta, de uma só vez, uma regressão linear simples y ~ x para cada grupo,
+    a partir das estatísticas suficientes por grupo (n, Σx, Σy, Σxx, Σxy, Σyy).
+
+    Parâmetros:
+    - groups: rótulo do grupo de cada observação
+    - x, y: arrays com as observações
+    - min_obs: mínimo de observações para o grupo receber estimativa (os demais ficam NaN)
+
+    Retorna:
+    - DataFrame indexado pelo grupo com n, slope, intercept e slope_se
+    """
+    codes, uniques = pd.factorize(np.asarray(groups), sort=True)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    valid = codes >= 0
+    codes, x, y = codes[valid], x[valid], y[valid]
+    n_groups = len(uniques)
+
+    n = np.bincount(codes, minlength=n_groups).astype("float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x = np.bincount(codes, x, minlength=n_groups) / n
+        mean_y = np.bincount(codes, y, minlength=n_groups) / n
+    # Somas centradas na média do grupo (duas passadas, numericamente estáveis)
+    dx = x - mean_x[codes]
+    dy = y - mean_y[codes]
+    sxx = np.bincount(codes, dx * dx, minlength=n_groups)
+    sxy = np.bincount(codes, dx * dy, minlength=n_groups)
+    syy = np.bincount(codes, dy * dy, minlength=n_groups)
+
+    ok = (n >= min_obs) & (sxx > 1e-12 * np.maximum(1.0, n))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(ok, sxy / sxx, np.nan)
+        sse = np.clip(syy - slope * sxy, 0, None)
+        slope_se = np.where(ok & (n > 2), np.sqrt(sse / (n - 2) / sxx), np.nan)
+    return pd.DataFrame({
+        "n": n.astype("int64"),
+        "slope": slope,
+        "intercept": mean_y - slope * mean_x,
+        "slope_se": slope_se,
+    }, index=pd.Index(uniques, name="group"))
+
+
+def _bootstrap_slopes(codes, dx, dy, n_groups, n_boot, rng):
+    # Bootstrap de Poisson: cada observação recebe peso ~ Poisson(1) em cada réplica,
+    # o que permite calcular todas as réplicas com bincount sobre (grupo, réplica)
+    n_rows = len(codes)
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // max(n_rows, 1))
+    slopes = np.empty((n_groups, n_boot))
+    for start in range(0, n_boot, chunk):
+        b = min(chunk, n_boot - start)
+        w = rng.poisson(1.0, size=(n_rows, b)).astype("float64")
+        flat = (codes[:, None] * b + np.arange(b)[None, :]).ravel()
+        size = n_groups * b
+
+        def wsum(values):
+            return np.bincount(flat, (w * values[:, None]).ravel(), minlength=size).reshape(n_groups, b)
+
+        sw = np.bincount(flat, w.ravel(), minlength=size).reshape(n_groups, b)
+        sx, sy = wsum(dx), wsum(dy)
+        sxx, sxy = wsum(dx * dx), wsum(dx * dy)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            den = sw * sxx - sx * sx
+            slopes[:, start:start + b] = np.where(den > 1e-12, (sw * sxy - sx * sy) / den, np.nan)
+    return slopes
+
+
+def price_elasticity(prod_agg: pd.DataFrame, group_col: str = "category", price_col: str = "avg_price_prod",
+                     qty_col: str = "qty_sold_prod", min_products: int = 5, n_boot: int = 0,
+                     ci: float = 0.95, seed=None) -> pd.DataFrame:
+    """
+    Estima a elasticidade preço-demanda de todos os grupos de uma vez: inclinação da regressão
+    log(qty) ~ log(price) entre os produtos de cada grupo.
+
+    Parâmetros:
+    - prod_agg: uma linha por produto, com grupo, preço médio e quantidade vendida
+    - group_col, price_col, qty_col: nomes das colunas
+    - min_products: mínimo de produtos com preço e quantidade positivos para estimar o grupo
+    - n_boot: número de réplicas de bootstrap (0 = sem intervalos de confiança)
+    - ci: nível do intervalo de confiança do bootstrap
+    - seed: semente do gerador aleatório do bootstrap
+
+    Retorna:
+    - DataFrame indexado pelo grupo com n_products, elasticity e elasticity_se
+      (e elasticity_ci_low/elasticity_ci_high quando n_boot > 0)
+    """
+    df = prod_agg[(prod_agg[price_col] > 0) & (prod_agg[qty_col] > 0)]
+    x = np.log(df[price_col].to_numpy(dtype="float64"))
+    y = np.log(df[qty_col].to_numpy(dtype="float64"))
+    fit = grouped_ols(df[group_col].to_numpy(), x, y, min_obs=min_products)
+
+    out = pd.DataFrame({
+        "n_products": fit["n"],
+        "elasticity": fit["slope"],
+        "elasticity_se": fit["slope_se"],
+    })
+    out.index.name = group_col
+
+    if n_boot > 0 and len(fit):
+        codes = fit.index.get_indexer(df[group_col].to_numpy())
+        valid = codes >= 0
+        codes, x, y = codes[valid], x[valid], y[valid]
+        means_x = np.bincount(codes, x, minlength=len(fit)) / np.maximum(fit["n"].to_numpy(), 1)
+        means_y = np.bincount(codes, y, minlength=len(fit)) / np.maximum(fit["n"].to_numpy(), 1)
+        slopes = _bootstrap_slopes(codes, x - means_x[codes], y - means_y[codes], len(fit), n_boot,
+                                   np.random.default_rng(seed))
+        alpha = (1 - ci) / 2
+        with warnings.catch_warnings():
+            # grupos sem estimativa têm todas as réplicas NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            low, high = np.nanquantile(slopes, [alpha, 1 - alpha], axis=1)
+        estimated = out["elasticity"].notna().to_numpy()
+        out["elasticity_ci_low"] = np.where(estimated, low, np.nan)
+        out["elasticity_ci_high"] = np.where(estimated, high, np.nan)
+    return out
@@ -0,0 +1,170 @@
+import itertools
+import os
+import numpy as np
+import pandas as pd
+
+# Quantidade de cenários avaliados por bloco (limita a memória das matrizes categorias x cenários)
+DEFAULT_CHUNK_SCENARIOS = 2000
+
+METRICS = ["sim_price", "sim_qty", "sim_margin_unit", "sim_revenue_total", "sim_margin_total", "delta_margin_total"]
+
+
+def scenario_grid(price_changes, cost_ratios=(0.6,), elasticity_priors=(-1.5,)) -> pd.DataFrame:
+    """
+    Monta a grade de cenários (produto cartesiano dos parâmetros).
+
+    Parâmetros:
+    - price_changes: variações de preço (ex: np.arange(-0.30, 0.3001, 0.005))
+    - cost_ratios: razões de custo sobre o preço médio (cost_ratio_default da margem latente)
+    - elasticity_priors: elasticidade usada nas categorias sem estimativa própria
+
+    Retorna:
+    - DataFrame com uma linha por cenário: scenario_id, price_change, cost_ratio, elasticity_prior
+    """
+    rows = list(itertools.product(price_changes, cost_ratios, elasticity_priors))
+    grid = pd.DataFrame(rows, columns=["price_change", "cost_ratio", "elasticity_prior"], dtype="float64")
+    grid.insert(0, "scenario_id", np.arange(len(grid)))
+    return grid
+
+
+def _evaluate(cat: pd.DataFrame, scenarios: pd.DataFrame, aligned: bool = False) -> dict:
+    # Todas as métricas como matrizes (categorias x cenários), por broadcasting.
+    # Com aligned=True, o i-ésimo cenário é aplicado apenas à i-ésima categoria (matrizes C x 1).
+    shape = (-1, 1) if aligned else (1, -1)
+    qty = cat["qty_sold"].to_numpy(dtype="float64")[:, None]
+    price = cat["avg_price"].to_numpy(dtype="float64")[:, None]
+    freight = cat["avg_freight"].to_numpy(dtype="float64")[:, None]
+    factor = cat["cost_factor"].to_numpy(dtype="float64")[:, None]
+    elasticity = cat["price_elasticity"].to_numpy(dtype="float64")[:, None]
+
+    inc = scenarios["price_change"].to_numpy(dtype="float64").reshape(shape)
+    ratio = scenarios["cost_ratio"].to_numpy(dtype="float64").reshape(shape)
+    prior = scenarios["elasticity_prior"].to_numpy(dtype="float64").reshape(shape)
+
+    cost_unit = price * ratio * factor
+    current_margin = (price - freight - cost_unit) * qty
+    elasticity = np.where(np.isnan(elasticity), prior, elasticity)
+
+    sim_price = price * (1 + inc)
+    sim_qty = np.clip(qty * (1 + inc) ** elasticity, 0, None)
+    sim_margin_unit = sim_price - freight - cost_unit
+    sim_margin_total = sim_margin_unit * sim_qty
+    return {
+        "sim_price": sim_price,
+        "sim_qty": sim_qty,
+        "sim_margin_unit": sim_margin_unit,
+        "sim_revenue_total": sim_price * sim_qty,
+        "sim_margin_total": sim_margin_total,
+        "delta_margin_total": sim_margin_total - current_margin,
+    }
+
+
+def _chunks(scenarios: pd.DataFrame, chunk_size):
+    chunk_size = chunk_size or DEFAULT_CHUNK_SCENARIOS
+    for start in range(0, len(scenarios), chunk_size):
+        yield scenarios.iloc[start:start + chunk_size]
+
+
+def _long(cat: pd.DataFrame, scenarios: pd.DataFrame, result: dict, category_col: str) -> pd.DataFrame:
+    n_cat, n_scen = len(cat), len(scenarios)
+    out = pd.DataFrame({
+        category_col: np.repeat(cat[category_col].to_numpy(), n_scen),
+        "scenario_id": np.tile(scenarios["scenario_id"].to_numpy(), n_cat),
+        "price_change": np.tile(scenarios["price_change"].to_numpy(), n_cat),
+        "cost_ratio": np.tile(scenarios["cost_ratio"].to_numpy(), n_cat),
+        "elasticity_prior": np.tile(scenarios["elasticity_prior"].to_numpy(), n_cat),
+    })
+    for metric in METRICS:
+        out[metric] = result[metric].ravel()
+    return out
+
+
+def simulate_scenarios(cat: pd.DataFrame, scenarios: pd.DataFrame, category_col: str = "category",
+                       out_path: str = None, chunk_size: int = None):
+    """
+    Avalia a grade categorias x cenários como matrizes NumPy.
+
+    Parâmetros:
+    - cat: uma linha por categoria com qty_sold, avg_price, avg_freight, cost_factor e
+      price_elasticity (NaN = sem estimativa), como em margem_latente_categorias
+    - scenarios: grade de cenários (ver scenario_grid)
+    - category_col: coluna com o nome da categoria
+    - out_path: se informado, grava o resultado em blocos (.csv ou .parquet) em vez de devolvê-lo
+    - chunk_size: cenários por bloco
+
+    Retorna:
+    - DataFrame longo (categoria x cenário) com as métricas simuladas, ou out_path quando gravado em disco
+    """
+    if out_path is None:
+        return pd.concat(
+            [_long(cat, chunk, _evaluate(cat, chunk), category_col) for chunk in _chunks(scenarios, chunk_size)],
+            ignore_index=True
+        )
+
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    writer = None
+    try:
+        for chunk in _chunks(scenarios, chunk_size):
+            part = _long(cat, chunk, _evaluate(cat, chunk), category_col)
+            if out_path.endswith(".parquet"):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(part, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out_path, table.schema)
+                writer.write_table(table)
+            else:
+                part.to_csv(out_path, mode="a", header=not os.path.exists(out_path), index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+    return out_path
+
+
+def scenario_columns(cat: pd.DataFrame, scenarios: pd.DataFrame, names) -> pd.DataFrame:
+    """
+    Resultado no formato largo usado por margem_latente_categorias: colunas '<metrica>_<nome>'
+    para cada cenário, montadas de uma vez (sem inserir coluna a coluna no DataFrame).
+
+    Parâmetros:
+    - cat: tabela de categorias (ver simulate_scenarios)
+    - scenarios: grade de cenários, na mesma ordem de names
+    - names: sufixo de cada cenário nas colunas (ex: 'inc_5pct')
+    """
+    result = _evaluate(cat, scenarios)
+    columns = {}
+    for j, name in enumerate(names):
+        for metric in METRICS:
+            columns[f"{metric}_{name}"] = result[metric][:, j]
+    return pd.DataFrame(columns, index=cat.index)
+
+
+def best_scenario_per_category(cat: pd.DataFrame, scenarios: pd.DataFrame, metric: str = "delta_margin_total",
+                               category_col: str = "category", chunk_size: int = None) -> pd.DataFrame:
+    """
+    Encontra, para cada categoria, o cenário que maximiza a métrica, sem materializar a grade inteira.
+
+    Retorna:
+    - DataFrame com uma linha por categoria: parâmetros do melhor cenário e todas as métricas nele
+    """
+    n_cat = len(cat)
+    best_value = np.full(n_cat, -np.inf)
+    best_pos = np.zeros(n_cat, dtype="int64")
+    offset = 0
+    for chunk in _chunks(scenarios, chunk_size):
+        values = np.nan_to_num(_evaluate(cat, chunk)[metric], nan=-np.inf)
+        arg = values.argmax(axis=1)
+        top = values[np.arange(n_cat), arg]
+        better = top > best_value
+        best_value[better] = top[better]
+        best_pos[better] = arg[better] + offset
+        offset += len(chunk)
+
+    chosen = scenarios.iloc[best_pos].reset_index(drop=True)
+    # Reavalia cada categoria apenas no seu melhor cenário para devolver todas as métricas
+    result = _evaluate(cat, chosen, aligned=True)
+    out = pd.concat([cat[[category_col]].reset_index(drop=True), chosen], axis=1)
+    for m in METRICS:
+        out[m] = result[m][:, 0]
+    return out
@@ -0,0 +1,234 @@
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import pandas as pd
+from .data_loader import CACHE_DIR, PRUNE_GRACE_S, dataset_fingerprint, prune_versions
+from .profiling import etapa
+
+ARTIFACTS_DIR = os.path.join(CACHE_DIR, "artifacts")
+
+# OLIST_ARTIFACT_CACHE=0 desliga o cache (toda chamada reconstrói as saídas)
+ENABLED = os.environ.get("OLIST_ARTIFACT_CACHE", "1") != "0"
+
+REBUILT = "reconstruído"
+CACHED = "em cache"
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_hash(objects) -> str:
+    # Código-fonte da função e dos módulos dos quais ela depende; se o fonte não estiver
+    # disponível (ex: função definida no console), usa o bytecode
+    h = hashlib.sha1()
+    for obj in objects:
+        try:
+            h.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            h.update(repr(getattr(obj, "__code__", obj)).encode())
+    return h.hexdigest()
+
+
+def _module_name(func) -> str:
+    # Nome importável do módulo da função, também quando ele roda como script (__main__), para que
+    # `python modulo.py` e o relatório (que importa o módulo) compartilhem as mesmas chaves
+    module = sys.modules.get(func.__module__)
+    spec = getattr(module, "__spec__", None)
+    if spec is not None:
+        return spec.name
+    if getattr(module, "__file__", None):
+        return os.path.splitext(os.path.basename(module.__file__))[0]
+    return func.__module__
+
+
+def _object_path(digest: str) -> str:
+    return os.path.join(ARTIFACTS_DIR, "objects", digest[:2], digest)
+
+
+def _store(path: str) -> str:
+    # Guarda o arquivo no repositório endereçado por conteúdo e devolve o hash
+    digest = _file_hash(path)
+    target = _object_path(digest)
+    if os.path.exists(target):
+        # Reaproveitado: renova o mtime para que _prune não o remova antes do novo manifesto
+        os.utime(target)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+    return digest
+
+
+def _prune(manifest_path: str):
+    # Remove os manifestos antigos da mesma função (como prune_versions) e os objetos que nenhum
+    # manifesto restante referencia, respeitando PRUNE_GRACE_S nos dois casos
+    prune_versions(manifest_path)
+    referenced = set()
+    for name in os.listdir(ARTIFACTS_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(ARTIFACTS_DIR, name)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            # Manifesto removido ou ilegível no meio da varredura: não coleta nada desta vez
+            return
+        referenced.update(manifest["outputs"].values())
+        referenced.add(manifest["result"])
+    now = time.time()
+    for root, _, names in os.walk(os.path.join(ARTIFACTS_DIR, "objects")):
+        for digest in names:
+            if digest in referenced or digest.endswith(".tmp"):
+                continue
+            path = os.path.join(root, digest)
+            try:
+                if now - os.path.getmtime(path) >= PRUNE_GRACE_S:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def _restore(path: str, digest: str) -> bool:
+    # Garante que path tenha o conteúdo registrado (copiando do repositório se necessário)
+    if os.path.exists(path) and _file_hash(path) == digest:
+        return True
+    source = _object_path(digest)
+    if not os.path.exists(source):
+        return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    shutil.copyfile(source, path)
+    return True
+
+
+def cached_artifacts(outputs, inputs, code=(), files=()):
+    """
+    Decorador de cache de artefatos: a função só é executada quando a chave de cache muda.
+
+    A chave combina as impressões digitais dos CSVs de entrada (dataset_fingerprint), o hash do
+    código-fonte da função, do módulo que a define (com as constantes de nível de módulo) e dos
+    módulos em code, o conteúdo de arquivos locais de entrada e os argumentos da chamada, já com
+    os valores padrão aplicados. Cada arquivo de saída e o valor de
+    retorno ficam guardados por hash de conteúdo em ARTIFACTS_DIR; numa chamada com a mesma chave,
+    saídas ausentes ou alteradas são restauradas a partir dali e o valor de retorno é devolvido
+    sem executar a função. Manifestos de chaves antigas e objetos que deixaram de ser referenciados
+    são removidos depois de PRUNE_GRACE_S segundos.
+
+    Parâmetros:
+    - outputs: caminhos dos arquivos gerados pela função (os que não forem gerados são ignorados)
+    - inputs: nomes dos CSVs do dataset lidos pela função
+    - code: funções auxiliares ou nomes de módulos de apoio (ex: 'src.analytics.scenarios')
+      cujo código-fonte também entra na chave
+    - files: arquivos locais lidos pela função (ex: PNGs de outras análises), comparados por conteúdo
+
+    A função decorada ganha o atributo last_status (REBUILT ou CACHED) e aceita o argumento
+    extra force=True para reconstruir mesmo com a chave inalterada. Para gerar as saídas por fora
+    da função (ex: vários gráficos renderizados em lote), restore(*args, **kwargs) consulta e
+    restaura o cache sem executá-la e record(*args, since=..., **kwargs) registra as saídas
+    gravadas desde o instante since.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = f"{_module_name(func)}.{func.__qualname__}"
+        sources = [func, inspect.getmodule(func)] + list(code)
+
+        def entry(args, kwargs):
+            # Argumentos normalizados e caminho do manifesto da chamada
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = hashlib.sha1("|".join([
+                name,
+                _source_hash([importlib.import_module(c) if isinstance(c, str) else c for c in sources]),
+                repr(sorted(bound.arguments.items())),
+            ] + [f"{f}={dataset_fingerprint(f)}" for f in inputs]
+              + [f"{f}={_file_hash(f) if os.path.exists(f) else ''}" for f in files]).encode()).hexdigest()[:16]
+            return bound, os.path.join(ARTIFACTS_DIR, f"{name}-{key}.json")
+
+        def load(manifest_path):
+            # (True, valor de retorno) se todas as saídas registradas puderem ser restauradas
+            if not os.path.exists(manifest_path):
+                return False, None
+            with etapa("artefatos.restaurar", funcao=name):
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+                if all(_restore(path, digest) for path, digest in manifest["outputs"].items()):
+                    result = manifest["result"]
+                    if result is None or os.path.exists(_object_path(result)):
+                        return True, pd.read_pickle(_object_path(result)) if result else None
+            return False, None
+
+        def save(bound, manifest_path, value, start):
+            # Só entram no manifesto as saídas gravadas a partir de start
+            written = [p for p in outputs if os.path.exists(p) and os.path.getmtime(p) >= start - 1]
+            manifest = {
+                "function": name,
+                "arguments": {k: repr(v) for k, v in bound.arguments.items()},
+                "inputs": {f: dataset_fingerprint(f) for f in inputs},
+                "outputs": {path: _store(path) for path in written},
+                "result": None,
+            }
+            if value is not None:
+                os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+                tmp = f"{manifest_path}.{os.getpid()}.pkl"
+                pd.to_pickle(value, tmp)
+                manifest["result"] = _store(tmp)
+                os.remove(tmp)
+
+            os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+            tmp = f"{manifest_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, manifest_path)
+            _prune(manifest_path)
+
+        @functools.wraps(func)
+        def wrapper(*args, force=False, **kwargs):
+            if not ENABLED:
+                wrapper.last_status = REBUILT
+                return func(*args, **kwargs)
+
+            bound, manifest_path = entry(args, kwargs)
+            if not force:
+                hit, value = load(manifest_path)
+                if hit:
+                    wrapper.last_status = CACHED
+                    return value
+
+            start = time.time()
+            value = func(*args, **kwargs)
+            save(bound, manifest_path, value, start)
+            wrapper.last_status = REBUILT
+            return value
+
+        def restore(*args, **kwargs) -> bool:
+            # Restaura as saídas de uma execução anterior com a mesma chave, sem executar func
+            if not ENABLED:
+                return False
+            hit, _ = load(entry(args, kwargs)[1])
+            if hit:
+                wrapper.last_status = CACHED
+            return hit
+
+        def record(*args, since: float, value=None, **kwargs):
+            # Registra as saídas gravadas por fora de func desde since, como se func tivesse rodado
+            if ENABLED:
+                bound, manifest_path = entry(args, kwargs)
+                save(bound, manifest_path, value, since)
+            wrapper.last_status = REBUILT
+
+        wrapper.last_status = None
+        wrapper.restore = restore
+        wrapper.record = record
+        return wrapper
+    return decorator
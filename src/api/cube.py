@@ -0,0 +1,371 @@
+import argparse
+import hashlib
+import os
+import shutil
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from .data_loader import CACHE_DIR, dataset_fingerprint, prune_versions
+from .keys import key_dictionary, keys_version
+from .order_facts import FACTS_VERSION, SOURCES, load_item_facts
+from .profiling import etapa
+
+# Incrementar quando as dimensões, as medidas ou as regras de montagem do cubo mudarem
+CUBE_VERSION = 2
+
+# Dimensões do cubo, na ordem do grão (dia × estado do vendedor × estado do cliente × categoria)
+DIMENSIONS = ["day", "seller_state", "customer_state", "product_category_name"]
+
+# Dimensões de tempo derivadas do dia, disponíveis em by= e where= das consultas
+TIME_DIMENSIONS = {
+    "month": "datetime64[M]",
+    "year": "datetime64[Y]",
+}
+
+# Medidas aditivas por célula (somas e contagens: qualquer combinação de células se soma)
+MEASURES = ["items", "price_sum", "price_n", "freight_sum", "freight_n"]
+
+_CELL_ARRAYS = [f"cell_{d}" for d in DIMENSIONS] + MEASURES
+_ORDER_ARRAYS = ["order_cell", "order_code", "order_delivered", "order_shared"]
+_DELIVERY_ARRAYS = ["delivery_cell", "delivery_days", "delivery_items"]
+_LABEL_ARRAYS = [f"labels_{d}" for d in DIMENSIONS]
+_ARRAYS = _CELL_ARRAYS + _ORDER_ARRAYS + _DELIVERY_ARRAYS + _LABEL_ARRAYS
+
+
+class Cube:
+    """
+    Cubo de agregados no grão dia × seller_state × customer_state × product_category_name,
+    montado uma vez a partir da tabela fato de itens. Todos os arrays são numpy compactos:
+
+    - células: códigos de cada dimensão (int32, -1 = valor ausente) e as medidas aditivas
+      items, price_sum/price_n e freight_sum/freight_n (somas e contagens de não ausentes)
+    - pedidos distintos: pares únicos (célula, order_key), com o indicador de entrega válida;
+      a contagem de distintos não é aditiva (um pedido pode ter itens em várias categorias),
+      por isso os pares são guardados e deduplicados na consulta: a contagem é exata. Só os
+      pedidos presentes em mais de uma célula (order_shared, poucos) precisam de deduplicação
+    - histograma de entrega: itens por (célula, dias de entrega), só entregas válidas
+      (dias > 0, mesma limpeza de vendedores.py); médias e medianas saem exatas do histograma
+    - labels_<dimensão>: dicionário de cada dimensão (o código é a posição no array)
+
+    Consultas com query() somam as células selecionadas com np.bincount, sem reler os itens.
+    """
+
+    def __init__(self, **arrays):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        # Rótulos e códigos das dimensões de tempo já calculados nesta instância
+        self._time_cache = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def _codes(self, dim: str) -> np.ndarray:
+        # Códigos por célula de uma dimensão do cubo ou de tempo derivada do dia
+        if dim in DIMENSIONS:
+            return np.asarray(getattr(self, f"cell_{dim}"))
+        return self._time_labels(dim)[1]
+
+    def _time_labels(self, dim: str):
+        if dim not in TIME_DIMENSIONS:
+            raise KeyError(f"Dimensão desconhecida: '{dim}' (disponíveis: {DIMENSIONS + list(TIME_DIMENSIONS)})")
+        if dim not in self._time_cache:
+            days = np.asarray(self.labels_day).astype(TIME_DIMENSIONS[dim])
+            labels, day_to_label = np.unique(days, return_inverse=True)
+            day_codes = np.asarray(self.cell_day)
+            self._time_cache[dim] = labels, np.where(day_codes >= 0, day_to_label[day_codes], -1)
+        return self._time_cache[dim]
+
+    def _labels(self, dim: str) -> np.ndarray:
+        if dim in DIMENSIONS:
+            return np.asarray(getattr(self, f"labels_{dim}"))
+        return self._time_labels(dim)[0]
+
+    def _select(self, dim: str, values) -> np.ndarray:
+        # Máscara das células cujo valor da dimensão está em values; para dimensões de tempo,
+        # values também pode ser um intervalo (início, fim), com os dois extremos inclusos
+        labels = self._labels(dim)
+        codes = self._codes(dim)
+        if dim == "day" or dim in TIME_DIMENSIONS:
+            unit = labels.dtype
+            if isinstance(values, tuple) and len(values) == 2:
+                start, end = (np.datetime64(v, "D").astype(unit) if v is not None else None for v in values)
+                hit = np.ones(len(labels), dtype=bool)
+                if start is not None:
+                    hit &= labels >= start
+                if end is not None:
+                    hit &= labels <= end
+            else:
+                values = [values] if isinstance(values, str) or np.isscalar(values) else list(values)
+                hit = np.isin(labels, np.array([np.datetime64(v).astype(unit) for v in values]))
+        else:
+            values = [values] if isinstance(values, str) or np.isscalar(values) else list(values)
+            hit = np.isin(labels, np.array(values, dtype=str))
+        selected = np.flatnonzero(hit)
+        return np.isin(codes, selected)
+
+    def query(self, by=(), where: dict = None) -> pd.DataFrame:
+        """
+        Agrega as células do cubo por qualquer combinação de dimensões.
+
+        Parâmetros:
+        - by: dimensões de agrupamento, entre DIMENSIONS e TIME_DIMENSIONS (ex: ["seller_state"],
+          ["month", "product_category_name"]); vazio = total geral. Como no groupby do pandas,
+          células com valor ausente em alguma dimensão de by ficam de fora
+        - where: filtro {dimensão: valor ou lista de valores}; dimensões de tempo aceitam também
+          um intervalo (início, fim) inclusivo, ex: {"day": ("2017-01-01", "2017-06-30")}
+
+        Retorna:
+        - DataFrame com as colunas de by e as medidas: items, price_sum, freight_sum, avg_price,
+          avg_freight, orders (pedidos distintos), delivered_orders, delivered_items,
+          avg_delivery_days e median_delivery_days
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        with etapa("cubo.consulta", rows_in=len(self), by=",".join(by)) as e:
+            return e.saida(self._query(by, where or {}))
+
+    def _query(self, by, where) -> pd.DataFrame:
+        mask = np.ones(len(self), dtype=bool)
+        for dim, values in where.items():
+            mask &= self._select(dim, values)
+
+        # Grupo de cada célula: combinação dos códigos de by (-1 = célula fora da consulta)
+        codes = [self._codes(dim) for dim in by]
+        for c in codes:
+            mask &= c >= 0
+        if by:
+            sizes = [len(self._labels(dim)) for dim in by]
+            key = np.ravel_multi_index([c[mask] for c in codes], sizes)
+            group_keys, inverse = _unique(key, int(np.prod(sizes, dtype=np.int64)))
+        else:
+            group_keys, inverse = np.zeros(1, dtype=np.int64), np.zeros(int(mask.sum()), dtype=np.int64)
+        n_groups = len(group_keys)
+        group = np.full(len(self), -1, dtype=np.int64)
+        group[mask] = inverse
+
+        def total(values, g=group[mask]):
+            return np.bincount(g, weights=np.asarray(values)[mask], minlength=n_groups)
+
+        out = {}
+        if by:
+            for dim, c in zip(by, np.unravel_index(group_keys, sizes)):
+                out[dim] = self._labels(dim)[c]
+        out["items"] = total(self.items).astype("int64")
+        out["price_sum"] = total(self.price_sum)
+        out["freight_sum"] = total(self.freight_sum)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["avg_price"] = out["price_sum"] / total(self.price_n)
+            out["avg_freight"] = out["freight_sum"] / total(self.freight_n)
+
+        # Pedidos distintos: pedidos de uma única célula contam direto; os demais, pares
+        # (grupo, pedido) deduplicados
+        pair_group = group[np.asarray(self.order_cell)]
+        keep = pair_group >= 0
+        shared = np.asarray(self.order_shared)
+        n_orders = int(np.max(self.order_code)) + 1 if len(self.order_code) else 1
+        for name, selected in (("orders", keep), ("delivered_orders", keep & np.asarray(self.order_delivered))):
+            single = np.bincount(pair_group[selected & ~shared], minlength=n_groups)
+            multi = selected & shared
+            pairs = np.unique(pair_group[multi] * n_orders + np.asarray(self.order_code)[multi])
+            out[name] = single + np.bincount(pairs // n_orders, minlength=n_groups)
+
+        # Entrega: histograma (grupo, dias) -> itens
+        hist_group = group[np.asarray(self.delivery_cell)]
+        keep = hist_group >= 0
+        days = np.asarray(self.delivery_days)[keep].astype(np.int64)
+        counts = np.asarray(self.delivery_items)[keep].astype(np.int64)
+        delivered = np.bincount(hist_group[keep], weights=counts, minlength=n_groups)
+        out["delivered_items"] = delivered.astype("int64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["avg_delivery_days"] = np.bincount(hist_group[keep], weights=days * counts, minlength=n_groups) / delivered
+        out["median_delivery_days"] = _histogram_median(hist_group[keep], days, counts, n_groups)
+        return pd.DataFrame(out)
+
+
+# Acima deste número de combinações possíveis, agrupamentos usam ordenação em vez de arrays densos
+_DENSE_LIMIT = 1 << 22
+
+
+def _unique(key, size: int) -> tuple:
+    # np.unique(key, return_inverse=True); com poucas combinações possíveis, por marcação em
+    # um array denso (O(n), sem ordenar as chaves)
+    if size > _DENSE_LIMIT:
+        return np.unique(key, return_inverse=True)
+    present = np.zeros(size, dtype=bool)
+    present[key] = True
+    return np.flatnonzero(present), (np.cumsum(present) - 1)[key]
+
+
+def _histogram_median(group, values, counts, n_groups) -> np.ndarray:
+    # Mediana por grupo a partir de contagens por (grupo, valor), com a convenção do pandas:
+    # média dos dois valores centrais quando o total é par
+    medians = np.full(n_groups, np.nan)
+    if not len(group):
+        return medians
+    width = int(values.max()) + 1
+    if n_groups * width <= _DENSE_LIMIT:
+        # Histograma denso grupo × valor: a mediana é a primeira coluna em que a contagem
+        # acumulada passa da posição central
+        hist = np.bincount(group * width + values, weights=counts, minlength=n_groups * width).reshape(n_groups, width)
+        cum = np.cumsum(hist, axis=1)
+        n = cum[:, -1].astype(np.int64)
+        present = np.flatnonzero(n)
+        cum = cum[present]
+        low = (cum > ((n[present] - 1) // 2)[:, None]).argmax(axis=1)
+        high = (cum > (n[present] // 2)[:, None]).argmax(axis=1)
+        medians[present] = (low + high) / 2
+        return medians
+    order = np.lexsort((values, group))
+    group, values, counts = group[order], values[order], counts[order]
+    cum = np.cumsum(counts)
+    totals = np.bincount(group, weights=counts, minlength=n_groups).astype(np.int64)
+    present = np.flatnonzero(totals)
+    base = np.concatenate([[0], np.cumsum(totals)])[present]
+    n = totals[present]
+    low = values[np.searchsorted(cum, base + (n - 1) // 2, side="right")]
+    high = values[np.searchsorted(cum, base + n // 2, side="right")]
+    medians[present] = (low + high) / 2
+    return medians
+
+
+def _factorize(values) -> tuple:
+    codes, labels = pd.factorize(values, sort=True)
+    return codes.astype(np.int32), labels
+
+
+def build_cube() -> Cube:
+    """
+    Monta o cubo a partir da tabela fato de itens (ver Cube).
+    """
+    df = load_item_facts(columns=[
+        "order_key", "order_purchase_timestamp", "order_delivered_customer_date",
+        "seller_state", "customer_state", "product_category_name", "price", "freight_value"
+    ])
+
+    with etapa("cubo.celulas", rows_in=df) as e:
+        arrays = {}
+        day_codes, day_labels = _factorize(df["order_purchase_timestamp"].dt.floor("D"))
+        arrays["labels_day"] = np.asarray(day_labels, dtype="datetime64[D]")
+        dim_codes = [day_codes]
+        for dim in DIMENSIONS[1:]:
+            codes, labels = _factorize(df[dim].astype("object"))
+            arrays[f"labels_{dim}"] = np.asarray(labels, dtype=str)
+            dim_codes.append(codes)
+
+        # Uma célula por combinação presente dos códigos (ausente = -1, deslocado para 0 na chave)
+        sizes = [len(arrays[f"labels_{d}"]) + 1 for d in DIMENSIONS]
+        key = np.ravel_multi_index([c + 1 for c in dim_codes], sizes)
+        cell_keys, cell = np.unique(key, return_inverse=True)
+        for dim, codes in zip(DIMENSIONS, np.unravel_index(cell_keys, sizes)):
+            arrays[f"cell_{dim}"] = (codes - 1).astype(np.int32)
+
+        n_cells = len(cell_keys)
+        price = df["price"].to_numpy(dtype="float64", na_value=np.nan)
+        freight = df["freight_value"].to_numpy(dtype="float64", na_value=np.nan)
+        arrays["items"] = np.bincount(cell, minlength=n_cells).astype(np.int32)
+        arrays["price_sum"] = np.bincount(cell, weights=np.nan_to_num(price), minlength=n_cells)
+        arrays["price_n"] = np.bincount(cell, weights=~np.isnan(price), minlength=n_cells).astype(np.int32)
+        arrays["freight_sum"] = np.bincount(cell, weights=np.nan_to_num(freight), minlength=n_cells)
+        arrays["freight_n"] = np.bincount(cell, weights=~np.isnan(freight), minlength=n_cells).astype(np.int32)
+        e.saida(n_cells)
+
+    with etapa("cubo.pedidos_e_entregas", rows_in=df):
+        # Entrega válida: data de entrega preenchida e dias > 0 (limpeza de vendedores.py)
+        delivery_days = (df["order_delivered_customer_date"] - df["order_purchase_timestamp"]).dt.days
+        delivery_days = delivery_days.to_numpy(dtype="float64", na_value=np.nan)
+        delivered = delivery_days > 0
+
+        # Códigos int32 de order_id já presentes na tabela fato (src/api/keys.py)
+        order_codes = df["order_key"].to_numpy()
+        n_orders = len(key_dictionary("order_id"))
+        pairs, first = np.unique(cell.astype(np.int64) * n_orders + order_codes, return_index=True)
+        arrays["order_cell"] = (pairs // n_orders).astype(np.int32)
+        arrays["order_code"] = (pairs % n_orders).astype(np.int32)
+        # As datas de compra e entrega são do pedido: todos os itens do par têm o mesmo indicador
+        arrays["order_delivered"] = delivered[first]
+        arrays["order_shared"] = np.bincount(arrays["order_code"], minlength=n_orders)[arrays["order_code"]] > 1
+
+        max_days = int(delivery_days[delivered].max()) + 1 if delivered.any() else 1
+        hist_key, hist_items = np.unique(cell[delivered].astype(np.int64) * max_days + delivery_days[delivered].astype(np.int64), return_counts=True)
+        arrays["delivery_cell"] = (hist_key // max_days).astype(np.int32)
+        arrays["delivery_days"] = (hist_key % max_days).astype(np.int16 if max_days < 2 ** 15 else np.int32)
+        arrays["delivery_items"] = hist_items.astype(np.int32)
+    return Cube(**arrays)
+
+
+def _cube_dir() -> str:
+    # order_code vem do dicionário de order_id (ver keys_version)
+    key = "|".join([str(CUBE_VERSION), str(FACTS_VERSION), keys_version()] + [dataset_fingerprint(f) for f in SOURCES])
+    return os.path.join(CACHE_DIR, f"cube-{hashlib.sha1(key.encode()).hexdigest()[:16]}")
+
+
+@lru_cache(maxsize=1)
+def load_cube() -> Cube:
+    """
+    Carrega o cubo, montando-o uma única vez por versão dos CSVs de origem. Os arrays ficam
+    persistidos em .npy (um diretório por versão) e são abertos por memory-map.
+    """
+    directory = _cube_dir()
+    paths = [os.path.join(directory, f"{name}.npy") for name in _ARRAYS]
+    if all(os.path.exists(p) for p in paths):
+        with etapa("ler_cubo"):
+            return Cube(**{name: np.load(p, mmap_mode="r") for name, p in zip(_ARRAYS, paths)})
+
+    with etapa("montar_cubo"):
+        cube = build_cube()
+    try:
+        tmp = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(cube, name))
+        os.replace(tmp, directory)
+    except OSError:
+        # outro processo pode ter gravado a mesma versão antes
+        shutil.rmtree(tmp, ignore_errors=True)
+        return cube
+    # Versões anteriores do cubo, só depois da nova gravada
+    prune_versions(directory)
+    return cube
+
+
+def query_cube(by=(), where: dict = None) -> pd.DataFrame:
+    """
+    Atalho para load_cube().query(by, where): ver Cube.query.
+    """
+    return load_cube().query(by, where)
+
+
+def parse_filters(items) -> dict:
+    """
+    Converte filtros textuais (CLI, parâmetros de URL) no formato where de Cube.query.
+
+    Parâmetros:
+    - items: strings "dim=v1,v2" (valores) ou "dim=início..fim" (intervalo de datas inclusivo,
+      extremos opcionais)
+
+    Retorna:
+    - dict {dim: [v1, v2]} ou {dim: (início, fim)}
+    """
+    where = {}
+    for item in items or []:
+        dim, _, values = item.partition("=")
+        if ".." in values:
+            start, _, end = values.partition("..")
+            where[dim] = (start or None, end or None)
+        else:
+            where[dim] = values.split(",")
+    return where
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consultas ad hoc ao cubo de agregados de itens.")
+    parser.add_argument("--por", nargs="*", default=[], help=f"dimensões de agrupamento: {DIMENSIONS + list(TIME_DIMENSIONS)}")
+    parser.add_argument("--onde", nargs="*", help="filtros dim=v1,v2 ou dim=início..fim (datas inclusivas)")
+    parser.add_argument("--ordenar", help="medida usada para ordenar o resultado (decrescente)")
+    parser.add_argument("--top", type=int, help="mostra apenas as primeiras linhas")
+    args = parser.parse_args()
+    result = query_cube(args.por, parse_filters(args.onde))
+    if args.ordenar:
+        result = result.sort_values(args.ordenar, ascending=False)
+    if args.top:
+        result = result.head(args.top)
+    print(result.to_string(index=False))
@@ -1,21 +1,372 @@
-import kagglehub
+import argparse
 import pandas as pd
+import hashlib
+import json
 import os
+import shutil
+import time
+import warnings
+from collections import OrderedDict
+from functools import lru_cache
+from .schemas import ID_DTYPE, SCHEMAS, read_table
+from .profiling import etapa
 
-def load_dataset(file_name: str) -> pd.DataFrame:
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    # Falhas de leitura/gravação de snapshot que apenas desligam o snapshot (o CSV é usado)
+    _SNAPSHOT_ERRORS = (OSError, pa.ArrowInvalid)
+except ImportError:  # snapshots em disco são opcionais
+    feather = None
+    _SNAPSHOT_ERRORS = (OSError,)
+
+DATASET_HANDLE = "olistbr/brazilian-ecommerce"
+
+# Arquivos do dataset (os que entram no manifesto da cópia local)
+DATASET_FILES = [
+    "olist_orders_dataset.csv", "olist_order_items_dataset.csv", "olist_order_payments_dataset.csv",
+    "olist_order_reviews_dataset.csv", "olist_customers_dataset.csv", "olist_geolocation_dataset.csv",
+    "olist_products_dataset.csv", "olist_sellers_dataset.csv", "product_category_name_translation.csv",
+]
+
+# Diretório dos snapshots colunares (Arrow/Feather) gerados a partir dos CSVs
+CACHE_DIR = os.environ.get("OLIST_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "olist"))
+
+# Cópia local do dataset, verificada por manifesto: com ela o KaggleHub não é consultado
+LOCAL_DATASET_DIR = os.path.join(CACHE_DIR, "dataset")
+MANIFEST_FILE = "manifest.json"
+
+# OLIST_VERIFY_HASHES=1 confere também o SHA-1 de cada arquivo (por padrão, só os tamanhos)
+VERIFY_HASHES = os.environ.get("OLIST_VERIFY_HASHES", "0") == "1"
+
+# Versões antigas de um artefato do cache modificadas há menos que isto (s) não são removidas:
+# podem estar sendo montadas ou lidas por outro processo (ex: com outro OLIST_DATA_DIR)
+PRUNE_GRACE_S = 3600
+
+# Quantidade máxima de tabelas mantidas em memória no processo
+MAX_CACHED_TABLES = int(os.environ.get("OLIST_CACHE_SIZE", "8"))
+
+_tables = OrderedDict()
+
+
+def _sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def build_manifest(directory: str, files=None) -> dict:
+    """
+    Manifesto de um diretório do dataset: tamanho e SHA-1 de cada arquivo.
+
+    Parâmetros:
+    - directory: diretório com os CSVs
+    - files: arquivos considerados (padrão: os de DATASET_FILES presentes no diretório)
+    """
+    files = files or [f for f in DATASET_FILES if os.path.exists(os.path.join(directory, f))]
+    return {
+        "handle": DATASET_HANDLE,
+        "files": {
+            f: {"size": os.path.getsize(os.path.join(directory, f)), "sha1": _sha1(os.path.join(directory, f))}
+            for f in files
+        },
+    }
+
+
+def verify_dataset(directory: str, hashes: bool = None) -> list:
+    """
+    Confere os arquivos de um diretório do dataset contra o manifesto gravado nele.
+
+    Parâmetros:
+    - directory: diretório com os CSVs e o manifest.json
+    - hashes: confere também o SHA-1 (padrão: VERIFY_HASHES); sem isso, só os tamanhos
+
+    Retorna:
+    - lista de problemas encontrados (vazia quando o diretório confere com o manifesto)
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return [f"manifesto ausente ou inválido: {manifest_path}"]
+
+    hashes = VERIFY_HASHES if hashes is None else hashes
+    problems = []
+    for name, expected in manifest["files"].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            problems.append(f"{name}: ausente")
+        elif os.path.getsize(path) != expected["size"]:
+            problems.append(f"{name}: tamanho {os.path.getsize(path)} != {expected['size']}")
+        elif hashes and _sha1(path) != expected["sha1"]:
+            problems.append(f"{name}: SHA-1 diferente do manifesto")
+    return problems
+
+
+def materialize_dataset(source: str, target: str = LOCAL_DATASET_DIR) -> str:
+    """
+    Monta a cópia local do dataset em target a partir de source (ex: o diretório baixado pelo
+    KaggleHub). Cada CSV é ligado por hard link (ou copiado, entre sistemas de arquivos) com o
+    mesmo mtime, e o manifesto é gravado por último: uma cópia interrompida nunca é considerada válida.
+
+    Retorna:
+    - target
+    """
+    os.makedirs(target, exist_ok=True)
+    files = [f for f in DATASET_FILES if os.path.exists(os.path.join(source, f))]
+    manifest_path = os.path.join(target, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for name in files:
+        src, dst = os.path.join(source, name), os.path.join(target, name)
+        if os.path.abspath(src) == os.path.abspath(dst):
+            continue
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(build_manifest(target, files), f, indent=2)
+    os.replace(tmp, manifest_path)
+    return target
+
+
+@lru_cache(maxsize=None)
+def dataset_path() -> str:
+    """
+    Resolve (uma única vez por processo) o diretório local do dataset da Olist, nesta ordem:
+    - OLIST_DATA_DIR, quando definido (ex: dados sintéticos de benchmarks/synthetic.py); se o
+      diretório tiver manifest.json, os arquivos são conferidos contra ele
+    - a cópia local em LOCAL_DATASET_DIR, quando confere com o seu manifesto
+    - o download via KaggleHub, materializado em seguida em LOCAL_DATASET_DIR: as execuções
+      seguintes não importam o KaggleHub nem dependem da rede
+    """
+    local = os.environ.get("OLIST_DATA_DIR")
+    if local:
+        if os.path.exists(os.path.join(local, MANIFEST_FILE)):
+            problems = verify_dataset(local)
+            if problems:
+                raise ValueError(f"Dataset em {local} não confere com o manifesto: {problems}")
+        return local
+
+    if not verify_dataset(LOCAL_DATASET_DIR):
+        return LOCAL_DATASET_DIR
+
+    import kagglehub  # importado só quando não há cópia local (a importação sozinha custa ~0,5s)
+    with etapa("kagglehub.dataset_download", handle=DATASET_HANDLE):
+        downloaded = kagglehub.dataset_download(DATASET_HANDLE)
+    try:
+        with etapa("materializar_dataset"):
+            return materialize_dataset(downloaded)
+    except OSError:
+        # Sem permissão de escrita no cache: usa o diretório do KaggleHub diretamente
+        return downloaded
+
+
+def clear_cache():
+    """
+    Esvazia o cache em memória de tabelas e a resolução do caminho do dataset.
+    Os snapshots em disco não são removidos.
+    """
+    _tables.clear()
+    dataset_path.cache_clear()
+
+
+def prune_versions(keep: str):
     """
-    Faz o download do dataset da Olist via KaggleHub e carrega o arquivo CSV desejado.
-    
+    Remove do diretório de keep (em geral CACHE_DIR) as outras versões de um artefato versionado
+    (arquivos ou diretórios '<nome>-<versão>', ex: snapshots, cube-*, keys-*), exceto keep, as
+    temporárias ('.tmp') e as modificadas há menos de PRUNE_GRACE_S segundos. Deve ser chamada
+    só depois que keep foi gravada e renomeada com sucesso.
+
+    Parâmetros:
+    - keep: caminho da versão atual
+    """
+    directory, name = os.path.split(keep)
+    stem = name.split("-", 1)[0]
+    now = time.time()
+    for old in os.listdir(directory) if os.path.isdir(directory) else []:
+        if old == name or old.endswith(".tmp") or "-" not in old or old.split("-", 1)[0] != stem:
+            continue
+        path = os.path.join(directory, old)
+        try:
+            if now - os.path.getmtime(path) < PRUNE_GRACE_S:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def dataset_fingerprint(file_name: str) -> str:
+    """
+    Identificador de versão de um CSV do dataset: schema, tamanho e mtime do arquivo.
+    Muda sempre que o arquivo de origem ou o schema registrado mudarem.
+    """
+    file_path = os.path.join(dataset_path(), file_name)
+    stat = os.stat(file_path)
+    schema = hashlib.sha1(repr(SCHEMAS.get(file_name)).encode()).hexdigest()[:8]
+    return f"{schema}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def _snapshot_path(file_name: str) -> str:
+    # O nome do snapshot carrega a impressão digital do CSV: se o arquivo ou o schema mudarem,
+    # o snapshot antigo é ignorado
+    stem = os.path.splitext(file_name)[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{dataset_fingerprint(file_name)}.feather")
+
+
+def _string_dtype(arrow_type):
+    # Mantém as colunas de texto com o mesmo dtype produzido pelo schema na leitura do CSV
+    if arrow_type in (pa.string(), pa.large_string()):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+def _read_snapshot(snapshot: str, columns=None):
+    if feather is None or not os.path.exists(snapshot):
+        return None
+    try:
+        # memory_map evita copiar o arquivo inteiro para o processo; só as colunas pedidas são convertidas
+        table = feather.read_table(snapshot, columns=columns, memory_map=True)
+        types_mapper = _string_dtype if ID_DTYPE == "string[pyarrow]" else None
+        return table.to_pandas(types_mapper=types_mapper)
+    except _SNAPSHOT_ERRORS as exc:
+        warnings.warn(f"Snapshot {snapshot} ignorado (lendo do CSV): {exc}")
+        return None
+
+
+def _write_snapshot(df: pd.DataFrame, snapshot: str):
+    if feather is None:
+        return
+    tmp = f"{snapshot}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Grava em arquivo temporário e renomeia, para que leitores concorrentes nunca vejam um snapshot parcial
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, snapshot)
+    except _SNAPSHOT_ERRORS as exc:
+        warnings.warn(f"Snapshot {snapshot} não gravado: {exc}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return
+    # Versões anteriores do mesmo arquivo, só depois da nova gravada
+    prune_versions(snapshot)
+
+
+def _remember(key, df: pd.DataFrame):
+    _tables[key] = df
+    _tables.move_to_end(key)
+    while len(_tables) > MAX_CACHED_TABLES:
+        _tables.popitem(last=False)
+
+
+def load_dataset(file_name: str, columns=None) -> pd.DataFrame:
+    """
+    Carrega o arquivo CSV desejado do dataset da Olist (diretório resolvido por dataset_path:
+    OLIST_DATA_DIR, cópia local verificada ou KaggleHub).
+
+    A leitura aplica o schema registrado em src/api/schemas.py (dtypes, categorias e datas)
+    e passa por dois níveis de cache:
+    - memória: as últimas MAX_CACHED_TABLES tabelas lidas no processo (LRU por arquivo/colunas)
+    - disco: um snapshot Feather por CSV, identificado pelo tamanho e mtime do arquivo de origem,
+      usado no lugar do CSV nas execuções seguintes
+
     Parâmetros:
     - file_name: nome do arquivo CSV que deseja carregar (ex: 'olist_orders_dataset.csv')
-    
+    - columns: lista opcional de colunas; quando informada, apenas essas colunas são lidas
+
     Retorna:
-    - DataFrame pandas com os dados carregados
+    - DataFrame pandas com os dados carregados (uma cópia; pode ser alterado livremente)
     """
-    path = kagglehub.dataset_download("olistbr/brazilian-ecommerce")
+    with etapa("load_dataset", arquivo=file_name) as e:
+        return e.saida(_load_dataset(file_name, columns, e))
+
+
+def _load_dataset(file_name: str, columns, e) -> pd.DataFrame:
+    columns = list(columns) if columns is not None else None
+    key = (file_name, tuple(columns) if columns is not None else None)
+    for cached in (key, (file_name, None)):
+        if cached in _tables:
+            _tables.move_to_end(cached)
+            e.args["origem"] = "memória"
+            df = _tables[cached]
+            return (df[columns] if columns is not None else df).copy()
+
+    path = dataset_path()
     file_path = os.path.join(path, file_name)
-    
+
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Arquivo '{file_name}' não encontrado em {path}")
-    
-    return pd.read_csv(file_path)
+
+    snapshot = _snapshot_path(file_name)
+    if e:
+        # Versão do dataset no trace, para comparar pontos quentes entre extratos
+        e.args["versao"] = dataset_fingerprint(file_name)
+    with etapa("ler_snapshot", arquivo=file_name) as s:
+        df = s.saida(_read_snapshot(snapshot, columns))
+    if df is None and feather is not None:
+        # Primeira leitura: o CSV é lido por inteiro uma vez para gerar o snapshot
+        e.args["origem"] = "csv"
+        with etapa("pd.read_csv", arquivo=file_name) as r:
+            full = r.saida(read_table(file_path, file_name))
+        with etapa("gravar_snapshot", rows_in=full, arquivo=file_name):
+            _write_snapshot(full, snapshot)
+        _remember((file_name, None), full)
+        return (full[columns] if columns is not None else full).copy()
+    if df is None:
+        e.args["origem"] = "csv"
+        with etapa("pd.read_csv", arquivo=file_name) as r:
+            df = r.saida(read_table(file_path, file_name, columns))
+    else:
+        e.args["origem"] = "snapshot"
+
+    _remember(key, df)
+    return df.copy()
+
+
+def prepare_dataset(source: str = None, snapshots: bool = True) -> str:
+    """
+    Prepara o dataset para execução offline: materializa a cópia local verificada em
+    LOCAL_DATASET_DIR e gera os snapshots Feather de todos os CSVs. Com CACHE_DIR copiado para
+    outra máquina, nenhum script precisa do KaggleHub nem da rede.
+
+    Parâmetros:
+    - source: diretório com os CSVs (padrão: o resolvido por dataset_path)
+    - snapshots: gera também os snapshots Feather
+
+    Retorna:
+    - diretório da cópia local
+    """
+    path = materialize_dataset(source or dataset_path())
+    clear_cache()
+    if snapshots:
+        for file_name in DATASET_FILES:
+            if os.path.exists(os.path.join(path, file_name)):
+                load_dataset(file_name)
+    print(f"✅ Dataset pronto para uso offline em {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepara a cópia local verificada do dataset da Olist.")
+    parser.add_argument("--origem", help="diretório com os CSVs (padrão: OLIST_DATA_DIR ou KaggleHub)")
+    parser.add_argument("--sem-snapshots", action="store_true", help="não gera os snapshots Feather")
+    parser.add_argument("--verificar", action="store_true", help="confere tamanhos e SHA-1 da cópia local")
+    args = parser.parse_args()
+    if args.verificar:
+        problems = verify_dataset(LOCAL_DATASET_DIR, hashes=True)
+        for problem in problems:
+            print(f"❌ {problem}")
+        if not problems:
+            print(f"✅ {LOCAL_DATASET_DIR} confere com o manifesto.")
+        raise SystemExit(1 if problems else 0)
+    prepare_dataset(args.origem, snapshots=not args.sem_snapshots)
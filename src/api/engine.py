@@ -0,0 +1,372 @@
+import os
+import pandas as pd
+from .data_loader import dataset_path, load_dataset
+from .schemas import SCHEMAS
+
+# Engine usado quando a análise não informa engine= (OLIST_ENGINE)
+DEFAULT_ENGINE = os.environ.get("OLIST_ENGINE", "pandas")
+
+ENGINES = ["pandas", "polars", "duckdb"]
+
+AGG_FUNCS = ["size", "count", "sum", "mean", "median", "min", "max", "nunique"]
+
+
+# ---------------------------------------------------------------------------
+# Expressões
+# ---------------------------------------------------------------------------
+
+class Expr:
+    """
+    Expressão escalar de um plano: coluna, literal ou operação sobre outras expressões.
+    Operadores aritméticos e de comparação do Python montam novas expressões.
+    """
+
+    def __init__(self, op, *args):
+        self.op = op
+        self.args = args
+
+    def _bin(self, op, other, reverse=False):
+        other = other if isinstance(other, Expr) else lit(other)
+        return Expr(op, other, self) if reverse else Expr(op, self, other)
+
+    def __add__(self, other): return self._bin("+", other)
+    def __sub__(self, other): return self._bin("-", other)
+    def __mul__(self, other): return self._bin("*", other)
+    def __truediv__(self, other): return self._bin("/", other)
+    def __rsub__(self, other): return self._bin("-", other, reverse=True)
+    def __gt__(self, other): return self._bin(">", other)
+    def __ge__(self, other): return self._bin(">=", other)
+    def __lt__(self, other): return self._bin("<", other)
+    def __le__(self, other): return self._bin("<=", other)
+    def __eq__(self, other): return self._bin("==", other)
+    def __ne__(self, other): return self._bin("!=", other)
+    __hash__ = object.__hash__
+
+    def fill_null(self, value):
+        """Substitui valores ausentes por value."""
+        return Expr("fill_null", self, lit(value))
+
+    def is_not_null(self):
+        return Expr("is_not_null", self)
+
+
+def col(name: str) -> Expr:
+    return Expr("col", name)
+
+
+def lit(value) -> Expr:
+    return Expr("lit", value)
+
+
+def days_between(end: Expr, start: Expr) -> Expr:
+    """
+    Dias inteiros entre dois timestamps, arredondados para baixo (como Timedelta.days).
+    """
+    return Expr("days", end, start)
+
+
+# ---------------------------------------------------------------------------
+# Nós do plano
+# ---------------------------------------------------------------------------
+
+class Scan:
+    """Leitura de um CSV do dataset, apenas das colunas indicadas."""
+
+    def __init__(self, file_name: str, columns):
+        self.file_name = file_name
+        self.columns = list(columns)
+
+
+class Filter:
+    """Mantém as linhas em que a expressão booleana é verdadeira."""
+
+    def __init__(self, input, predicate: Expr):
+        self.input = input
+        self.predicate = predicate
+
+
+class Join:
+    """Junção por igualdade das colunas em on (how: 'inner' ou 'left')."""
+
+    def __init__(self, left, right, on, how: str = "inner"):
+        self.left = left
+        self.right = right
+        self.on = [on] if isinstance(on, str) else list(on)
+        self.how = how
+
+
+class Derive:
+    """Cria ou substitui colunas a partir de expressões ({nome: expressão})."""
+
+    def __init__(self, input, columns: dict):
+        self.input = input
+        self.derived = dict(columns)
+
+
+class GroupBy:
+    """
+    Agregação por keys, no formato do pandas named aggregation: {saida: (coluna, funcao)}.
+    Linhas com chave ausente são descartadas e o resultado sai ordenado pelas chaves,
+    como em groupby(keys, observed=True).agg(**aggs).reset_index().
+    """
+
+    def __init__(self, input, keys, aggs: dict):
+        self.input = input
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        self.aggs = dict(aggs)
+        for column, func in self.aggs.values():
+            if func not in AGG_FUNCS:
+                raise ValueError(f"Agregação '{func}' não suportada nos planos")
+
+
+def output_columns(node) -> list:
+    """
+    Colunas produzidas por um nó do plano.
+    """
+    if isinstance(node, Scan):
+        return node.columns
+    if isinstance(node, Filter):
+        return output_columns(node.input)
+    if isinstance(node, Join):
+        right = [c for c in output_columns(node.right) if c not in node.on]
+        return output_columns(node.left) + right
+    if isinstance(node, Derive):
+        base = output_columns(node.input)
+        return base + [c for c in node.derived if c not in base]
+    if isinstance(node, GroupBy):
+        return node.keys + list(node.aggs)
+    raise TypeError(f"Nó de plano desconhecido: {type(node).__name__}")
+
+
+# ---------------------------------------------------------------------------
+# pandas
+# ---------------------------------------------------------------------------
+
+def _pandas_expr(expr: Expr, df: pd.DataFrame):
+    op, args = expr.op, expr.args
+    if op == "col":
+        return df[args[0]]
+    if op == "lit":
+        return args[0]
+    if op == "fill_null":
+        return _pandas_expr(args[0], df).fillna(args[1].args[0])
+    if op == "is_not_null":
+        return _pandas_expr(args[0], df).notna()
+    if op == "days":
+        return (_pandas_expr(args[0], df) - _pandas_expr(args[1], df)).dt.days
+    a, b = (_pandas_expr(a, df) for a in args)
+    return {
+        "+": lambda: a + b, "-": lambda: a - b, "*": lambda: a * b, "/": lambda: a / b,
+        ">": lambda: a > b, ">=": lambda: a >= b, "<": lambda: a < b, "<=": lambda: a <= b,
+        "==": lambda: a == b, "!=": lambda: a != b,
+    }[op]()
+
+
+def _run_pandas(node) -> pd.DataFrame:
+    if isinstance(node, Scan):
+        return load_dataset(node.file_name, columns=node.columns)
+    if isinstance(node, Filter):
+        df = _run_pandas(node.input)
+        return df[_pandas_expr(node.predicate, df).fillna(False).astype(bool)]
+    if isinstance(node, Join):
+        return _run_pandas(node.left).merge(_run_pandas(node.right), on=node.on, how=node.how)
+    if isinstance(node, Derive):
+        df = _run_pandas(node.input)
+        for name, expr in node.derived.items():
+            df[name] = _pandas_expr(expr, df)
+        return df
+    if isinstance(node, GroupBy):
+        df = _run_pandas(node.input)
+        return df.groupby(node.keys, observed=True).agg(**node.aggs).reset_index()
+    raise TypeError(f"Nó de plano desconhecido: {type(node).__name__}")
+
+
+# ---------------------------------------------------------------------------
+# Polars (plano lazy, multi-thread, com pushdown de filtros e projeção)
+# ---------------------------------------------------------------------------
+
+def _polars_type(pl, dtype):
+    if dtype == "float64":
+        return pl.Float64
+    if str(dtype).startswith("Int"):
+        return pl.Int64
+    return pl.Utf8
+
+
+def _polars_expr(pl, expr: Expr):
+    op, args = expr.op, expr.args
+    if op == "col":
+        return pl.col(args[0])
+    if op == "lit":
+        return pl.lit(args[0])
+    if op == "fill_null":
+        return _polars_expr(pl, args[0]).fill_null(args[1].args[0])
+    if op == "is_not_null":
+        return _polars_expr(pl, args[0]).is_not_null()
+    if op == "days":
+        delta = _polars_expr(pl, args[0]) - _polars_expr(pl, args[1])
+        return (delta.dt.total_seconds() / 86400).floor()
+    a, b = (_polars_expr(pl, a) for a in args)
+    return {
+        "+": lambda: a + b, "-": lambda: a - b, "*": lambda: a * b, "/": lambda: a / b,
+        ">": lambda: a > b, ">=": lambda: a >= b, "<": lambda: a < b, "<=": lambda: a <= b,
+        "==": lambda: a == b, "!=": lambda: a != b,
+    }[op]()
+
+
+def _polars_agg(pl, name, column, func):
+    c = pl.col(column)
+    return {
+        "size": lambda: pl.len(),
+        "count": lambda: c.count(),
+        "sum": lambda: c.sum(),
+        "mean": lambda: c.mean(),
+        "median": lambda: c.median(),
+        "min": lambda: c.min(),
+        "max": lambda: c.max(),
+        "nunique": lambda: c.drop_nulls().n_unique(),
+    }[func]().alias(name)
+
+
+def _plan_polars(pl, node):
+    if isinstance(node, Scan):
+        schema = SCHEMAS.get(node.file_name, {"dtypes": {}, "dates": []})
+        lf = pl.scan_csv(os.path.join(dataset_path(), node.file_name), infer_schema=False).select(node.columns)
+        casts = []
+        for c in node.columns:
+            if c in schema["dates"]:
+                casts.append(pl.col(c).str.to_datetime(strict=False))
+            elif c in schema["dtypes"]:
+                casts.append(pl.col(c).cast(_polars_type(pl, schema["dtypes"][c]), strict=False))
+        return lf.with_columns(casts) if casts else lf
+    if isinstance(node, Filter):
+        return _plan_polars(pl, node.input).filter(_polars_expr(pl, node.predicate))
+    if isinstance(node, Join):
+        return _plan_polars(pl, node.left).join(_plan_polars(pl, node.right), on=node.on, how=node.how)
+    if isinstance(node, Derive):
+        return _plan_polars(pl, node.input).with_columns(
+            [_polars_expr(pl, e).alias(n) for n, e in node.derived.items()]
+        )
+    if isinstance(node, GroupBy):
+        lf = _plan_polars(pl, node.input).filter(pl.all_horizontal([pl.col(k).is_not_null() for k in node.keys]))
+        aggs = [_polars_agg(pl, name, column, func) for name, (column, func) in node.aggs.items()]
+        return lf.group_by(node.keys).agg(aggs).sort(node.keys)
+    raise TypeError(f"Nó de plano desconhecido: {type(node).__name__}")
+
+
+def _run_polars(node) -> pd.DataFrame:
+    try:
+        import polars as pl
+    except ImportError:
+        raise ImportError("engine='polars' requer o pacote polars (pip install polars)")
+    return _plan_polars(pl, node).collect().to_pandas()
+
+
+# ---------------------------------------------------------------------------
+# DuckDB (consulta SQL embarcada direto sobre os CSVs)
+# ---------------------------------------------------------------------------
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(dtype):
+    if dtype == "float64":
+        return "DOUBLE"
+    if str(dtype).startswith("Int"):
+        return "BIGINT"
+    return "VARCHAR"
+
+
+def _sql_expr(expr: Expr) -> str:
+    op, args = expr.op, expr.args
+    if op == "col":
+        return _quote(args[0])
+    if op == "lit":
+        value = args[0]
+        return "'" + value.replace("'", "''") + "'" if isinstance(value, str) else repr(value)
+    if op == "fill_null":
+        return f"coalesce({_sql_expr(args[0])}, {_sql_expr(args[1])})"
+    if op == "is_not_null":
+        return f"({_sql_expr(args[0])} IS NOT NULL)"
+    if op == "days":
+        return f"floor((epoch({_sql_expr(args[0])}) - epoch({_sql_expr(args[1])})) / 86400)"
+    sql_op = {"==": "=", "!=": "<>"}.get(op, op)
+    return f"({_sql_expr(args[0])} {sql_op} {_sql_expr(args[1])})"
+
+
+def _sql_agg(column, func) -> str:
+    c = _quote(column)
+    return {
+        "size": "count(*)",
+        "count": f"count({c})",
+        "sum": f"coalesce(sum({c}), 0)",
+        "mean": f"avg({c})",
+        "median": f"median({c})",
+        "min": f"min({c})",
+        "max": f"max({c})",
+        "nunique": f"count(DISTINCT {c})",
+    }[func]
+
+
+def to_sql(node) -> str:
+    """
+    Traduz o plano para uma consulta SQL (DuckDB) sobre os CSVs do dataset.
+    """
+    if isinstance(node, Scan):
+        schema = SCHEMAS.get(node.file_name, {"dtypes": {}, "dates": []})
+        path = os.path.join(dataset_path(), node.file_name).replace("'", "''")
+        cols = []
+        for c in node.columns:
+            if c in schema["dates"]:
+                cols.append(f"TRY_CAST({_quote(c)} AS TIMESTAMP) AS {_quote(c)}")
+            else:
+                cols.append(f"TRY_CAST({_quote(c)} AS {_sql_type(schema['dtypes'].get(c))}) AS {_quote(c)}")
+        return f"SELECT {', '.join(cols)} FROM read_csv('{path}', header = true, all_varchar = true)"
+    if isinstance(node, Filter):
+        return f"SELECT * FROM ({to_sql(node.input)}) WHERE {_sql_expr(node.predicate)}"
+    if isinstance(node, Join):
+        how = {"inner": "INNER", "left": "LEFT"}[node.how]
+        using = ", ".join(_quote(c) for c in node.on)
+        return f"SELECT * FROM ({to_sql(node.left)}) {how} JOIN ({to_sql(node.right)}) USING ({using})"
+    if isinstance(node, Derive):
+        base = output_columns(node.input)
+        cols = [f"{_sql_expr(node.derived[c])} AS {_quote(c)}" if c in node.derived else _quote(c) for c in base]
+        cols += [f"{_sql_expr(e)} AS {_quote(n)}" for n, e in node.derived.items() if n not in base]
+        return f"SELECT {', '.join(cols)} FROM ({to_sql(node.input)})"
+    if isinstance(node, GroupBy):
+        keys = ", ".join(_quote(k) for k in node.keys)
+        aggs = ", ".join(f"{_sql_agg(c, f)} AS {_quote(n)}" for n, (c, f) in node.aggs.items())
+        not_null = " AND ".join(f"{_quote(k)} IS NOT NULL" for k in node.keys)
+        return (f"SELECT {keys}, {aggs} FROM ({to_sql(node.input)}) WHERE {not_null} "
+                f"GROUP BY {keys} ORDER BY {keys}")
+    raise TypeError(f"Nó de plano desconhecido: {type(node).__name__}")
+
+
+def _run_duckdb(node) -> pd.DataFrame:
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("engine='duckdb' requer o pacote duckdb (pip install duckdb)")
+    with duckdb.connect() as con:
+        return con.execute(to_sql(node)).df()
+
+
+_RUNNERS = {"pandas": _run_pandas, "polars": _run_polars, "duckdb": _run_duckdb}
+
+
+def run_plan(plan, engine: str = None) -> pd.DataFrame:
+    """
+    Executa um plano relacional no engine escolhido.
+
+    Parâmetros:
+    - plan: nó raiz do plano (Scan, Filter, Join, Derive, GroupBy)
+    - engine: 'pandas', 'polars' ou 'duckdb' (padrão: DEFAULT_ENGINE)
+
+    Retorna:
+    - DataFrame pandas com as colunas de output_columns(plan)
+    """
+    engine = engine or DEFAULT_ENGINE
+    if engine not in _RUNNERS:
+        raise ValueError(f"Engine '{engine}' desconhecido; use um de {ENGINES}")
+    return _RUNNERS[engine](plan).reset_index(drop=True)
@@ -0,0 +1,214 @@
+import hashlib
+import os
+import shutil
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from .data_loader import CACHE_DIR, dataset_fingerprint, load_dataset, prune_versions
+
+GEOLOCATION_FILE = "olist_geolocation_dataset.csv"
+
+EARTH_RADIUS_KM = 6371.0088
+
+_ARRAYS = ["prefix", "lat", "lng", "rows"]
+
+
+def _ball_tree():
+    # scikit-learn é importado só quando um índice é montado (a importação custa ~0,2s)
+    try:
+        from sklearn.neighbors import BallTree
+    except ImportError:  # sem scikit-learn as consultas usam força bruta vetorizada
+        return None
+    return BallTree
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Distância de grande círculo (km) entre pares de coordenadas em graus, vetorizada.
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype="float64")) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class ZipCentroids:
+    """
+    Tabela compacta de centroides por prefixo de CEP, em arrays ordenados por prefixo:
+    prefix (int32), lat/lng (mediana das coordenadas, float64) e rows (linhas de origem, int32).
+    """
+
+    def __init__(self, prefix, lat, lng, rows):
+        self.prefix = prefix
+        self.lat = lat
+        self.lng = lng
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.prefix)
+
+    def positions(self, prefixes) -> np.ndarray:
+        """
+        Posição de cada prefixo na tabela (-1 quando o prefixo não tem centroide).
+        """
+        keys = pd.to_numeric(pd.Series(np.asarray(prefixes)), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        if not len(self.prefix):
+            return np.full(len(keys), -1)
+        pos = np.clip(np.searchsorted(self.prefix, keys), 0, len(self.prefix) - 1)
+        return np.where(self.prefix[pos] == keys, pos, -1)
+
+    def lookup(self, prefixes):
+        """
+        Coordenadas (lat, lng) de cada prefixo; NaN quando o prefixo não existe na tabela.
+        """
+        pos = self.positions(prefixes)
+        found = pos >= 0
+        lat = np.full(len(pos), np.nan)
+        lng = np.full(len(pos), np.nan)
+        lat[found] = self.lat[pos[found]]
+        lng[found] = self.lng[pos[found]]
+        return lat, lng
+
+    def attach(self, df: pd.DataFrame, zip_col: str, lat_col: str = "lat", lng_col: str = "lng") -> pd.DataFrame:
+        """
+        Devolve uma cópia de df com as colunas de coordenadas do prefixo em zip_col.
+        """
+        lat, lng = self.lookup(df[zip_col].to_numpy())
+        out = df.copy()
+        out[lat_col] = lat
+        out[lng_col] = lng
+        return out
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "geolocation_zip_code_prefix": self.prefix,
+            "lat": self.lat,
+            "lng": self.lng,
+            "rows": self.rows,
+        })
+
+
+def build_zip_centroids() -> ZipCentroids:
+    """
+    Calcula os centroides (mediana de lat/lng) por prefixo a partir de olist_geolocation_dataset.csv.
+    """
+    geoloc = load_dataset(GEOLOCATION_FILE, columns=["geolocation_zip_code_prefix", "geolocation_lat", "geolocation_lng"])
+    agg = geoloc.groupby("geolocation_zip_code_prefix").agg(
+        lat=("geolocation_lat", "median"),
+        lng=("geolocation_lng", "median"),
+        rows=("geolocation_lat", "size")
+    ).sort_index()
+    return ZipCentroids(
+        agg.index.to_numpy(dtype="int32"),
+        agg["lat"].to_numpy(dtype="float64"),
+        agg["lng"].to_numpy(dtype="float64"),
+        agg["rows"].to_numpy(dtype="int32"),
+    )
+
+
+def _centroids_dir() -> str:
+    key = hashlib.sha1(dataset_fingerprint(GEOLOCATION_FILE).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"zip_centroids-{key}")
+
+
+def load_zip_centroids() -> ZipCentroids:
+    """
+    Carrega a tabela de centroides por prefixo, calculando-a uma única vez por versão do CSV
+    de geolocalização. Os arrays ficam persistidos em .npy e são abertos por memory-map; no
+    processo, a tabela fica em memória enquanto o CSV não mudar.
+    """
+    return _load_zip_centroids(_centroids_dir())
+
+
+@lru_cache(maxsize=1)
+def _load_zip_centroids(directory: str) -> ZipCentroids:
+    paths = [os.path.join(directory, f"{name}.npy") for name in _ARRAYS]
+    if all(os.path.exists(p) for p in paths):
+        return ZipCentroids(*(np.load(p, mmap_mode="r") for p in paths))
+
+    centroids = build_zip_centroids()
+    try:
+        tmp = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(centroids, name))
+        os.replace(tmp, directory)
+    except OSError:
+        # outro processo pode ter gravado a mesma versão antes
+        shutil.rmtree(tmp, ignore_errors=True)
+        return centroids
+    # Tabelas de versões anteriores do CSV, só depois da nova gravada
+    prune_versions(directory)
+    return centroids
+
+
+class ZipIndex:
+    """
+    Índice espacial (BallTree com métrica haversine) sobre os centroides de prefixo de CEP.
+    Sem scikit-learn, as consultas calculam a distância para todos os centroides de forma vetorizada.
+    """
+
+    def __init__(self, centroids: ZipCentroids = None):
+        self.centroids = centroids if centroids is not None else load_zip_centroids()
+        self._points = np.radians(np.column_stack([self.centroids.lat, self.centroids.lng]))
+        BallTree = _ball_tree() if len(self._points) else None
+        self._tree = BallTree(self._points, metric="haversine") if BallTree is not None else None
+
+    def _query_points(self, lat, lng):
+        return np.radians(np.column_stack([np.atleast_1d(lat), np.atleast_1d(lng)]).astype("float64"))
+
+    def nearest(self, lat, lng, k: int = 5):
+        """
+        Os k centroides mais próximos de cada coordenada.
+
+        Retorna:
+        - (prefixos, distâncias em km), arrays de forma (n_consultas, k)
+        """
+        k = min(k, len(self.centroids))
+        points = self._query_points(lat, lng)
+        if self._tree is not None:
+            dist, idx = self._tree.query(points, k=k)
+            dist = dist * EARTH_RADIUS_KM
+        else:
+            all_dist = haversine_km(np.degrees(points[:, [0]]), np.degrees(points[:, [1]]),
+                                    self.centroids.lat[None, :], self.centroids.lng[None, :])
+            idx = np.argsort(all_dist, axis=1)[:, :k]
+            dist = np.take_along_axis(all_dist, idx, axis=1)
+        return self.centroids.prefix[idx], dist
+
+    def within_radius(self, lat, lng, radius_km: float):
+        """
+        Centroides a até radius_km de cada coordenada.
+
+        Retorna:
+        - lista (uma entrada por consulta) de pares (prefixos, distâncias em km)
+        """
+        points = self._query_points(lat, lng)
+        if self._tree is not None:
+            idx, dist = self._tree.query_radius(points, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True)
+            return [(self.centroids.prefix[i], d * EARTH_RADIUS_KM) for i, d in zip(idx, dist)]
+        out = []
+        for p in points:
+            d = haversine_km(np.degrees(p[0]), np.degrees(p[1]), self.centroids.lat, self.centroids.lng)
+            hit = np.flatnonzero(d <= radius_km)
+            order = np.argsort(d[hit])
+            out.append((self.centroids.prefix[hit[order]], d[hit[order]]))
+        return out
+
+    def neighbors(self, prefix: int, k: int = 5):
+        """
+        Os k prefixos mais próximos do centroide de um prefixo (incluindo ele próprio).
+        """
+        lat, lng = self.centroids.lookup([prefix])
+        if np.isnan(lat[0]):
+            raise KeyError(f"Prefixo de CEP {prefix} sem geolocalização")
+        prefixes, dist = self.nearest(lat, lng, k)
+        return prefixes[0], dist[0]
+
+    def prefixes_within(self, prefix: int, radius_km: float):
+        """
+        Prefixos cujo centroide está a até radius_km do centroide de um prefixo.
+        """
+        lat, lng = self.centroids.lookup([prefix])
+        if np.isnan(lat[0]):
+            raise KeyError(f"Prefixo de CEP {prefix} sem geolocalização")
+        return self.within_radius(lat, lng, radius_km)[0]
@@ -0,0 +1,379 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from .data_loader import CACHE_DIR, dataset_fingerprint, dataset_path, load_dataset
+from .order_facts import CUSTOMERS, ITEMS, ORDERS, PAYMENTS, PRODUCTS, SELLERS, aggregate_payments, aggregate_tickets
+from .schemas import read_table_chunks
+
+INCREMENTAL_DIR = os.path.join(CACHE_DIR, "incremental")
+
+# Versão do formato do estado persistido (entra no nome do arquivo)
+INCREMENTAL_VERSION = 3
+
+WATERMARK_COLUMN = "order_purchase_timestamp"
+
+# Precisão relativa dos sketches de quantis (medianas). None = exato: guarda a contagem de cada valor
+# distinto por grupo, o que já comprime bem preços/dimensões que se repetem.
+QUANTILE_ACCURACY = None
+
+# Estatísticas parciais necessárias para cada função de agregação (mesmos nomes usados no pandas)
+_PARTIALS = {
+    "size": [],
+    "count": ["n"],
+    "sum": ["sum"],
+    "mean": ["n", "sum"],
+    "std": ["n", "sum", "sumsq"],
+    "min": ["min"],
+    "max": ["max"],
+    "nunique": [],
+    "median": [],
+}
+
+_MERGE = {"n": "sum", "sum": "sum", "sumsq": "sum", "min": "min", "max": "max", "rows": "sum"}
+
+
+class IncrementalAggregate:
+    """
+    Agregado por grupo mantido a partir de estatísticas parciais mescláveis, para ser atualizado
+    apenas com as linhas novas do extrato (order_purchase_timestamp acima da marca d'água).
+
+    Parâmetros:
+    - name: nome do agregado (usado no arquivo persistido)
+    - keys: colunas de agrupamento
+    - aggs: dicionário no formato do pandas named aggregation, {saida: (coluna, funcao)},
+      com funcao em: size, count, sum, mean, std, min, max, nunique, median
+    - quantile_accuracy: precisão relativa do sketch de medianas (None = exato)
+
+    Estado mantido:
+    - stats: contagens, somas, somas de quadrados, mínimos e máximos por grupo
+    - distinct: pares (grupo, valor) distintos para as contagens de distintos (conjunto exato)
+    - sketches: contagem por (grupo, valor quantizado) para as medianas
+    - watermark: maior order_purchase_timestamp já incorporado
+    - watermark_orders: order_ids já incorporados com order_purchase_timestamp igual à marca
+      d'água (pedidos que chegam depois com o mesmo horário ainda entram, sem contar duas vezes)
+    - untimed_orders: order_ids já incorporados sem order_purchase_timestamp (a marca d'água não
+      os alcança; pedidos novos sem data entram na atualização seguinte, uma única vez)
+    - sources: versão (dataset_fingerprint) de cada CSV de origem na última atualização
+
+    Assume extrato só com inserções: linhas antigas alteradas depois de incorporadas
+    (ex: data de entrega preenchida mais tarde) só entram após reset().
+
+    stats cresce com o número de grupos; distinct e sketches, com o número de pares (grupo, valor)
+    distintos, e cada fold mescla o lote com o estado inteiro. Serve para atualizações com poucos
+    lotes grandes (refresh_aggregate); para agregar um extrato inteiro em blocos, ver
+    chunked_aggregate (src/api/streaming.py), que particiona esses agregados pelo grupo.
+    """
+
+    def __init__(self, name, keys, aggs, quantile_accuracy=QUANTILE_ACCURACY):
+        self.name = name
+        self.keys = list(keys)
+        self.aggs = dict(aggs)
+        self.quantile_accuracy = quantile_accuracy
+        self.reset()
+
+    def reset(self):
+        self.stats = None
+        self.distinct = {}
+        self.sketches = {}
+        self.watermark = None
+        self.watermark_orders = frozenset()
+        self.untimed_orders = frozenset()
+        self.sources = {}
+
+    def _stat_columns(self):
+        cols = {}
+        for column, func in self.aggs.values():
+            if func not in _PARTIALS:
+                raise ValueError(f"Agregação '{func}' não suportada em modo incremental")
+            for part in _PARTIALS[func]:
+                cols[f"{column}|{part}"] = (column, part)
+        return cols
+
+    def _quantize(self, values: pd.Series) -> pd.Series:
+        if self.quantile_accuracy is None:
+            return values
+        # Buckets logarítmicos (estilo DDSketch): erro relativo <= quantile_accuracy
+        gamma = (1 + self.quantile_accuracy) / (1 - self.quantile_accuracy)
+        v = values.to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            idx = np.ceil(np.log(np.abs(v)) / np.log(gamma))
+            q = np.sign(v) * 2 * gamma ** idx / (gamma + 1)
+        q = np.where(v == 0, 0.0, q)
+        return pd.Series(q, index=values.index)
+
+    def fold(self, df: pd.DataFrame):
+        """
+        Incorpora um lote de linhas (com as colunas de chave e de medida) ao estado.
+        """
+        if df.empty:
+            return self
+        df = df.dropna(subset=self.keys)
+        grouped = df.groupby(self.keys, observed=True)
+
+        parts = {"rows": grouped.size()}
+        for name, (column, part) in self._stat_columns().items():
+            if part == "sumsq":
+                parts[name] = (df[column].astype("float64") ** 2).groupby([df[k] for k in self.keys], observed=True).sum()
+            else:
+                parts[name] = grouped[column].agg(part if part != "n" else "count")
+        stats = pd.DataFrame(parts)
+        self.stats = stats if self.stats is None else self._merge_stats(stats)
+
+        for column, func in self.aggs.values():
+            if func == "nunique":
+                pairs = df[self.keys + [column]].dropna(subset=[column]).drop_duplicates()
+                old = self.distinct.get(column)
+                if old is not None:
+                    pairs = pd.concat([old, pairs], ignore_index=True).drop_duplicates()
+                self.distinct[column] = pairs.reset_index(drop=True)
+            elif func == "median":
+                values = df[self.keys].copy()
+                values["value"] = self._quantize(df[column].astype("float64"))
+                counts = values.dropna(subset=["value"]).groupby(self.keys + ["value"], observed=True).size()
+                old = self.sketches.get(column)
+                if old is not None:
+                    counts = pd.concat([old, counts]).groupby(level=list(range(len(self.keys) + 1))).sum()
+                self.sketches[column] = counts
+
+        if WATERMARK_COLUMN in df.columns and "order_id" in df.columns:
+            untimed = df.loc[df[WATERMARK_COLUMN].isna(), "order_id"]
+            if len(untimed):
+                self.untimed_orders = self.untimed_orders | frozenset(untimed)
+        if WATERMARK_COLUMN in df.columns:
+            latest = df[WATERMARK_COLUMN].max()
+            if pd.notna(latest) and (self.watermark is None or latest >= self.watermark):
+                at_latest = frozenset(df.loc[df[WATERMARK_COLUMN] == latest, "order_id"]) if "order_id" in df.columns else frozenset()
+                if latest == self.watermark:
+                    at_latest = self.watermark_orders | at_latest
+                self.watermark, self.watermark_orders = latest, at_latest
+        return self
+
+    def pending(self, orders: pd.DataFrame) -> pd.Series:
+        """
+        Máscara dos pedidos ainda não incorporados: acima da marca d'água, exatamente nela mas
+        fora de watermark_orders, ou sem order_purchase_timestamp e fora de untimed_orders.
+        """
+        ts = orders[WATERMARK_COLUMN]
+        untimed = ts.isna() & ~orders["order_id"].isin(self.untimed_orders)
+        if self.watermark is None:
+            return ts.notna() | untimed
+        return (ts > self.watermark) | ((ts == self.watermark) & ~orders["order_id"].isin(self.watermark_orders)) | untimed
+
+    def _merge_stats(self, stats):
+        merged = pd.concat([self.stats, stats])
+        rules = {c: _MERGE[c.split("|")[-1]] for c in merged.columns}
+        return merged.groupby(level=list(range(len(self.keys)))).agg(rules)
+
+    def _median(self, column):
+        counts = self.sketches[column].rename("count").reset_index()
+        counts = counts.sort_values(self.keys + ["value"], kind="stable")
+        grouped = counts.groupby(self.keys, observed=True)["count"]
+        counts["cum"] = grouped.cumsum()
+        total = grouped.transform("sum")
+        medians = []
+        # Mesma convenção do pandas: média dos dois valores centrais quando o total é par
+        for target in ((total - 1) // 2, total // 2):
+            hit = (counts["cum"] > target) & (counts["cum"] - counts["count"] <= target)
+            medians.append(counts[hit].set_index(self.keys)["value"])
+        return (medians[0] + medians[1]) / 2
+
+    def result(self) -> pd.DataFrame:
+        """
+        Calcula o agregado final a partir do estado acumulado, no mesmo formato de um
+        groupby(keys).agg(**aggs).reset_index().
+        """
+        if self.stats is None:
+            return pd.DataFrame(columns=self.keys + list(self.aggs))
+        stats = self.stats
+        out = pd.DataFrame(index=stats.index)
+        for name, (column, func) in self.aggs.items():
+            if func == "size":
+                out[name] = stats["rows"]
+            elif func == "count":
+                out[name] = stats[f"{column}|n"]
+            elif func in ("sum", "min", "max"):
+                out[name] = stats[f"{column}|{func}"]
+            elif func == "mean":
+                out[name] = stats[f"{column}|sum"] / stats[f"{column}|n"]
+            elif func == "std":
+                n = stats[f"{column}|n"]
+                mean = stats[f"{column}|sum"] / n
+                out[name] = np.sqrt(((stats[f"{column}|sumsq"] - n * mean ** 2) / (n - 1)).clip(lower=0))
+            elif func == "nunique":
+                out[name] = self.distinct[column].groupby(self.keys, observed=True)[column].size().reindex(stats.index).fillna(0).astype("int64")
+            elif func == "median":
+                out[name] = self._median(column).reindex(stats.index)
+        return out.sort_index().reset_index()
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        pd.to_pickle(self, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        if not os.path.exists(path):
+            return None
+        return pd.read_pickle(path)
+
+
+def _read(file_name: str, columns, where=None) -> pd.DataFrame:
+    # Lê o CSV em blocos aplicando o filtro em cada bloco: só as linhas selecionadas ficam em memória
+    file_path = os.path.join(dataset_path(), file_name)
+    chunks = [c[where(c)] if where is not None else c for c in read_table_chunks(file_path, file_name, columns)]
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+
+
+def _of_orders(file_name: str, columns, orders: pd.DataFrame, where) -> pd.DataFrame:
+    # Linhas de uma tabela no nível de item/pagamento; com filtro, só as dos pedidos selecionados
+    if where is None:
+        return _read(file_name, columns)
+    return _read(file_name, columns, lambda c: c["order_id"].isin(orders["order_id"]))
+
+
+def _zip_source(where=None):
+    orders = _read(ORDERS, ["order_id", "customer_id", WATERMARK_COLUMN, "order_delivered_customer_date"], where)
+    customers = _read(CUSTOMERS, ["customer_id", "customer_zip_code_prefix"],
+                      None if where is None else lambda c: c["customer_id"].isin(orders["customer_id"]))
+    items = _of_orders(ITEMS, ["order_id", "price", "freight_value"], orders, where)
+    df = orders.merge(customers, on="customer_id", how="left")
+    df = df.merge(aggregate_tickets(items), on="order_id", how="left")
+    df["delivery_time_days"] = (df["order_delivered_customer_date"] - df[WATERMARK_COLUMN]).dt.days
+    return df
+
+
+def _ltv_source(where=None):
+    orders = _read(ORDERS, ["order_id", "customer_id", WATERMARK_COLUMN], where)
+    payments = _of_orders(PAYMENTS, ["order_id", "payment_installments", "payment_value"], orders, where)
+    # Junção interna = pedidos com pagamento registrado (payment_count > 0)
+    return orders.merge(aggregate_payments(payments), on="order_id", how="inner")
+
+
+def _items_source(where, columns):
+    # Itens dos pedidos selecionados, com o order_purchase_timestamp do pedido. Junção interna:
+    # item cujo pedido ainda não está no extrato entra quando o pedido chegar
+    orders = _read(ORDERS, ["order_id", WATERMARK_COLUMN], where)
+    items = _of_orders(ITEMS, ["order_id"] + columns, orders, where)
+    return items.merge(orders, on="order_id", how="inner")
+
+
+def _category_source(where=None):
+    products = load_dataset(PRODUCTS, columns=[
+        "product_id", "product_category_name",
+        "product_weight_g", "product_length_cm", "product_height_cm", "product_width_cm"
+    ])
+    df = _items_source(where, ["product_id", "price", "freight_value"]).merge(products, on="product_id", how="left")
+    df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0)
+    df["freight_value"] = pd.to_numeric(df["freight_value"], errors="coerce").fillna(0)
+    return df
+
+
+def _seller_source(where=None):
+    sellers = load_dataset(SELLERS, columns=["seller_id", "seller_state"])
+    return _items_source(where, ["seller_id", "price", "freight_value"]).merge(sellers, on="seller_id", how="left")
+
+
+# CSVs lidos por cada fonte: a versão deles decide se há linhas novas a incorporar
+SOURCE_FILES = {
+    _zip_source: [ORDERS, CUSTOMERS, ITEMS],
+    _ltv_source: [ORDERS, PAYMENTS],
+    _category_source: [ORDERS, ITEMS, PRODUCTS],
+    _seller_source: [ORDERS, ITEMS, SELLERS],
+}
+
+
+# Agregados mantidos incrementalmente: nome -> (fonte, chaves, agregações). A fonte recebe a
+# máscara dos pedidos a incorporar (None = todos) e só lê do CSV as linhas desses pedidos
+AGGREGATES = {
+    # micro_mercados_zip (frete_vs_compra.py)
+    "zip_summary": (_zip_source, ["customer_zip_code_prefix"], {
+        "pedidos_count": ("order_id", "count"),
+        "avg_ticket": ("order_value", "mean"),
+        "median_ticket": ("order_value", "median"),
+        "avg_delivery_days": ("delivery_time_days", "mean"),
+        "unique_customers": ("customer_id", "nunique"),
+    }),
+    # parcelas_e_ltv (frete_vs_compra.py)
+    "ltv_by_customer": (_ltv_source, ["customer_id"], {
+        "total_revenue": ("payment_value_total", "sum"),
+        "n_orders": ("order_id", "nunique"),
+        "installments_sum": ("payment_installments_sum", "sum"),
+        "payments_count": ("payment_count", "sum"),
+        "max_installments": ("payment_installments_max", "max"),
+    }),
+    # margem_latente_categorias (frete_vs_compra.py)
+    "category_summary": (_category_source, ["product_category_name"], {
+        "qty_sold": ("order_id", "count"),
+        "avg_price": ("price", "mean"),
+        "median_price": ("price", "median"),
+        "avg_freight": ("freight_value", "mean"),
+        "avg_weight_g": ("product_weight_g", "median"),
+        "avg_length_cm": ("product_length_cm", "median"),
+        "avg_height_cm": ("product_height_cm", "median"),
+        "avg_width_cm": ("product_width_cm", "median"),
+    }),
+    "category_product_summary": (_category_source, ["product_category_name", "product_id"], {
+        "qty_sold_prod": ("order_id", "count"),
+        "avg_price_prod": ("price", "mean"),
+    }),
+    # customers_order_and_sellers.py
+    "seller_state_summary": (_seller_source, ["seller_state"], {
+        "price": ("price", "mean"),
+        "freight_value": ("freight_value", "mean"),
+    }),
+    "seller_items": (_seller_source, ["seller_id"], {
+        "items_sold": ("order_id", "size"),
+    }),
+}
+
+
+def _state_path(name: str, files) -> str:
+    # Um estado por dataset (diretório resolvido por dataset_path) e schema das fontes. Tamanho e
+    # mtime dos CSVs ficam de fora da chave: mudam a cada extrato novo, que o estado incorpora
+    schemas = [f"{f}={dataset_fingerprint(f).split('-', 1)[0]}" for f in files]
+    key = "|".join([str(INCREMENTAL_VERSION), os.path.abspath(dataset_path())] + schemas)
+    return os.path.join(INCREMENTAL_DIR, f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.pkl")
+
+
+def _appended(old: dict, new: dict) -> bool:
+    # Extrato só com inserções: nenhum CSV de origem pode ter diminuído desde a última atualização
+    size = lambda fingerprint: int(fingerprint.split("-")[1])
+    return old.keys() == new.keys() and all(size(new[f]) >= size(old[f]) for f in old)
+
+
+def refresh_aggregate(name: str, rebuild: bool = False) -> pd.DataFrame:
+    """
+    Atualiza um agregado registrado em AGGREGATES apenas com os pedidos posteriores à marca
+    d'água persistida e devolve o resultado final.
+
+    A marca d'água é aplicada na leitura: os pedidos são lidos do CSV em blocos, filtrados pelo
+    order_purchase_timestamp, e só os itens/pagamentos desses pedidos são lidos e unidos. Sem
+    mudança nos CSVs de origem, o resultado sai do estado salvo sem ler nada; se algum CSV
+    diminuiu (extrato reescrito), o histórico é reprocessado.
+
+    Parâmetros:
+    - name: nome do agregado (ex: 'zip_summary')
+    - rebuild: descarta o estado salvo e reprocessa todo o histórico
+
+    Retorna:
+    - DataFrame com as chaves do agregado e as colunas de saída
+    """
+    source, keys, aggs = AGGREGATES[name]
+    files = SOURCE_FILES[source]
+    path = _state_path(name, files)
+    sources = {f: dataset_fingerprint(f) for f in files}
+    state = None if rebuild else IncrementalAggregate.load(path)
+    if state is None or state.keys != keys or state.aggs != aggs or not _appended(state.sources, sources):
+        state = IncrementalAggregate(name, keys, aggs)
+    if state.sources == sources:
+        return state.result()
+
+    # Nada incorporado ainda: lê tudo, sem filtro (só pedidos sem data não criam marca d'água)
+    df = source(state.pending if state.stats is not None else None)
+    if not df.empty:
+        state.fold(df)
+    state.sources = sources
+    state.save(path)
+    return state.result()
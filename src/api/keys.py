@@ -0,0 +1,217 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from .data_loader import CACHE_DIR, dataset_fingerprint, dataset_path, load_dataset, prune_versions
+from .profiling import etapa
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # sem pyarrow, dicionários e códigos saem de pd.unique/pd.Index
+    pc = None
+
+ORDERS = "olist_orders_dataset.csv"
+ITEMS = "olist_order_items_dataset.csv"
+PAYMENTS = "olist_order_payments_dataset.csv"
+REVIEWS = "olist_order_reviews_dataset.csv"
+PRODUCTS = "olist_products_dataset.csv"
+SELLERS = "olist_sellers_dataset.csv"
+CUSTOMERS = "olist_customers_dataset.csv"
+
+# Chaves com dicionário de códigos int32 e as tabelas em que aparecem (a primeira é a dona da chave)
+KEYS = {
+    "order_id": [ORDERS, ITEMS, PAYMENTS, REVIEWS],
+    "product_id": [PRODUCTS, ITEMS],
+    "seller_id": [SELLERS, ITEMS],
+    "customer_id": [CUSTOMERS, ORDERS],
+    "customer_unique_id": [CUSTOMERS],
+}
+
+# Nome da coluna de código de cada chave nas tabelas fato (ex: order_id -> order_key)
+KEY_COLUMNS = {key: key.replace("_id", "_key") for key in KEYS}
+
+
+def keys_version() -> str:
+    """
+    Versão dos dicionários de chaves: hash das impressões digitais de todas as tabelas em KEYS.
+    Caches que guardam códigos int32 (tabelas fato, cubo) devem incluí-la na chave, pois uma
+    mudança em qualquer dessas tabelas (ex: avaliações) pode deslocar os códigos.
+    """
+    files = sorted({f for tables in KEYS.values() for f in tables if os.path.exists(os.path.join(dataset_path(), f))})
+    key = "|".join(f"{f}={dataset_fingerprint(f)}" for f in files)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def _keys_dir() -> str:
+    return os.path.join(CACHE_DIR, f"keys-{keys_version()}")
+
+
+def _stem(file_name: str) -> str:
+    return os.path.splitext(file_name)[0]
+
+
+# Arrays já abertos no processo: (diretório da versão, nome) -> array (e, para os dicionários,
+# também a estrutura de busca usada por encode)
+_arrays = {}
+
+
+def _load_array(directory: str, name: str, build) -> np.ndarray:
+    # Um .npy por array, aberto por memory-map; montado (e gravado) só na primeira vez por versão
+    if (directory, name) in _arrays:
+        return _arrays[(directory, name)]
+    path = os.path.join(directory, f"{name}.npy")
+    if os.path.exists(path):
+        array = _arrays[(directory, name)] = np.load(path, mmap_mode="r")
+        return array
+    with etapa("chaves.montar", array=name):
+        array = _arrays[(directory, name)] = build()
+    tmp = None
+    try:
+        created = not os.path.isdir(directory)
+        os.makedirs(directory, exist_ok=True)
+        # Grava num diretório temporário e renomeia: leitores concorrentes nunca veem um .npy parcial
+        tmp = tempfile.mkdtemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+        np.save(os.path.join(tmp, f"{name}.npy"), array)
+        os.replace(os.path.join(tmp, f"{name}.npy"), path)
+        if created:
+            # Dicionários e índices de versões anteriores do dataset, só depois da nova gravada
+            prune_versions(directory)
+    except OSError:
+        pass
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return array
+
+
+def _tables(key: str):
+    return [f for f in KEYS[key] if os.path.exists(os.path.join(dataset_path(), f))]
+
+
+def _column(file_name: str, key: str):
+    return load_dataset(file_name, columns=[key])[key]
+
+
+def key_dictionary(key: str) -> np.ndarray:
+    """
+    Dicionário de uma chave: os valores distintos de todas as tabelas em que ela aparece
+    (KEYS), ordenados. O código int32 de um valor é a sua posição neste array, o mesmo em
+    todas as tabelas.
+
+    Retorna:
+    - array aberto por memory-map, com os ids em bytes (dtype 'S', ids ASCII) ou, se algum
+      id não for ASCII, em texto
+    """
+    def build():
+        if pc is not None:
+            uniques = [pc.unique(pa.array(_column(f, key).array)) for f in _tables(key)]
+            values = pc.unique(pa.chunked_array(uniques).combine_chunks()).drop_null()
+            values = values.take(pc.sort_indices(values)).to_numpy(zero_copy_only=False)
+        else:
+            values = [_column(f, key).dropna().to_numpy(dtype=object) for f in _tables(key)]
+            values = np.sort(pd.unique(np.concatenate(values)))
+        try:
+            # ids ASCII (hexadecimais) gravados como bytes: 1/4 do tamanho em texto Unicode
+            return values.astype("S")
+        except UnicodeEncodeError:
+            return values.astype(str)
+    return _load_array(_keys_dir(), key, build)
+
+
+def encode(key: str, values) -> np.ndarray:
+    """
+    Códigos int32 de valores quaisquer da chave (-1 = ausente ou fora do dicionário).
+
+    Parâmetros:
+    - key: nome da chave (ex: 'order_id')
+    - values: Series, array ou lista de ids
+    """
+    directory = _keys_dir()
+    dictionary = key_dictionary(key)
+    if pc is not None:
+        values = pa.array(values.array if isinstance(values, pd.Series) else values)
+        if (directory, key, pa) not in _arrays:
+            # Busca montada direto dos bytes do dicionário, sem passar por texto Unicode do numpy
+            lookup = pa.array(dictionary, type=pa.binary()).cast(pa.string()) if dictionary.dtype.kind == "S" else pa.array(dictionary)
+            _arrays[(directory, key, pa)] = lookup
+        codes = pc.index_in(values, value_set=_arrays[(directory, key, pa)].cast(values.type))
+        return codes.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int32)
+    if (directory, key, pd.Index) not in _arrays:
+        lookup = np.char.decode(dictionary, "ascii") if dictionary.dtype.kind == "S" else dictionary
+        _arrays[(directory, key, pd.Index)] = pd.Index(lookup.astype(object))
+    values = pd.Series(values).to_numpy(dtype=object, na_value=None)
+    return _arrays[(directory, key, pd.Index)].get_indexer(values).astype(np.int32)
+
+
+def key_codes(file_name: str, key: str) -> np.ndarray:
+    """
+    Códigos int32 da chave em cada linha da tabela (mesma ordem de load_dataset(file_name));
+    -1 onde o valor é ausente.
+    """
+    if file_name not in KEYS[key]:
+        raise KeyError(f"{key} não tem dicionário em {file_name} (tabelas: {KEYS[key]})")
+    return _load_array(_keys_dir(), f"{_stem(file_name)}.{key}", lambda: encode(key, _column(file_name, key)))
+
+
+def positions(left_codes, right_codes, size: int) -> np.ndarray:
+    """
+    Índice posicional de junção: para cada código de left_codes, a linha de right_codes com o
+    mesmo código (-1 quando não há). Os códigos de right_codes devem ser únicos.
+
+    Parâmetros:
+    - left_codes, right_codes: códigos int32 da mesma chave (-1 = ausente)
+    - size: tamanho do dicionário da chave
+
+    Retorna:
+    - array int32 com uma posição por linha de left_codes
+    """
+    right_codes = np.asarray(right_codes)
+    left_codes = np.asarray(left_codes)
+    valid = np.flatnonzero(right_codes >= 0)
+    if len(valid) and np.bincount(right_codes[valid], minlength=size).max() > 1:
+        raise ValueError("Chave repetida no lado direito: a junção não é muitos-para-um")
+    lookup = np.full(size + 1, -1, dtype=np.int32)
+    lookup[right_codes[valid]] = valid
+    # o código -1 (ausente) cai na última posição de lookup, sempre -1
+    return lookup[left_codes]
+
+
+def join_index(left_file: str, right_file: str, key: str) -> np.ndarray:
+    """
+    Índice posicional (persistido) de left_file para right_file pela chave: a linha de
+    right_file correspondente a cada linha de left_file, ou -1. Exige chave única em right_file.
+    """
+    def build():
+        size = len(key_dictionary(key))
+        return positions(key_codes(left_file, key), key_codes(right_file, key), size)
+    return _load_array(_keys_dir(), f"{_stem(left_file)}.{_stem(right_file)}.{key}", build)
+
+
+def take_rows(df: pd.DataFrame, pos) -> pd.DataFrame:
+    """
+    Linhas de df nas posições pos (np.take), com linhas vazias onde pos é -1, com os mesmos
+    dtypes que um left join do pandas produziria (inteiros sem extensão viram float com NaN).
+    """
+    pos = np.asarray(pos)
+    if len(pos) and pos.min() >= 0:
+        return df.take(pos).reset_index(drop=True)
+    return pd.DataFrame({
+        c: pd.api.extensions.take(df[c].array, pos, allow_fill=True) for c in df.columns
+    })
+
+
+def left_join(left: pd.DataFrame, right: pd.DataFrame, pos, on: str) -> pd.DataFrame:
+    """
+    Equivalente a left.merge(right, on=on, how="left") com chave única em right, a partir do
+    índice posicional pos (uma posição de right por linha de left, -1 = sem correspondência).
+    """
+    right = right.drop(columns=[on])
+    overlap = set(left.columns) & set(right.columns)
+    if overlap:
+        raise ValueError(f"Colunas repetidas na junção: {sorted(overlap)}")
+    taken = take_rows(right, pos)
+    taken.index = left.index
+    return pd.concat([left, taken], axis=1)
@@ -0,0 +1,221 @@
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from .data_loader import (
+    CACHE_DIR, dataset_fingerprint, load_dataset,
+    _read_snapshot, _remember, _tables, _write_snapshot
+)
+from .keys import KEY_COLUMNS, encode, key_codes, key_dictionary, keys_version, join_index, left_join, positions
+from .profiling import etapa
+
+# Incrementar quando as colunas ou as regras de montagem das tabelas fato mudarem
+FACTS_VERSION = 2
+
+ITEMS = "olist_order_items_dataset.csv"
+ORDERS = "olist_orders_dataset.csv"
+PRODUCTS = "olist_products_dataset.csv"
+SELLERS = "olist_sellers_dataset.csv"
+CUSTOMERS = "olist_customers_dataset.csv"
+PAYMENTS = "olist_order_payments_dataset.csv"
+
+SOURCES = [ITEMS, ORDERS, PRODUCTS, SELLERS, CUSTOMERS, PAYMENTS]
+
+ORDER_COLUMNS = [
+    "order_id", "customer_id", "order_status", "order_purchase_timestamp",
+    "order_delivered_customer_date", "order_estimated_delivery_date"
+]
+CUSTOMER_COLUMNS = [
+    "customer_id", "customer_unique_id", "customer_zip_code_prefix", "customer_city", "customer_state"
+]
+SELLER_COLUMNS = ["seller_id", "seller_zip_code_prefix", "seller_city", "seller_state"]
+
+
+def _facts_path(name: str) -> str:
+    # As colunas *_key guardam códigos dos dicionários de chaves, que dependem também de tabelas
+    # fora de SOURCES (ex: avaliações, para order_id)
+    key = "|".join([str(FACTS_VERSION), keys_version()] + [dataset_fingerprint(f) for f in SOURCES])
+    return os.path.join(CACHE_DIR, f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.feather")
+
+
+def aggregate_payments(payments: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agregados de pagamento por pedido, com a mesma limpeza usada nas análises
+    (valor ausente = 0, parcelas ausentes = 1).
+    """
+    payments = payments.copy()
+    payments["payment_value"] = pd.to_numeric(payments["payment_value"], errors="coerce").fillna(0)
+    payments["payment_installments"] = pd.to_numeric(payments["payment_installments"], errors="coerce").fillna(1)
+    return payments.groupby("order_id").agg(
+        payment_value_total=("payment_value", "sum"),
+        payment_count=("payment_value", "size"),
+        payment_installments_sum=("payment_installments", "sum"),
+        payment_installments_max=("payment_installments", "max")
+    ).reset_index()
+
+
+def aggregate_tickets(items: pd.DataFrame) -> pd.DataFrame:
+    """
+    Valor, frete e quantidade de itens por pedido (preço/frete ausentes = 0).
+    """
+    items = items.copy()
+    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0)
+    items["freight_value"] = pd.to_numeric(items["freight_value"], errors="coerce").fillna(0)
+    return items.groupby("order_id").agg(
+        order_value=("price", "sum"),
+        freight_total=("freight_value", "sum"),
+        items_count=("price", "size")
+    ).reset_index()
+
+
+def _payment_aggregates() -> pd.DataFrame:
+    payments = load_dataset("olist_order_payments_dataset.csv", columns=["order_id", "payment_installments", "payment_value"])
+    return aggregate_payments(payments)
+
+
+def _by_key(aggregate, file_name: str, columns) -> pd.DataFrame:
+    # Agregado por pedido calculado sobre os códigos int32 de order_id (sem hash das strings);
+    # a coluna order_id do resultado traz os códigos
+    df = load_dataset(file_name, columns=columns)
+    df["order_id"] = key_codes(file_name, "order_id")
+    return aggregate(df)
+
+
+def _follow(first, second) -> np.ndarray:
+    # Composição de índices posicionais: a -> b seguido de b -> c (ausente em qualquer passo = -1)
+    first = np.asarray(first)
+    return np.where(first >= 0, np.asarray(second)[first], -1).astype(np.int32)
+
+
+def build_item_facts() -> pd.DataFrame:
+    """
+    Monta a tabela fato no nível de item de pedido:
+    itens + pedidos + produtos + vendedores + clientes + agregados de pagamento do pedido,
+    mais os códigos int32 das chaves (order_key, product_key, seller_key, customer_key,
+    customer_unique_key; ver src/api/keys.py).
+
+    Todas as junções são left joins a partir de olist_order_items_dataset.csv,
+    portanto a tabela tem exatamente uma linha por item. As junções usam os índices
+    posicionais persistidos de src/api/keys.py (np.take em vez de hash dos ids de 32
+    caracteres); com chave repetida numa tabela de dimensão, voltam a ser merges do pandas.
+    """
+    items = load_dataset(ITEMS)
+    orders = load_dataset(ORDERS, columns=ORDER_COLUMNS)
+    products = load_dataset(PRODUCTS)
+    sellers = load_dataset(SELLERS, columns=SELLER_COLUMNS)
+    customers = load_dataset(CUSTOMERS, columns=CUSTOMER_COLUMNS)
+
+    with etapa("item_facts.merges", rows_in=items) as e:
+        try:
+            order_pos = join_index(ITEMS, ORDERS, "order_id")
+            customer_pos = _follow(order_pos, join_index(ORDERS, CUSTOMERS, "customer_id"))
+            payments = _by_key(aggregate_payments, PAYMENTS, ["order_id", "payment_installments", "payment_value"])
+            payment_pos = positions(key_codes(ITEMS, "order_id"), payments["order_id"], len(key_dictionary("order_id")))
+            df = left_join(items, orders, order_pos, "order_id")
+            df = left_join(df, products, join_index(ITEMS, PRODUCTS, "product_id"), "product_id")
+            df = left_join(df, sellers, join_index(ITEMS, SELLERS, "seller_id"), "seller_id")
+            df = left_join(df, customers, customer_pos, "customer_id")
+            df = left_join(df, payments, payment_pos, "order_id")
+        except ValueError:
+            payments = _payment_aggregates()
+            df = items.merge(orders, on="order_id", how="left")
+            df = df.merge(products, on="product_id", how="left")
+            df = df.merge(sellers, on="seller_id", how="left")
+            df = df.merge(customers, on="customer_id", how="left")
+            df = df.merge(payments, on="order_id", how="left")
+            return e.saida(_with_keys(df, ["order_id", "product_id", "seller_id", "customer_id", "customer_unique_id"]))
+        df[KEY_COLUMNS["order_id"]] = np.array(key_codes(ITEMS, "order_id"))
+        df[KEY_COLUMNS["product_id"]] = np.array(key_codes(ITEMS, "product_id"))
+        df[KEY_COLUMNS["seller_id"]] = np.array(key_codes(ITEMS, "seller_id"))
+        df[KEY_COLUMNS["customer_id"]] = _follow(customer_pos, key_codes(CUSTOMERS, "customer_id"))
+        df[KEY_COLUMNS["customer_unique_id"]] = _follow(customer_pos, key_codes(CUSTOMERS, "customer_unique_id"))
+        return e.saida(df)
+
+
+def build_order_facts() -> pd.DataFrame:
+    """
+    Monta a tabela fato no nível de pedido:
+    pedidos + clientes + agregados dos itens (valor, frete, quantidade) + agregados de pagamento,
+    mais os códigos int32 das chaves (order_key, customer_key, customer_unique_key).
+
+    Pedidos sem itens ou sem pagamentos são mantidos, com os agregados correspondentes vazios.
+    Junções por índice posicional, como em build_item_facts.
+    """
+    orders = load_dataset(ORDERS, columns=ORDER_COLUMNS)
+    customers = load_dataset(CUSTOMERS, columns=CUSTOMER_COLUMNS)
+
+    with etapa("order_facts.merges", rows_in=orders) as e:
+        try:
+            size = len(key_dictionary("order_id"))
+            order_codes = key_codes(ORDERS, "order_id")
+            customer_pos = join_index(ORDERS, CUSTOMERS, "customer_id")
+            tickets = _by_key(aggregate_tickets, ITEMS, ["order_id", "price", "freight_value"])
+            payments = _by_key(aggregate_payments, PAYMENTS, ["order_id", "payment_installments", "payment_value"])
+            df = left_join(orders, customers, customer_pos, "customer_id")
+            df = left_join(df, tickets, positions(order_codes, tickets["order_id"], size), "order_id")
+            df = left_join(df, payments, positions(order_codes, payments["order_id"], size), "order_id")
+        except ValueError:
+            items = load_dataset(ITEMS, columns=["order_id", "price", "freight_value"])
+            df = orders.merge(customers, on="customer_id", how="left")
+            df = df.merge(aggregate_tickets(items), on="order_id", how="left")
+            df = df.merge(_payment_aggregates(), on="order_id", how="left")
+            return e.saida(_with_keys(df, ["order_id", "customer_id", "customer_unique_id"]))
+        df[KEY_COLUMNS["order_id"]] = np.array(order_codes)
+        df[KEY_COLUMNS["customer_id"]] = np.array(key_codes(ORDERS, "customer_id"))
+        df[KEY_COLUMNS["customer_unique_id"]] = _follow(customer_pos, key_codes(CUSTOMERS, "customer_unique_id"))
+        return e.saida(df)
+
+
+def _with_keys(df: pd.DataFrame, keys) -> pd.DataFrame:
+    # Códigos das chaves por busca no dicionário (caminho com merges do pandas)
+    for key in keys:
+        df[KEY_COLUMNS[key]] = encode(key, df[key])
+    return df
+
+
+def _load_facts(name: str, builder, columns=None) -> pd.DataFrame:
+    columns = list(columns) if columns is not None else None
+    if (name, None) in _tables:
+        _tables.move_to_end((name, None))
+        df = _tables[(name, None)]
+        return (df[columns] if columns is not None else df).copy()
+
+    snapshot = _facts_path(name)
+    with etapa(f"ler_{name}") as e:
+        df = e.saida(_read_snapshot(snapshot, columns))
+    if df is not None:
+        return df
+
+    with etapa(f"montar_{name}") as e:
+        df = e.saida(builder())
+    with etapa("gravar_snapshot", rows_in=df, arquivo=name):
+        _write_snapshot(df, snapshot)
+    _remember((name, None), df)
+    return (df[columns] if columns is not None else df).copy()
+
+
+def load_item_facts(columns=None) -> pd.DataFrame:
+    """
+    Carrega a tabela fato de itens (ver build_item_facts), montando-a apenas uma vez por
+    versão dos CSVs de origem. As execuções seguintes leem o snapshot Feather persistido.
+
+    Parâmetros:
+    - columns: lista opcional de colunas; apenas essas são lidas do snapshot
+
+    Retorna:
+    - DataFrame com uma linha por item de pedido
+    """
+    return _load_facts("item_facts", build_item_facts, columns)
+
+
+def load_order_facts(columns=None) -> pd.DataFrame:
+    """
+    Carrega a tabela fato de pedidos (ver build_order_facts), com o mesmo cache de load_item_facts.
+
+    Parâmetros:
+    - columns: lista opcional de colunas; apenas essas são lidas do snapshot
+
+    Retorna:
+    - DataFrame com uma linha por pedido
+    """
+    return _load_facts("order_facts", build_order_facts, columns)
@@ -0,0 +1,119 @@
+from .engine import GroupBy, Derive, Join, Scan, col, days_between
+
+# Planos relacionais das agregações centrais das análises, executáveis em qualquer engine
+# de src/api/engine.py (run_plan(PLANS[nome], engine=...)). Mesmos nomes e colunas de
+# AGGREGATES em src/api/incremental.py.
+
+ITEMS = "olist_order_items_dataset.csv"
+ORDERS = "olist_orders_dataset.csv"
+PAYMENTS = "olist_order_payments_dataset.csv"
+PRODUCTS = "olist_products_dataset.csv"
+SELLERS = "olist_sellers_dataset.csv"
+CUSTOMERS = "olist_customers_dataset.csv"
+
+
+def _items_products():
+    # Itens com preço/frete limpos (ausente = 0) e atributos do produto
+    items = Derive(Scan(ITEMS, ["order_id", "product_id", "price", "freight_value"]), {
+        "price": col("price").fill_null(0),
+        "freight_value": col("freight_value").fill_null(0),
+    })
+    products = Scan(PRODUCTS, [
+        "product_id", "product_category_name",
+        "product_weight_g", "product_length_cm", "product_height_cm", "product_width_cm"
+    ])
+    return Join(items, products, on="product_id", how="left")
+
+
+def _payments_per_order():
+    # Mesma limpeza de order_facts.aggregate_payments (valor ausente = 0, parcelas ausentes = 1)
+    payments = Derive(Scan(PAYMENTS, ["order_id", "payment_installments", "payment_value"]), {
+        "payment_value": col("payment_value").fill_null(0),
+        "payment_installments": col("payment_installments").fill_null(1),
+    })
+    return GroupBy(payments, "order_id", {
+        "payment_value_total": ("payment_value", "sum"),
+        "payment_count": ("payment_value", "size"),
+        "payment_installments_sum": ("payment_installments", "sum"),
+        "payment_installments_max": ("payment_installments", "max"),
+    })
+
+
+def _tickets_per_order():
+    # Mesma limpeza de order_facts.aggregate_tickets
+    items = Derive(Scan(ITEMS, ["order_id", "price"]), {"price": col("price").fill_null(0)})
+    return GroupBy(items, "order_id", {"order_value": ("price", "sum")})
+
+
+def category_summary():
+    return GroupBy(_items_products(), "product_category_name", {
+        "qty_sold": ("order_id", "count"),
+        "avg_price": ("price", "mean"),
+        "median_price": ("price", "median"),
+        "avg_freight": ("freight_value", "mean"),
+        "avg_weight_g": ("product_weight_g", "median"),
+        "avg_length_cm": ("product_length_cm", "median"),
+        "avg_height_cm": ("product_height_cm", "median"),
+        "avg_width_cm": ("product_width_cm", "median"),
+    })
+
+
+def category_product_summary():
+    return GroupBy(_items_products(), ["product_category_name", "product_id"], {
+        "qty_sold_prod": ("order_id", "count"),
+        "avg_price_prod": ("price", "mean"),
+    })
+
+
+def ltv_by_customer():
+    # Junção interna = apenas pedidos com pagamento registrado
+    orders = Join(Scan(ORDERS, ["order_id", "customer_id"]), _payments_per_order(), on="order_id", how="inner")
+    return GroupBy(orders, "customer_id", {
+        "total_revenue": ("payment_value_total", "sum"),
+        "n_orders": ("order_id", "nunique"),
+        "installments_sum": ("payment_installments_sum", "sum"),
+        "payments_count": ("payment_count", "sum"),
+        "max_installments": ("payment_installments_max", "max"),
+    })
+
+
+def zip_summary():
+    orders = Scan(ORDERS, ["order_id", "customer_id", "order_purchase_timestamp", "order_delivered_customer_date"])
+    orders = Join(orders, Scan(CUSTOMERS, ["customer_id", "customer_zip_code_prefix"]), on="customer_id", how="left")
+    orders = Join(orders, _tickets_per_order(), on="order_id", how="left")
+    orders = Derive(orders, {
+        "delivery_time_days": days_between(col("order_delivered_customer_date"), col("order_purchase_timestamp")),
+    })
+    return GroupBy(orders, "customer_zip_code_prefix", {
+        "pedidos_count": ("order_id", "count"),
+        "avg_ticket": ("order_value", "mean"),
+        "median_ticket": ("order_value", "median"),
+        "avg_delivery_days": ("delivery_time_days", "mean"),
+        "unique_customers": ("customer_id", "nunique"),
+    })
+
+
+def seller_state_summary():
+    # customers_order_and_sellers.py: preço e frete médios por estado do vendedor
+    items = Join(Scan(ITEMS, ["order_id", "seller_id", "price", "freight_value"]),
+                 Scan(SELLERS, ["seller_id", "seller_state"]), on="seller_id", how="inner")
+    return GroupBy(items, "seller_state", {
+        "price": ("price", "mean"),
+        "freight_value": ("freight_value", "mean"),
+    })
+
+
+def seller_items():
+    return GroupBy(Scan(ITEMS, ["order_id", "seller_id"]), "seller_id", {
+        "items_sold": ("order_id", "size"),
+    })
+
+
+PLANS = {
+    "zip_summary": zip_summary,
+    "ltv_by_customer": ltv_by_customer,
+    "category_summary": category_summary,
+    "category_product_summary": category_product_summary,
+    "seller_state_summary": seller_state_summary,
+    "seller_items": seller_items,
+}
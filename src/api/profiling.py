@@ -0,0 +1,216 @@
+import atexit
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+# OLIST_PROFILE=1 liga a instrumentação no processo (e nos processos filhos, que herdam o
+# ambiente); o trace é gravado ao final em OLIST_PROFILE_DIR (padrão: CACHE_DIR/profiles)
+_enabled = os.environ.get("OLIST_PROFILE", "0") not in ("", "0")
+_events = []
+
+try:
+    _PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+except (AttributeError, ValueError, OSError):
+    _PAGE_MB = None
+
+
+def _rss_mb() -> float:
+    # Memória residente atual (Linux, via /proc); nos demais sistemas, o pico do processo
+    if _PAGE_MB is not None:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * _PAGE_MB
+        except OSError:
+            pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rows(obj):
+    if obj is None or isinstance(obj, int):
+        return obj
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+class _Etapa:
+    # Uma etapa medida: tempo de parede, tempo de CPU, linhas de entrada/saída e variação de memória
+    __slots__ = ("name", "args", "rows_in", "rows_out", "_start", "_wall", "_cpu", "_mem")
+
+    def __init__(self, name: str, rows_in, args: dict):
+        self.name = name
+        self.args = args
+        self.rows_in = _rows(rows_in)
+        self.rows_out = None
+
+    def __bool__(self):
+        return True
+
+    def saida(self, obj):
+        """Registra as linhas de saída da etapa (len(obj), ou o próprio número)."""
+        self.rows_out = _rows(obj)
+        return obj
+
+    def __enter__(self):
+        self._mem = _rss_mb()
+        self._start = time.time_ns() // 1000
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        args = dict(self.args, cpu_ms=round(cpu * 1000, 3), mem_delta_mb=round(_rss_mb() - self._mem, 2))
+        if self.rows_in is not None:
+            args["rows_in"] = self.rows_in
+        if self.rows_out is not None:
+            args["rows_out"] = self.rows_out
+        if exc_type is not None:
+            args["erro"] = exc_type.__name__
+        # Evento completo ("X") do formato Chrome trace; ts e dur em microssegundos
+        _events.append({
+            "name": self.name, "cat": "olist", "ph": "X", "ts": self._start, "dur": round(duration * 1e6, 1),
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+        return False
+
+
+class _Desligada:
+    # Etapa nula usada com a instrumentação desligada: não mede nada
+    __slots__ = ()
+    rows_out = None
+
+    def __bool__(self):
+        return False
+
+    @property
+    def args(self):
+        return {}
+
+    def saida(self, obj):
+        return obj
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_DESLIGADA = _Desligada()
+
+
+def etapa(name: str, rows_in=None, **args):
+    """
+    Context manager que mede uma etapa (tempo de parede, tempo de CPU, linhas e memória).
+    Com a instrumentação desligada devolve uma etapa nula, sem custo de medição.
+
+    Parâmetros:
+    - name: nome da etapa no trace (ex: 'load_dataset', 'frete_vs_compra.agregar')
+    - rows_in: linhas de entrada (número ou objeto com len)
+    - args: atributos extras gravados no evento (ex: arquivo='olist_orders_dataset.csv')
+
+    Uso:
+        with etapa("agregar", rows_in=df) as e:
+            resumo = e.saida(df.groupby(...).agg(...))
+    """
+    if not _enabled:
+        return _DESLIGADA
+    return _Etapa(name, rows_in, args)
+
+
+def perfilado(name: str = None):
+    """
+    Decorador que mede cada chamada da função como uma etapa; as linhas de saída vêm do valor
+    de retorno quando ele tem len (DataFrame, Series...).
+    """
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Etapa(label, None, {}) as e:
+                return e.saida(func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def enable():
+    """Liga a instrumentação no processo atual."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Desliga a instrumentação (os eventos já registrados são mantidos)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def events() -> list:
+    """Eventos registrados no processo, no formato Chrome trace."""
+    return list(_events)
+
+
+def record(new_events):
+    """Acrescenta eventos vindos de outro processo (ex: dos processos do relatório paralelo)."""
+    _events.extend(new_events)
+
+
+def clear():
+    _events.clear()
+
+
+def summary() -> dict:
+    """
+    Totais por etapa.
+
+    Retorna:
+    - dicionário {etapa: {"chamadas", "wall_s", "cpu_s"}}
+    """
+    totals = {}
+    for event in _events:
+        t = totals.setdefault(event["name"], {"chamadas": 0, "wall_s": 0.0, "cpu_s": 0.0})
+        t["chamadas"] += 1
+        t["wall_s"] += event["dur"] / 1e6
+        t["cpu_s"] += event["args"]["cpu_ms"] / 1000
+    return totals
+
+
+def export_trace(path: str = None) -> str:
+    """
+    Grava os eventos registrados como JSON no formato Chrome trace (chrome://tracing, Perfetto).
+
+    Parâmetros:
+    - path: arquivo de saída (padrão: OLIST_PROFILE_DIR/trace-<pid>.json)
+
+    Retorna:
+    - caminho do arquivo gravado
+    """
+    if path is None:
+        from .data_loader import CACHE_DIR
+        trace_dir = os.environ.get("OLIST_PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+        path = os.path.join(trace_dir, f"trace-{os.getpid()}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": _events, "displayTimeUnit": "ms"}, f)
+    return path
+
+
+@atexit.register
+def _export_at_exit():
+    if _enabled and _events and os.environ.get("OLIST_PROFILE", "0") not in ("", "0"):
+        print(f"✅ Trace de perfil salvo em {export_trace()}")
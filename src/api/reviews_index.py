@@ -0,0 +1,532 @@
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import unicodedata
+from functools import cached_property, lru_cache
+import numpy as np
+import pandas as pd
+from .data_loader import CACHE_DIR, dataset_fingerprint, load_dataset, prune_versions
+from .keys import KEYS, encode, key_dictionary
+from .order_facts import load_item_facts, load_order_facts
+from .profiling import etapa
+from .streaming import iter_chunks
+
+# Incrementar quando a normalização, a tokenização ou os arrays do índice mudarem
+INDEX_VERSION = 1
+
+REVIEWS = "olist_order_reviews_dataset.csv"
+
+# Campos de texto indexados, nesta ordem; as posições do segundo campo começam depois de uma
+# lacuna, para que uma frase nunca case atravessando o título e a mensagem
+TEXT_FIELDS = ["review_comment_title", "review_comment_message"]
+
+# Dimensões de term_frequencies: da tabela fato de itens (um pedido pode ter vários
+# vendedores/categorias), da tabela fato de pedidos ou da própria avaliação
+ITEM_GROUPS = ["seller_id", "seller_state", "product_category_name"]
+ORDER_GROUPS = ["customer_state"]
+GROUPS = ITEM_GROUPS + ORDER_GROUPS + ["review_score"]
+
+# Palavras sem conteúdo (já normalizadas), ignoradas por term_frequencies com stopwords=True.
+# "nao" fica de fora de propósito: "nao recebi", "nao chegou" são justamente as reclamações
+STOPWORDS = frozenset("""
+a o as os um uma uns umas e ou de do da dos das d em no na nos nas ao aos para pra pro por
+pelo pela com sem que se ja foi ser sao esta estao eh era muito mais mas me meu minha eu
+ele ela isso este essa esse como so tambem ate q
+""".split())
+
+_ARRAYS = ["terms", "offsets", "docs", "positions", "term_reviews", "doc_order", "doc_score"]
+
+_QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+
+# Separador dos textos concatenados de um bloco (preservado pela tabela _BULK_FOLD)
+_SEP = "\x01"
+
+
+def _fold_table(keep: str = "") -> bytes:
+    # Tabela byte a byte sobre Latin-1 (que cobre todas as letras acentuadas do português):
+    # letras e dígitos viram minúsculas sem acento (ç -> c, Ã -> a), o resto vira espaço
+    table = bytearray(b" " * 256)
+    for byte in range(256):
+        folded = unicodedata.normalize("NFKD", chr(byte).lower())[:1]
+        if folded.isascii() and folded.isalnum():
+            table[byte] = ord(folded.lower())
+    for char in keep:
+        table[ord(char)] = ord(char)
+    return bytes(table)
+
+
+_FOLD = _fold_table()
+_BULK_FOLD = _fold_table(keep=_SEP)
+
+
+def _latin1(text: str) -> bytes:
+    # Acentos decompostos (letra + diacrítico) são recompostos antes; caracteres fora do
+    # Latin-1 (emojis, aspas tipográficas) viram '?', que a tabela troca por espaço
+    if not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    return text.encode("latin-1", "replace")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalização usada no índice e nas consultas: minúsculas, sem acentos e com tudo o que
+    não é letra ou dígito trocado por espaço (ex: 'Não recebi!' -> 'nao recebi ').
+    """
+    return _latin1(text).translate(_FOLD).decode("ascii")
+
+
+def tokenize(text: str) -> list:
+    """
+    Tokens de um texto, com a mesma normalização do índice.
+    """
+    return normalize_text(text).split()
+
+
+def _tokens(texts) -> tuple:
+    # Tokens (bytes ASCII) de todos os textos e a quantidade por texto. Os textos do bloco são
+    # concatenados e normalizados de uma vez (bytes.translate, em C); o separador sobrevive à
+    # normalização e marca onde cada texto termina
+    values = pd.Series(texts, dtype="object").fillna("").astype(str).tolist()
+    if not values:
+        return np.zeros(0, dtype=object), np.zeros(0, dtype=np.int64)
+    text = _SEP.join(values)
+    if text.count(_SEP) != len(values) - 1:
+        text = _SEP.join(v.replace(_SEP, " ") for v in values)
+    sep = _SEP.encode()
+    tokens = np.array(_latin1(text).translate(_BULK_FOLD).replace(sep, b" " + sep + b" ").split(), dtype=object)
+    breaks = np.flatnonzero(tokens == sep)
+    lengths = np.diff(np.concatenate([[-1], breaks, [len(tokens)]])) - 1
+    return np.delete(tokens, breaks), lengths
+
+
+def _expand(starts, counts) -> np.ndarray:
+    # Concatenação de arange(start, start + count) para cada par, sem laço Python
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    shift = np.repeat(np.asarray(starts, dtype=np.int64) - (np.cumsum(counts) - counts), counts)
+    return shift + np.arange(total)
+
+
+def _member(a, b) -> np.ndarray:
+    # Máscara dos elementos de a presentes em b (ordenado, sem repetição), por busca binária;
+    # np.intersect1d/np.setdiff1d reordenam a concatenação dos dois arrays
+    if not len(b):
+        return np.zeros(len(a), dtype=bool)
+    return b[np.minimum(np.searchsorted(b, a), len(b) - 1)] == a
+
+
+def _intersect(a, b) -> np.ndarray:
+    # Interseção de dois arrays ordenados e sem repetição (busca dos elementos do menor no maior)
+    if len(a) > len(b):
+        a, b = b, a
+    return a[_member(a, b)]
+
+
+def _count(keys) -> tuple:
+    # Valores distintos e contagens (ordenação + vizinhos; np.unique com contagens usa hash e
+    # é bem mais lento para dezenas de milhões de chaves)
+    keys = np.sort(keys)
+    if not len(keys):
+        return keys, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return keys[starts], np.diff(np.append(starts, len(keys)))
+
+
+class ReviewIndex:
+    """
+    Índice invertido posicional sobre o título e a mensagem das avaliações
+    (olist_order_reviews_dataset.csv). Cada avaliação é um documento, identificado pela sua
+    linha no CSV (a mesma ordem de load_dataset). Todos os arrays são numpy compactos:
+
+    - terms: vocabulário ordenado (tokens normalizados por normalize_text, em bytes ASCII)
+    - offsets: postings do termo i em docs/positions[offsets[i]:offsets[i + 1]]
+    - docs, positions: documento e posição de cada ocorrência, ordenados por
+      (termo, documento, posição)
+    - term_reviews: documentos distintos com cada termo
+    - doc_order: código int32 do order_id de cada avaliação (src/api/keys.py; -1 = ausente)
+    - doc_score: nota de cada avaliação (-1 = ausente)
+
+    Consultas (search) respondem a partir dos postings, com busca binária no vocabulário e
+    interseções de arrays ordenados, sem reler os textos.
+    """
+
+    def __init__(self, **arrays):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        # Pares (documento, grupo) já calculados nesta instância, por dimensão
+        self._groups_cache = {}
+
+    def __len__(self):
+        return len(self.doc_order)
+
+    def _term_range(self, token: str) -> tuple:
+        # Intervalo do token no vocabulário; "prefixo*" cobre todos os termos com o prefixo
+        prefix = token.endswith("*")
+        key = token.rstrip("*").encode()
+        lo = int(np.searchsorted(self.terms, key, side="left"))
+        if prefix:
+            hi = int(np.searchsorted(self.terms, key + b"\xff", side="left")) if key else len(self.terms)
+        else:
+            hi = lo + int(lo < len(self.terms) and self.terms[lo] == key)
+        return lo, hi
+
+    def postings(self, token: str) -> tuple:
+        """
+        Ocorrências de um termo normalizado (ou de todos os termos com um prefixo, 'atras*').
+
+        Retorna:
+        - (documentos, posições), ordenados por documento e posição
+        """
+        lo, hi = self._term_range(token)
+        start, end = int(self.offsets[lo]), int(self.offsets[hi])
+        docs = np.asarray(self.docs[start:end])
+        positions = np.asarray(self.positions[start:end])
+        if hi - lo > 1:
+            order = np.lexsort((positions, docs))
+            docs, positions = docs[order], positions[order]
+        return docs, positions
+
+    def documents(self, token: str) -> np.ndarray:
+        """
+        Documentos (ordenados, sem repetição) que contêm o termo ou o prefixo.
+        """
+        docs = self.postings(token)[0]
+        return docs[np.concatenate([[True], docs[1:] != docs[:-1]])] if len(docs) else docs
+
+    @cached_property
+    def _width(self) -> np.int64:
+        # Maior posição + 1: chaves (documento, posição) codificadas como doc * width + posição
+        return np.int64(int(np.max(self.positions, initial=0)) + 1)
+
+    def phrase(self, tokens) -> np.ndarray:
+        """
+        Documentos que contêm os termos em sequência (cada um pode ser um prefixo 'x*').
+        """
+        tokens = list(tokens)
+        if len(tokens) == 1:
+            return self.documents(tokens[0])
+        width = self._width
+        keys = None
+        for i, token in enumerate(tokens):
+            docs, positions = self.postings(token)
+            # Posição em que a frase começaria, para cada ocorrência do i-ésimo termo
+            start = positions.astype(np.int64) - i
+            ok = start >= 0
+            key = docs[ok].astype(np.int64) * width + start[ok]
+            keys = key if keys is None else _intersect(keys, key)
+            if not len(keys):
+                break
+        docs = keys // width
+        return docs[np.concatenate([[True], docs[1:] != docs[:-1]])] if len(docs) else docs
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        Documentos que satisfazem a consulta. Termos separados por espaço são combinados com E;
+        "entre aspas" exige a frase; termo* é um prefixo; -termo (ou -"frase") exclui. A consulta
+        passa pela mesma normalização do índice (acentos e maiúsculas são indiferentes).
+
+        Retorna:
+        - números dos documentos (linhas do CSV de avaliações), ordenados
+        """
+        include, exclude = [], []
+        for minus_phrase, phrase, minus_term, term in _QUERY_TOKEN.findall(query):
+            # "*" é removido pela normalização: os prefixos são reaplicados token a token
+            text = phrase if phrase or minus_phrase else term
+            tokens = [t + "*" if w.endswith("*") else t for w in text.split() for t in tokenize(w)]
+            if tokens:
+                (exclude if (minus_phrase or minus_term) else include).append(tokens)
+        if not include:
+            return np.zeros(0, dtype=np.int64)
+        docs = None
+        # Partes mais raras primeiro (menos avaliações com o termo): interseções menores
+        for tokens in sorted(include, key=self._rarity):
+            found = self.phrase(tokens)
+            docs = found if docs is None else _intersect(docs, found)
+        for tokens in exclude:
+            docs = docs[~_member(docs, self.phrase(tokens))]
+        return docs.astype(np.int64)
+
+    def _rarity(self, tokens) -> int:
+        # Menor número de avaliações entre os termos (ou prefixos) de uma parte da consulta
+        return min(int(np.sum(self.term_reviews[slice(*self._term_range(t))])) for t in tokens)
+
+    @cached_property
+    def _posting_terms(self) -> np.ndarray:
+        # Termo de cada ocorrência (offsets expandidos)
+        return np.repeat(np.arange(len(self.terms), dtype=np.int32), np.diff(self.offsets))
+
+    def _doc_groups(self, by: str) -> tuple:
+        # Pares (documento, grupo) distintos, ordenados por documento, e os rótulos dos grupos
+        if by not in self._groups_cache:
+            self._groups_cache[by] = self._build_doc_groups(by)
+        return self._groups_cache[by]
+
+    def _build_doc_groups(self, by: str) -> tuple:
+        doc_order = np.asarray(self.doc_order)
+        if by == "review_score":
+            docs = np.flatnonzero(np.asarray(self.doc_score) >= 0)
+            labels, groups = np.unique(np.asarray(self.doc_score)[docs], return_inverse=True)
+            return docs, groups.astype(np.int64), labels
+        if by not in ITEM_GROUPS + ORDER_GROUPS:
+            raise KeyError(f"Dimensão desconhecida: '{by}' (disponíveis: {GROUPS})")
+        load = load_item_facts if by in ITEM_GROUPS else load_order_facts
+        facts = load(columns=["order_key", by])
+        codes, labels = pd.factorize(facts[by].astype("object"), sort=True)
+        orders = facts["order_key"].to_numpy()
+        ok = (orders >= 0) & (codes >= 0)
+        pairs = np.unique(orders[ok].astype(np.int64) * len(labels) + codes[ok])
+        pair_order = pairs // max(len(labels), 1)
+        # Pares de cada pedido em pair_order[first[o]:first[o + 1]]
+        first = np.searchsorted(pair_order, np.arange(len(key_dictionary("order_id")) + 1))
+        docs = np.flatnonzero(doc_order >= 0)
+        o = doc_order[docs]
+        counts = first[o + 1] - first[o]
+        rows = _expand(first[o], counts)
+        return np.repeat(docs, counts), pairs[rows] % max(len(labels), 1), np.asarray(labels)
+
+    def term_frequencies(self, by: str = "seller_state", terms=None, docs=None, stopwords: bool = True,
+                         min_reviews: int = 1) -> pd.DataFrame:
+        """
+        Frequência de termos por grupo (vendedor, estado, categoria ou nota), toda com bincount e
+        ordenações de arrays: cada ocorrência é atribuída a todos os grupos do pedido avaliado
+        (um pedido com itens de dois vendedores conta para os dois).
+
+        Parâmetros:
+        - by: dimensão do grupo, entre GROUPS
+        - terms: termos (ou prefixos 'x*') considerados; padrão: o vocabulário inteiro
+        - docs: documentos considerados (ex: o resultado de search ou as avaliações de nota baixa);
+          padrão: todos
+        - stopwords: ignora STOPWORDS
+        - min_reviews: mínimo de avaliações do grupo com o termo
+
+        Retorna:
+        - DataFrame com by, term, occurrences (ocorrências), reviews (avaliações com o termo),
+          group_reviews (avaliações do grupo consideradas) e share (reviews / group_reviews),
+          ordenado por grupo e ocorrências
+        """
+        with etapa("avaliacoes.termos", by=by) as e:
+            return e.saida(self._term_frequencies(by, terms, docs, stopwords, min_reviews))
+
+    def _term_frequencies(self, by, terms, docs, stopwords, min_reviews) -> pd.DataFrame:
+        pair_doc, pair_group, labels = self._doc_groups(by)
+        n_groups = len(labels)
+        n_terms = np.int64(len(self.terms))
+        selected = np.ones(len(self), dtype=bool)
+        if docs is not None:
+            selected[:] = False
+            selected[np.asarray(docs, dtype=np.int64)] = True
+
+        if terms is None:
+            rows = np.arange(len(self.docs))
+        else:
+            ranges = [self._term_range(t + "*" if token.endswith("*") else t) for token in terms for t in tokenize(token)]
+            lo, hi = (np.array(r, dtype=np.int64) for r in zip(*ranges)) if ranges else (np.zeros(0, np.int64),) * 2
+            offsets = np.asarray(self.offsets)
+            rows = np.unique(_expand(offsets[lo], offsets[hi] - offsets[lo]))
+        term = self._posting_terms[rows]
+        doc = np.asarray(self.docs)[rows]
+        keep = selected[doc]
+        if stopwords:
+            stop = np.isin(np.asarray(self.terms), np.array(sorted(STOPWORDS), dtype="S"))
+            keep &= ~stop[term]
+        term, doc = term[keep], doc[keep]
+        # Primeira ocorrência de cada (termo, documento): as ocorrências vêm ordenadas por termo
+        # e documento
+        distinct = np.concatenate([[True], (term[1:] != term[:-1]) | (doc[1:] != doc[:-1])]) if len(doc) else np.zeros(0, dtype=bool)
+
+        # Grupos de cada documento em pair_group[first[d]:first[d + 1]]
+        first = np.searchsorted(pair_doc, np.arange(len(self) + 1))
+        counts = first[doc + 1] - first[doc]
+        group = pair_group[_expand(first[doc], counts)]
+        key = group * n_terms + np.repeat(term, counts)
+        cells, occurrences = _count(key)
+        # Toda célula (grupo, termo) tem ao menos uma primeira ocorrência por avaliação: as
+        # chaves distintas são as mesmas de cells, na mesma ordem
+        reviews = _count(key[np.repeat(distinct, counts)])[1]
+
+        group_reviews = np.bincount(pair_group[selected[pair_doc]], minlength=n_groups)
+        out = pd.DataFrame({
+            by: labels[cells // n_terms],
+            "term": np.asarray(self.terms)[cells % n_terms].astype(str),
+            "occurrences": occurrences.astype("int64"),
+            "reviews": reviews.astype("int64"),
+            "group_reviews": group_reviews[cells // n_terms].astype("int64"),
+        })
+        out["share"] = out["reviews"] / out["group_reviews"]
+        out = out[out["reviews"] >= min_reviews]
+        return out.sort_values([by, "occurrences", "term"], ascending=[True, False, True], kind="stable").reset_index(drop=True)
+
+    @cached_property
+    def _order_items(self) -> tuple:
+        # Linhas da tabela fato de itens agrupadas por pedido: as do pedido o ficam em
+        # rows[first[o]:first[o + 1]]
+        items = load_item_facts(columns=[
+            "order_key", "seller_id", "seller_state", "product_category_name", "customer_state"
+        ])
+        items = items.drop_duplicates(["order_key", "seller_id", "product_category_name"]).reset_index(drop=True)
+        codes = items["order_key"].to_numpy()
+        rows = np.argsort(codes, kind="stable")
+        first = np.searchsorted(codes[rows], np.arange(len(key_dictionary("order_id")) + 1))
+        return items, rows, first
+
+    @cached_property
+    def _review_texts(self) -> pd.DataFrame:
+        return load_dataset(REVIEWS, columns=[
+            "review_id", "order_id", "review_score", "review_creation_date"
+        ] + TEXT_FIELDS)
+
+    def reviews(self, query, limit: int = None) -> pd.DataFrame:
+        """
+        Avaliações que satisfazem a consulta, com o pedido, o vendedor, a categoria e os estados:
+        uma linha por (avaliação, vendedor, categoria) do pedido; avaliações de pedidos sem itens
+        aparecem uma vez, com essas colunas vazias.
+
+        Parâmetros:
+        - query: consulta (ver search) ou array de documentos já selecionados
+        - limit: máximo de avaliações (as primeiras na ordem do CSV)
+
+        Retorna:
+        - DataFrame com review_id, order_id, review_score, review_creation_date, os campos de
+          texto, seller_id, seller_state, product_category_name e customer_state
+        """
+        docs = self.search(query) if isinstance(query, str) else np.asarray(query, dtype=np.int64)
+        if limit is not None:
+            docs = docs[:limit]
+        with etapa("avaliacoes.juntar", rows_in=len(docs)) as e:
+            items, rows, first = self._order_items
+            o = np.asarray(self.doc_order)[docs]
+            start = first[np.maximum(o, 0)]
+            counts = np.where(o >= 0, first[o + 1] - start, 0)
+            has_items = counts > 0
+            n = np.maximum(counts, 1)
+            doc_rows = np.repeat(np.arange(len(docs)), n)
+            # -1 = avaliação sem itens no pedido (linha vazia do lado dos itens)
+            item_rows = np.full(len(doc_rows), -1, dtype=np.int64)
+            item_rows[np.repeat(has_items, n)] = rows[_expand(start[has_items], counts[has_items])]
+            reviews = self._review_texts.take(docs[doc_rows]).reset_index(drop=True)
+            columns = ["seller_id", "seller_state", "product_category_name", "customer_state"]
+            joined = pd.DataFrame({
+                c: pd.api.extensions.take(items[c].array, item_rows, allow_fill=True) for c in columns
+            })
+            return e.saida(pd.concat([reviews, joined], axis=1))
+
+
+def build_review_index() -> ReviewIndex:
+    """
+    Monta o índice em uma única passada, em blocos, pelo CSV de avaliações: cada bloco é
+    normalizado e tokenizado de forma vetorizada e vira postings com códigos locais; no fim os
+    vocabulários dos blocos são unidos e os postings ordenados por termo.
+    """
+    chunks, doc_order, doc_score = [], [], []
+    n_docs = 0
+    columns = ["order_id", "review_score"] + TEXT_FIELDS
+    with etapa("avaliacoes.tokenizar") as e:
+        for chunk in iter_chunks(REVIEWS, columns=columns):
+            ids = n_docs + np.arange(len(chunk), dtype=np.int64)
+            n_docs += len(chunk)
+            doc_order.append(encode("order_id", chunk["order_id"]))
+            doc_score.append(chunk["review_score"].to_numpy(dtype="float64", na_value=-1).astype(np.int8))
+
+            tokens, docs, positions = [], [], []
+            gap = np.zeros(len(chunk), dtype=np.int64)
+            for field in TEXT_FIELDS:
+                field_tokens, lengths = _tokens(chunk[field])
+                tokens.append(field_tokens)
+                docs.append(np.repeat(ids, lengths))
+                # Posição dentro do campo, deslocada pelo tamanho dos campos anteriores + lacuna
+                positions.append(np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(gap, lengths))
+                gap += lengths + 1
+            codes, vocabulary = pd.factorize(np.concatenate(tokens))
+            docs = np.concatenate(docs)
+            # Ordem (documento, posição) dentro do bloco: os campos foram gerados um após o outro
+            order = np.argsort(docs, kind="stable")
+            chunks.append((codes[order].astype(np.int32), docs[order], np.concatenate(positions)[order], np.asarray(vocabulary, dtype=object)))
+        e.saida(n_docs)
+
+    with etapa("avaliacoes.postings") as e:
+        vocabularies = [c[3] for c in chunks]
+        terms = np.unique(np.concatenate(vocabularies)) if vocabularies else np.zeros(0, dtype=object)
+        term = np.concatenate([np.searchsorted(terms, v)[c] for c, _, _, v in chunks]).astype(np.int32) if chunks else np.zeros(0, dtype=np.int32)
+        docs = np.concatenate([c[1] for c in chunks]) if chunks else np.zeros(0, dtype=np.int64)
+        positions = np.concatenate([c[2] for c in chunks]) if chunks else np.zeros(0, dtype=np.int64)
+        # Os blocos já vêm em ordem de documento: a ordenação estável por termo mantém
+        # (documento, posição) dentro de cada termo
+        order = np.argsort(term, kind="stable")
+        term, docs, positions = term[order], docs[order], positions[order]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(term, minlength=len(terms)))]).astype(np.int64)
+        distinct = np.concatenate([[True], (term[1:] != term[:-1]) | (docs[1:] != docs[:-1])]) if len(term) else np.zeros(0, dtype=bool)
+        max_position = int(positions.max(initial=0))
+        e.saida(len(term))
+    return ReviewIndex(
+        terms=terms.astype("S") if len(terms) else np.zeros(0, dtype="S1"),
+        offsets=offsets,
+        docs=docs.astype(np.int32),
+        positions=positions.astype(np.int16 if max_position < 2 ** 15 else np.int32),
+        term_reviews=np.bincount(term[distinct], minlength=len(terms)).astype(np.int32),
+        doc_order=np.concatenate(doc_order) if doc_order else np.zeros(0, dtype=np.int32),
+        doc_score=np.concatenate(doc_score) if doc_score else np.zeros(0, dtype=np.int8),
+    )
+
+
+def _index_dir() -> str:
+    # doc_order usa o dicionário de order_id, que depende de todas as tabelas com essa chave
+    key = "|".join([str(INDEX_VERSION)] + [dataset_fingerprint(f) for f in KEYS["order_id"]])
+    return os.path.join(CACHE_DIR, f"reviews_index-{hashlib.sha1(key.encode()).hexdigest()[:16]}")
+
+
+@lru_cache(maxsize=1)
+def load_review_index() -> ReviewIndex:
+    """
+    Carrega o índice das avaliações, montando-o uma única vez por versão dos CSVs. Os arrays
+    ficam persistidos em .npy (um diretório por versão) e são abertos por memory-map.
+    """
+    directory = _index_dir()
+    paths = [os.path.join(directory, f"{name}.npy") for name in _ARRAYS]
+    if all(os.path.exists(p) for p in paths):
+        with etapa("ler_indice_avaliacoes"):
+            return ReviewIndex(**{name: np.load(p, mmap_mode="r") for name, p in zip(_ARRAYS, paths)})
+
+    with etapa("montar_indice_avaliacoes"):
+        index = build_review_index()
+    try:
+        tmp = f"{directory}.{os.getpid()}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(index, name))
+        os.replace(tmp, directory)
+    except OSError:
+        # outro processo pode ter gravado a mesma versão antes
+        shutil.rmtree(tmp, ignore_errors=True)
+        return index
+    # Versões anteriores do índice, só depois da nova gravada
+    prune_versions(directory)
+    return index
+
+
+def search_reviews(query: str, limit: int = None) -> pd.DataFrame:
+    """
+    Atalho para load_review_index().reviews(query, limit): ver ReviewIndex.reviews.
+    """
+    return load_review_index().reviews(query, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca nos comentários das avaliações e frequência de termos.")
+    parser.add_argument("consulta", nargs="?", help='termos (E), "frase", prefixo* e -exclusão; ex: atras* "nao recebi"')
+    parser.add_argument("--por", choices=GROUPS, help="frequência de termos por grupo (das avaliações da consulta, se houver)")
+    parser.add_argument("--termos", nargs="*", help="termos da frequência (padrão: todos)")
+    parser.add_argument("--top", type=int, default=20, help="linhas mostradas")
+    args = parser.parse_args()
+    index = load_review_index()
+    if args.por:
+        docs = index.search(args.consulta) if args.consulta else None
+        result = index.term_frequencies(args.por, args.termos, docs).sort_values("occurrences", ascending=False, kind="stable")
+    else:
+        docs = index.search(args.consulta or "")
+        print(f"✅ {len(docs)} avaliações encontradas.")
+        result = index.reviews(docs, args.top)
+    print(result.head(args.top).to_string(index=False))
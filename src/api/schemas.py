@@ -0,0 +1,159 @@
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    # ids de 32 caracteres ficam em buffers Arrow em vez de objetos Python
+    ID_DTYPE = "string[pyarrow]"
+except ImportError:
+    ID_DTYPE = "object"
+
+TEXT_DTYPE = ID_DTYPE
+
+# Schema de cada CSV da Olist:
+# - dtypes: tipo de cada coluna (colunas de baixa cardinalidade como 'category')
+# - dates: colunas convertidas para datetime já no carregamento
+SCHEMAS = {
+    "olist_orders_dataset.csv": {
+        "dtypes": {
+            "order_id": ID_DTYPE,
+            "customer_id": ID_DTYPE,
+            "order_status": "category",
+        },
+        "dates": [
+            "order_purchase_timestamp",
+            "order_approved_at",
+            "order_delivered_carrier_date",
+            "order_delivered_customer_date",
+            "order_estimated_delivery_date",
+        ],
+    },
+    "olist_order_items_dataset.csv": {
+        "dtypes": {
+            "order_id": ID_DTYPE,
+            "order_item_id": "Int16",
+            "product_id": ID_DTYPE,
+            "seller_id": ID_DTYPE,
+            "price": "float64",
+            "freight_value": "float64",
+        },
+        "dates": ["shipping_limit_date"],
+    },
+    "olist_order_payments_dataset.csv": {
+        "dtypes": {
+            "order_id": ID_DTYPE,
+            "payment_sequential": "Int16",
+            "payment_type": "category",
+            "payment_installments": "Int16",
+            "payment_value": "float64",
+        },
+        "dates": [],
+    },
+    "olist_order_reviews_dataset.csv": {
+        "dtypes": {
+            "review_id": ID_DTYPE,
+            "order_id": ID_DTYPE,
+            "review_score": "Int8",
+            "review_comment_title": TEXT_DTYPE,
+            "review_comment_message": TEXT_DTYPE,
+        },
+        "dates": ["review_creation_date", "review_answer_timestamp"],
+    },
+    "olist_customers_dataset.csv": {
+        "dtypes": {
+            "customer_id": ID_DTYPE,
+            "customer_unique_id": ID_DTYPE,
+            "customer_zip_code_prefix": "Int32",
+            "customer_city": "category",
+            "customer_state": "category",
+        },
+        "dates": [],
+    },
+    "olist_geolocation_dataset.csv": {
+        "dtypes": {
+            "geolocation_zip_code_prefix": "Int32",
+            "geolocation_lat": "float64",
+            "geolocation_lng": "float64",
+            "geolocation_city": "category",
+            "geolocation_state": "category",
+        },
+        "dates": [],
+    },
+    "olist_products_dataset.csv": {
+        "dtypes": {
+            "product_id": ID_DTYPE,
+            "product_category_name": "category",
+            "product_name_lenght": "float64",
+            "product_description_lenght": "float64",
+            "product_photos_qty": "float64",
+            "product_weight_g": "float64",
+            "product_length_cm": "float64",
+            "product_height_cm": "float64",
+            "product_width_cm": "float64",
+        },
+        "dates": [],
+    },
+    "olist_sellers_dataset.csv": {
+        "dtypes": {
+            "seller_id": ID_DTYPE,
+            "seller_zip_code_prefix": "Int32",
+            "seller_city": "category",
+            "seller_state": "category",
+        },
+        "dates": [],
+    },
+    "product_category_name_translation.csv": {
+        "dtypes": {
+            "product_category_name": "category",
+            "product_category_name_english": "category",
+        },
+        "dates": [],
+    },
+}
+
+
+def _read_options(file_name: str, columns=None, categories: bool = True):
+    schema = SCHEMAS.get(file_name, {"dtypes": {}, "dates": []})
+    dtypes = schema["dtypes"]
+    dates = schema["dates"]
+    if columns is not None:
+        columns = list(columns)
+        dtypes = {c: t for c, t in dtypes.items() if c in columns}
+        dates = [c for c in dates if c in columns]
+    if not categories:
+        # Categorias inferidas bloco a bloco não seriam compatíveis entre blocos
+        dtypes = {c: (TEXT_DTYPE if t == "category" else t) for c, t in dtypes.items()}
+    return columns, dtypes, dates
+
+
+def read_table(file_path: str, file_name: str, columns=None) -> pd.DataFrame:
+    """
+    Lê um CSV da Olist aplicando o schema registrado para o arquivo.
+
+    Parâmetros:
+    - file_path: caminho completo do CSV
+    - file_name: nome do arquivo (chave em SCHEMAS)
+    - columns: lista opcional de colunas; apenas essas são lidas do CSV
+
+    Retorna:
+    - DataFrame com dtypes, categorias e datas já convertidos
+    """
+    columns, dtypes, dates = _read_options(file_name, columns)
+    df = pd.read_csv(file_path, usecols=columns, dtype=dtypes)
+    for c in dates:
+        df[c] = pd.to_datetime(df[c], errors="coerce")
+    return df
+
+
+def read_table_chunks(file_path: str, file_name: str, columns=None, chunksize: int = 200_000):
+    """
+    Lê um CSV da Olist em blocos de chunksize linhas, com o mesmo schema de read_table
+    (exceto colunas 'category', lidas como texto para manter o mesmo dtype em todos os blocos).
+
+    Retorna:
+    - iterador de DataFrames
+    """
+    columns, dtypes, dates = _read_options(file_name, columns, categories=False)
+    for chunk in pd.read_csv(file_path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+        for c in dates:
+            chunk[c] = pd.to_datetime(chunk[c], errors="coerce")
+        yield chunk
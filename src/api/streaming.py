@@ -0,0 +1,176 @@
+import math
+import os
+import shutil
+import tempfile
+import pandas as pd
+from .data_loader import CACHE_DIR, dataset_path, load_dataset
+from .schemas import read_table_chunks
+from .order_facts import aggregate_payments, aggregate_tickets
+from .incremental import AGGREGATES, WATERMARK_COLUMN, IncrementalAggregate
+
+# Linhas lidas do CSV por bloco (OLIST_CHUNK_ROWS)
+CHUNK_ROWS = int(os.environ.get("OLIST_CHUNK_ROWS", "200000"))
+
+# Tamanho aproximado de cada partição por order_id (bytes de CSV por partição)
+PARTITION_BYTES = int(os.environ.get("OLIST_PARTITION_BYTES", str(64 * 1024 * 1024)))
+
+# Agregações que precisam de todos os valores do grupo (sem estatística parcial mesclável)
+HOLISTIC = {"nunique", "median"}
+
+ITEMS_FILE = "olist_order_items_dataset.csv"
+ORDERS_FILE = "olist_orders_dataset.csv"
+PAYMENTS_FILE = "olist_order_payments_dataset.csv"
+
+
+def iter_chunks(file_name: str, columns=None, where=None, chunksize: int = None):
+    """
+    Lê um CSV do dataset em blocos, sem materializar o arquivo inteiro.
+
+    Parâmetros:
+    - file_name: nome do CSV
+    - columns: colunas lidas (projeção aplicada já na leitura)
+    - where: função opcional bloco -> máscara booleana, aplicada antes de qualquer junção
+    - chunksize: linhas por bloco (padrão: CHUNK_ROWS)
+
+    Retorna:
+    - iterador de DataFrames
+    """
+    file_path = os.path.join(dataset_path(), file_name)
+    for chunk in read_table_chunks(file_path, file_name, columns, chunksize or CHUNK_ROWS):
+        if where is not None:
+            chunk = chunk[where(chunk)]
+        if not chunk.empty:
+            yield chunk
+
+
+def _n_partitions(file_names) -> int:
+    size = sum(os.path.getsize(os.path.join(dataset_path(), f)) for f in file_names)
+    return max(1, math.ceil(size / PARTITION_BYTES))
+
+
+def _partition(chunks, keys, directory: str, stem: str, n_partitions: int):
+    # Espalha as linhas dos blocos em n_partitions partições pelo hash das chaves; cada bloco vira
+    # um arquivo Feather por partição, de forma que nunca há mais de um bloco em memória
+    for i, chunk in enumerate(chunks):
+        part = pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy() % n_partitions
+        for p, piece in chunk.groupby(part):
+            piece.reset_index(drop=True).to_feather(os.path.join(directory, f"{stem}-{p}-{i}.feather"))
+
+
+def _read_partition(stem: str, directory: str, p: int, columns) -> pd.DataFrame:
+    files = sorted(f for f in os.listdir(directory) if f.startswith(f"{stem}-{p}-"))
+    if not files:
+        return pd.DataFrame(columns=columns)
+    return pd.concat([pd.read_feather(os.path.join(directory, f)) for f in files], ignore_index=True)
+
+
+def _order_partitions(tables: dict, chunksize: int = None, n_partitions: int = None):
+    # Particiona as tabelas no nível de pedido por order_id e devolve, partição a partição,
+    # as tabelas correspondentes; todas as linhas de um pedido ficam na mesma partição
+    n_partitions = n_partitions or _n_partitions(tables)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix="partitions-", dir=CACHE_DIR)
+    try:
+        for file_name, columns in tables.items():
+            stem = os.path.splitext(file_name)[0]
+            _partition(iter_chunks(file_name, columns, chunksize=chunksize), ["order_id"], directory, stem, n_partitions)
+        for p in range(n_partitions):
+            yield {f: _read_partition(os.path.splitext(f)[0], directory, p, columns) for f, columns in tables.items()}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _zip_chunks(chunksize=None, n_partitions=None):
+    customers = load_dataset("olist_customers_dataset.csv", columns=["customer_id", "customer_zip_code_prefix"])
+    tables = {
+        ORDERS_FILE: ["order_id", "customer_id", WATERMARK_COLUMN, "order_delivered_customer_date"],
+        ITEMS_FILE: ["order_id", "price", "freight_value"],
+    }
+    for part in _order_partitions(tables, chunksize, n_partitions):
+        df = part[ORDERS_FILE].merge(customers, on="customer_id", how="left")
+        df = df.merge(aggregate_tickets(part[ITEMS_FILE]), on="order_id", how="left")
+        df["delivery_time_days"] = (df["order_delivered_customer_date"] - df[WATERMARK_COLUMN]).dt.days
+        yield df
+
+
+def _ltv_chunks(chunksize=None, n_partitions=None):
+    tables = {
+        ORDERS_FILE: ["order_id", "customer_id", WATERMARK_COLUMN],
+        PAYMENTS_FILE: ["order_id", "payment_installments", "payment_value"],
+    }
+    for part in _order_partitions(tables, chunksize, n_partitions):
+        # Junção interna = filtro payment_count > 0 do caminho em memória
+        yield part[ORDERS_FILE].merge(aggregate_payments(part[PAYMENTS_FILE]), on="order_id", how="inner")
+
+
+def _category_chunks(chunksize=None, n_partitions=None):
+    products = load_dataset("olist_products_dataset.csv", columns=[
+        "product_id", "product_category_name",
+        "product_weight_g", "product_length_cm", "product_height_cm", "product_width_cm"
+    ])
+    for chunk in iter_chunks(ITEMS_FILE, ["order_id", "product_id", "price", "freight_value"], chunksize=chunksize):
+        chunk["price"] = pd.to_numeric(chunk["price"], errors="coerce").fillna(0)
+        chunk["freight_value"] = pd.to_numeric(chunk["freight_value"], errors="coerce").fillna(0)
+        yield chunk.merge(products, on="product_id", how="left")
+
+
+def _seller_chunks(chunksize=None, n_partitions=None):
+    sellers = load_dataset("olist_sellers_dataset.csv", columns=["seller_id", "seller_state"])
+    for chunk in iter_chunks(ITEMS_FILE, ["order_id", "seller_id", "price", "freight_value"], chunksize=chunksize):
+        yield chunk.merge(sellers, on="seller_id", how="left")
+
+
+# Fontes em blocos equivalentes às fontes em memória de AGGREGATES (src/api/incremental.py)
+CHUNK_SOURCES = {
+    "zip_summary": _zip_chunks,
+    "ltv_by_customer": _ltv_chunks,
+    "category_summary": _category_chunks,
+    "category_product_summary": _category_chunks,
+    "seller_state_summary": _seller_chunks,
+    "seller_items": _seller_chunks,
+}
+
+
+def chunked_aggregate(name: str, chunksize: int = None, n_partitions: int = None) -> pd.DataFrame:
+    """
+    Calcula um agregado registrado em AGGREGATES lendo os CSVs em blocos: projeção e filtros são
+    aplicados na leitura, apenas tabelas de dimensão pequenas (produtos, vendedores, clientes)
+    ficam inteiras em memória e as junções entre pedidos, itens e pagamentos são feitas
+    partição a partição (hash de order_id).
+
+    Agregados só com estatísticas mescláveis (soma, contagem, média, mínimo...) são combinados
+    bloco a bloco com IncrementalAggregate, com estado do tamanho do número de grupos. Com
+    nunique ou median, que precisam de todos os valores do grupo, as linhas projetadas são
+    espalhadas em partições pelo hash das chaves de agrupamento e cada partição é agregada
+    por inteiro: a memória fica limitada ao tamanho de uma partição. Nos dois casos o
+    resultado é o mesmo do caminho em memória.
+
+    Parâmetros:
+    - name: nome do agregado (ex: 'category_summary')
+    - chunksize: linhas por bloco (padrão: CHUNK_ROWS)
+    - n_partitions: partições por order_id e por grupo (padrão: tamanho dos CSVs / PARTITION_BYTES)
+
+    Retorna:
+    - DataFrame no mesmo formato de refresh_aggregate(name)
+    """
+    _, keys, aggs = AGGREGATES[name]
+    chunks = CHUNK_SOURCES[name](chunksize=chunksize, n_partitions=n_partitions)
+    if not any(func in HOLISTIC for _, func in aggs.values()):
+        state = IncrementalAggregate(name, keys, aggs, quantile_accuracy=None)
+        for chunk in chunks:
+            state.fold(chunk)
+        return state.result()
+
+    columns = list(dict.fromkeys(keys + [column for column, _ in aggs.values()]))
+    n_partitions = n_partitions or _n_partitions([ORDERS_FILE, ITEMS_FILE, PAYMENTS_FILE])
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix="groups-", dir=CACHE_DIR)
+    try:
+        _partition((c[columns].dropna(subset=keys) for c in chunks), keys, directory, "groups", n_partitions)
+        parts = (_read_partition("groups", directory, p, columns) for p in range(n_partitions))
+        parts = [part.groupby(keys, observed=True).agg(**aggs).reset_index() for part in parts if not part.empty]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if not parts:
+        return pd.DataFrame(columns=keys + list(aggs))
+    return pd.concat(parts, ignore_index=True).sort_values(keys, ignore_index=True)
@@ -1,71 +1,80 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+from ..api.artifacts import cached_artifacts
 from ..api.data_loader import load_dataset
+from ..api.engine import DEFAULT_ENGINE, run_plan
+from ..api.plans import seller_state_summary
+from ..api.profiling import etapa, perfilado
+from ..rendering import render_pages
 import os
 
 plots_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'plots', 'customers_order_and_sellers')
-os.makedirs(plots_path, exist_ok=True)
-
-customers = load_dataset('olist_customers_dataset.csv')
-sellers = load_dataset('olist_sellers_dataset.csv')
-order_items = load_dataset('olist_order_items_dataset.csv')
-
-customer_state = customers['customer_state'].value_counts(normalize=True) * 100
-seller_state = sellers['seller_state'].value_counts(normalize=True) * 100
-
-merged = pd.merge(order_items, sellers, on='seller_id')
-avg_by_state = merged.groupby('seller_state')[['price', 'freight_value']].mean()
-
-top_sellers = order_items.groupby('seller_id').size().sort_values(ascending=False).head(10)
-top_locations = pd.merge(top_sellers.reset_index(name='items_sold'), sellers, on='seller_id')
-
-print("\n## Top 10 Vendedores por Itens Vendidos (Volume)")
-print("----------------------------------------------------------------------")
-print(top_sellers.to_string(header=['Itens Vendidos']))
-print("----------------------------------------------------------------------")
-
-top_locations['seller_label'] = top_locations['seller_id'].str[:6] + '... (' + top_locations['seller_city'].str.title() + '/' + top_locations['seller_state'] + ')'
-top_locations_sorted = top_locations.sort_values('items_sold', ascending=True)
-
-freight_by_state = merged.groupby('seller_state')['freight_value'].mean()
-
-with PdfPages(os.path.join(plots_path, 'relatorio_olist_completo.pdf')) as pdf:
-    
-    plt.figure(figsize=(10,6))
-    customer_state.plot(kind='bar', color='blue')
-    plt.title('Distribuição de Clientes por Estado (%)')
-    plt.ylabel('% do Total')
-    plt.tight_layout()
-    pdf.savefig(); plt.close()
-
-    plt.figure(figsize=(10,6))
-    seller_state.plot(kind='bar', color='green')
-    plt.title('Distribuição de Vendedores por Estado (%)')
-    plt.ylabel('% do Total')
-    plt.tight_layout()
-    pdf.savefig(); plt.close()
-
-    plt.figure(figsize=(10,6))
-    avg_by_state['price'].plot(kind='bar', color='orange')
-    plt.title('Preço Médio por Estado de Vendedor')
-    plt.ylabel('Valor (R$)')
-    plt.tight_layout()
-    pdf.savefig(); plt.close()
-
-    plt.figure(figsize=(10,6))
-    freight_by_state.plot(kind='bar', color='red')
-    plt.title('Frete Médio por Estado de Vendedor')
-    plt.ylabel('Valor do Frete (R$)')
-    plt.tight_layout()
-    pdf.savefig(); plt.close()
-
-    plt.figure(figsize=(12,8))
-    plt.barh(top_locations_sorted['seller_label'], top_locations_sorted['items_sold'], color='purple')
-    plt.title('Top 10 Vendedores por Quantidade de Itens Vendidos (c/ Localização)')
-    plt.xlabel('Quantidade de Vendas')
-    plt.tight_layout()
-    pdf.savefig()
-    plt.close()
-
-print("Relatório gerado")
\ No newline at end of file
+
+# Funções executadas pelo relatório completo (src/report_runner.py)
+ANALISES = ["relatorio_vendedores"]
+
+
+def _barras(ax, dados):
+    series, color, title, ylabel = dados
+    series.plot(kind='bar', color=color, ax=ax)
+    ax.set_title(title)
+    ax.set_ylabel(ylabel)
+
+
+def _top_vendedores(ax, top_locations_sorted):
+    ax.barh(top_locations_sorted['seller_label'], top_locations_sorted['items_sold'], color='purple')
+    ax.set_title('Top 10 Vendedores por Quantidade de Itens Vendidos (c/ Localização)')
+    ax.set_xlabel('Quantidade de Vendas')
+
+
+@cached_artifacts(
+    outputs=[os.path.join(plots_path, 'relatorio_olist_completo.pdf')],
+    inputs=['olist_customers_dataset.csv', 'olist_sellers_dataset.csv', 'olist_order_items_dataset.csv'],
+    code=[_barras, _top_vendedores, "src.api.data_loader", "src.api.schemas", "src.api.engine", "src.api.plans",
+          "src.rendering"]
+)
+@perfilado()
+def relatorio_vendedores():
+    """
+    Relatório em PDF de clientes e vendedores: distribuição de clientes e vendedores por estado,
+    preço e frete médios por estado do vendedor e os 10 vendedores com mais itens vendidos.
+    """
+    customers = load_dataset('olist_customers_dataset.csv', columns=['customer_id', 'customer_state'])
+    sellers = load_dataset('olist_sellers_dataset.csv', columns=['seller_id', 'seller_city', 'seller_state'])
+    order_items = load_dataset('olist_order_items_dataset.csv', columns=['order_id', 'seller_id', 'price', 'freight_value'])
+
+    customer_state = customers['customer_state'].value_counts(normalize=True) * 100
+    seller_state = sellers['seller_state'].value_counts(normalize=True) * 100
+
+    # Preço e frete médios por estado do vendedor, no engine de OLIST_ENGINE (pandas, polars ou duckdb)
+    avg_by_state = run_plan(seller_state_summary(), DEFAULT_ENGINE).set_index('seller_state')[['price', 'freight_value']]
+
+    top_sellers = order_items.groupby('seller_id').size().sort_values(ascending=False).head(10)
+    top_locations = pd.merge(top_sellers.reset_index(name='items_sold'), sellers, on='seller_id')
+
+    print("\n## Top 10 Vendedores por Itens Vendidos (Volume)")
+    print("----------------------------------------------------------------------")
+    print(top_sellers.to_string(header=['Itens Vendidos']))
+    print("----------------------------------------------------------------------")
+
+    top_locations['seller_label'] = top_locations['seller_id'].str[:6] + '... (' + top_locations['seller_city'].astype(str).str.title() + '/' + top_locations['seller_state'].astype(str) + ')'
+    top_locations_sorted = top_locations.sort_values('items_sold', ascending=True)
+
+    freight_by_state = avg_by_state['freight_value']
+
+    # Uma página por gráfico, desenhada a partir dos agregados acima (PDF vetorial)
+    pages = [
+        (_barras, (customer_state, 'blue', 'Distribuição de Clientes por Estado (%)', '% do Total'), (10,6)),
+        (_barras, (seller_state, 'green', 'Distribuição de Vendedores por Estado (%)', '% do Total'), (10,6)),
+        (_barras, (avg_by_state['price'], 'orange', 'Preço Médio por Estado de Vendedor', 'Valor (R$)'), (10,6)),
+        (_barras, (freight_by_state, 'red', 'Frete Médio por Estado de Vendedor', 'Valor do Frete (R$)'), (10,6)),
+        (_top_vendedores, top_locations_sorted, (12,8)),
+    ]
+    os.makedirs(plots_path, exist_ok=True)
+    with etapa("relatorio_vendedores.renderizar"):
+        render_pages(pages, os.path.join(plots_path, 'relatorio_olist_completo.pdf'))
+
+    print("Relatório gerado")
+
+
+if __name__ == "__main__":
+    relatorio_vendedores()
@@ -0,0 +1,128 @@
+import os
+import numpy as np
+import pandas as pd
+from ..api.artifacts import cached_artifacts
+from ..api.profiling import etapa, perfilado
+from ..api.order_facts import SOURCES, load_item_facts
+from ..api.geolocation import GEOLOCATION_FILE, haversine_km, load_zip_centroids
+from ..rendering import pyplot, seaborn
+
+plots_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'plots', 'frete-distance-insights')
+
+# Faixas de distância (km) das curvas de frete
+DISTANCE_BINS = [0, 50, 100, 200, 400, 800, 1200, 1600, 2000, 2500, 3000, 4000, np.inf]
+
+# Distância mínima para calcular frete/km de um item (mesmo prefixo de CEP => distância ~0)
+MIN_DISTANCE_KM = 1.0
+
+# Funções executadas pelo relatório completo (src/report_runner.py)
+ANALISES = ["frete_por_km"]
+
+
+def distancias_itens() -> pd.DataFrame:
+    """
+    Distância vendedor -> cliente de cada item de pedido.
+
+    Usa os centroides por prefixo de CEP (src/api/geolocation.py) para vendedor e cliente e
+    calcula a distância de grande círculo de todos os itens em uma única passada vetorizada.
+    O frete recebe a mesma limpeza de margem_latente_categorias (não numérico/ausente = 0).
+
+    Retorna:
+    - DataFrame com uma linha por item: estados, categoria, frete, distance_km e freight_per_km
+      (NaN quando algum dos CEPs não tem geolocalização ou a distância é menor que MIN_DISTANCE_KM)
+    """
+    df = load_item_facts(columns=[
+        "order_id", "order_item_id", "product_category_name", "price", "freight_value",
+        "seller_state", "seller_zip_code_prefix", "customer_state", "customer_zip_code_prefix"
+    ])
+    df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0)
+    df["freight_value"] = pd.to_numeric(df["freight_value"], errors="coerce").fillna(0)
+
+    centroids = load_zip_centroids()
+    with etapa("frete_por_km.distancias", rows_in=df):
+        seller_lat, seller_lng = centroids.lookup(df["seller_zip_code_prefix"].to_numpy())
+        customer_lat, customer_lng = centroids.lookup(df["customer_zip_code_prefix"].to_numpy())
+        distance = haversine_km(seller_lat, seller_lng, customer_lat, customer_lng)
+
+    df["distance_km"] = distance
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["freight_per_km"] = np.where(distance >= MIN_DISTANCE_KM, df["freight_value"].to_numpy() / distance, np.nan)
+    return df
+
+
+def _resumo(df: pd.DataFrame, keys) -> pd.DataFrame:
+    # frete/km agregado como razão de somas (robusto a itens muito próximos)
+    valid = df[df["distance_km"] >= MIN_DISTANCE_KM]
+    out = valid.groupby(keys, observed=True).agg(
+        itens=("freight_value", "size"),
+        distancia_media_km=("distance_km", "mean"),
+        frete_medio=("freight_value", "mean"),
+        frete_mediano=("freight_value", "median"),
+        frete_total=("freight_value", "sum"),
+        distancia_total_km=("distance_km", "sum"),
+        frete_por_km_mediano=("freight_per_km", "median")
+    )
+    out["frete_por_km"] = out["frete_total"] / out["distancia_total_km"]
+    return out.drop(columns=["frete_total", "distancia_total_km"]).reset_index()
+
+
+@cached_artifacts(
+    outputs=[os.path.join(plots_path, f) for f in [
+        "frete_por_km_faixas.csv", "frete_por_km_estados.csv", "frete_por_km_categorias.csv", "frete_por_km.png"
+    ]],
+    inputs=SOURCES + [GEOLOCATION_FILE],
+    code=[distancias_itens, _resumo, "src.api.data_loader", "src.api.schemas", "src.api.keys", "src.api.order_facts",
+          "src.api.geolocation", "src.rendering"]
+)
+@perfilado()
+def frete_por_km(min_itens: int = 30) -> dict:
+    """
+    Curvas de frete x distância:
+      - geral, por faixa de distância
+      - por par de estados (vendedor -> cliente) e faixa de distância
+      - por categoria de produto e faixa de distância
+    Saídas:
+      - CSVs frete_por_km_faixas.csv, frete_por_km_estados.csv e frete_por_km_categorias.csv
+      - Gráfico com a curva de frete médio por distância dos pares de estados com mais itens
+    Retorna:
+      - dicionário com os DataFrames 'faixas', 'estados' e 'categorias'
+    """
+    os.makedirs(plots_path, exist_ok=True)
+    df = distancias_itens()
+    df = df[df["distance_km"].notna()].copy()
+    df["faixa_km"] = pd.cut(df["distance_km"], DISTANCE_BINS, right=False)
+    df["par_estados"] = df["seller_state"].astype(str) + "->" + df["customer_state"].astype(str)
+
+    with etapa("frete_por_km.agregar", rows_in=df):
+        faixas = _resumo(df, ["faixa_km"])
+        estados = _resumo(df, ["par_estados", "faixa_km"])
+        estados = estados[estados["itens"] >= min_itens]
+        categorias = _resumo(df, ["product_category_name", "faixa_km"])
+        categorias = categorias[categorias["itens"] >= min_itens]
+
+    faixas.to_csv(os.path.join(plots_path, "frete_por_km_faixas.csv"), index=False)
+    estados.to_csv(os.path.join(plots_path, "frete_por_km_estados.csv"), index=False)
+    categorias.to_csv(os.path.join(plots_path, "frete_por_km_categorias.csv"), index=False)
+
+    top_pares = df["par_estados"].value_counts().head(6).index
+    curva = estados[estados["par_estados"].isin(top_pares)].copy()
+    curva["distancia_media_km"] = curva["distancia_media_km"].round()
+
+    plt, sns = pyplot(), seaborn()
+    plt.figure(figsize=(12,7))
+    sns.lineplot(data=curva, x="distancia_media_km", y="frete_medio", hue="par_estados", marker="o")
+    plt.plot(faixas["distancia_media_km"], faixas["frete_medio"], color="black", linestyle="--", label="Geral")
+    plt.title("Frete médio x distância vendedor → cliente (pares de estados com mais itens)")
+    plt.xlabel("Distância média da faixa (km)")
+    plt.ylabel("Frete médio (R$)")
+    plt.legend(title="Vendedor → Cliente")
+    plt.tight_layout()
+    with etapa("savefig", arquivo="frete_por_km.png"):
+        plt.savefig(os.path.join(plots_path, "frete_por_km.png"))
+    plt.close()
+    print("✅ Gráfico 'frete_por_km' e CSVs salvos.")
+    return {"faixas": faixas, "estados": estados, "categorias": categorias}
+
+
+if __name__ == "__main__":
+    frete_por_km()
@@ -0,0 +1,143 @@
+import os
+
+# Modo batch (padrão): backend Agg, sem janelas, direto para arquivo. OLIST_INTERACTIVE=1 mantém o
+# backend padrão do matplotlib (ex: para explorar os gráficos no notebook ou no console).
+BATCH = os.environ.get("OLIST_INTERACTIVE", "0") != "1"
+
+
+def pyplot():
+    """
+    matplotlib.pyplot, importado só na primeira renderização (a importação custa ~0,4s).
+    Em modo batch o backend Agg é forçado antes da importação.
+    """
+    import matplotlib
+    if BATCH:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def seaborn(style: str = None):
+    """
+    seaborn, importado só na primeira renderização (a importação custa ~1s, por causa do scipy).
+
+    Parâmetros:
+    - style: estilo aplicado com sns.set (ex: 'whitegrid'); None mantém o atual
+    """
+    pyplot()
+    import seaborn as sns
+    if style is not None:
+        sns.set(style=style)
+    return sns
+
+
+def _init_worker():
+    # Processos de renderização nunca abrem janelas
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render(draw, data, path: str, figsize=(10, 6), **savefig_kwargs) -> str:
+    """
+    Renderiza um gráfico a partir de dados já agregados.
+
+    Parâmetros:
+    - draw: função draw(ax, data) que desenha no eixo recebido (definida no nível do módulo,
+      para poder ser enviada a outro processo)
+    - data: agregados usados pelo gráfico (pequenos; nada de tabelas fato)
+    - path: arquivo de saída; o formato vem da extensão (.png, .svg ou .pdf, vetoriais sem perda)
+    - figsize: tamanho da figura em polegadas
+
+    Retorna:
+    - path
+    """
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=figsize)
+    try:
+        draw(ax, data)
+        fig.tight_layout()
+        fig.savefig(path, **savefig_kwargs)
+    finally:
+        plt.close(fig)
+    return path
+
+
+def _render_job(job: dict) -> str:
+    return render(job["draw"], job["data"], job["path"], job.get("figsize", (10, 6)))
+
+
+def render_parallel(jobs, workers: int = None) -> list:
+    """
+    Renderiza gráficos independentes em paralelo, um por processo do pool.
+
+    Parâmetros:
+    - jobs: lista de dicionários {"draw", "data", "path", "figsize"} (argumentos de render)
+    - workers: número de processos (padrão: um por gráfico, até o número de CPUs);
+      com 1 processo, ou um único gráfico, tudo roda no processo atual
+
+    Retorna:
+    - lista com os caminhos gerados, na ordem de jobs
+    """
+    jobs = list(jobs)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [_render_job(job) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(_render_job, jobs))
+
+
+def compose(panels, paths, nrows: int, ncols: int, figsize, title: str = None, **savefig_kwargs) -> list:
+    """
+    Monta um painel (dashboard) desenhando cada gráfico diretamente em um eixo da mesma figura,
+    sem reler imagens do disco. A figura é gravada em todos os formatos pedidos (ex: PNG para
+    visualização rápida e PDF/SVG vetorial).
+
+    Parâmetros:
+    - panels: lista de (draw, data), na ordem dos eixos (linha a linha)
+    - paths: arquivos de saída da mesma figura
+    - nrows, ncols: grade de eixos
+    - figsize: tamanho da figura em polegadas
+    - title: título geral do painel
+
+    Retorna:
+    - paths
+    """
+    plt = pyplot()
+    fig, axs = plt.subplots(nrows, ncols, figsize=figsize)
+    try:
+        for ax, (draw, data) in zip(axs.flat, panels):
+            draw(ax, data)
+        if title:
+            fig.suptitle(title, fontsize=20, fontweight="bold")
+        fig.tight_layout()
+        for path in paths:
+            fig.savefig(path, **savefig_kwargs)
+    finally:
+        plt.close(fig)
+    return list(paths)
+
+
+def render_pages(pages, path: str, **savefig_kwargs) -> str:
+    """
+    Grava um PDF de várias páginas (vetorial), uma página por gráfico.
+
+    Parâmetros:
+    - pages: lista de (draw, data, figsize), com draw(ax, data) como em render
+    - path: arquivo PDF de saída
+
+    Retorna:
+    - path
+    """
+    plt = pyplot()
+    from matplotlib.backends.backend_pdf import PdfPages
+    with PdfPages(path) as pdf:
+        for draw, data, figsize in pages:
+            fig, ax = plt.subplots(figsize=figsize)
+            try:
+                draw(ax, data)
+                fig.tight_layout()
+                pdf.savefig(fig, **savefig_kwargs)
+            finally:
+                plt.close(fig)
+    return path
@@ -0,0 +1,159 @@
+import argparse
+import importlib
+import inspect
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from src.api import profiling
+from src.api.artifacts import CACHED, REBUILT
+
+# Módulos de análise executados pelo relatório completo (caminhos relativos à raiz do projeto)
+REPORT_MODULES = [
+    "frete_vs_compra", "produtos_insights", "src.insights.frete_por_km",
+    "src.insights.customers_order_and_sellers", "src.insights.vendedores",
+]
+
+# Quantidade padrão de processos (OLIST_REPORT_WORKERS ou número de CPUs)
+DEFAULT_WORKERS = int(os.environ.get("OLIST_REPORT_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def descobrir_analises(modules=None) -> dict:
+    """
+    Encontra as funções de análise dos módulos de relatório: as listadas em ANALISES no módulo ou,
+    na ausência dessa lista, as funções públicas definidas no próprio módulo e que podem ser
+    chamadas sem argumentos. Dependências entre elas são declaradas no dicionário DEPENDENCIAS
+    do módulo ({funcao: [funcoes das quais depende]}).
+
+    Retorna:
+    - dicionário {"modulo:funcao": [nós dos quais depende]}
+    """
+    graph = {}
+    for module_name in modules or REPORT_MODULES:
+        module = importlib.import_module(module_name)
+        declared = getattr(module, "DEPENDENCIAS", {})
+        listed = getattr(module, "ANALISES", None)
+        for name, func in inspect.getmembers(module, inspect.isfunction):
+            if listed is not None and name not in listed:
+                continue
+            if name.startswith("_") or func.__module__ != module.__name__:
+                continue
+            params = inspect.signature(func).parameters.values()
+            if any(p.default is p.empty and p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in params):
+                continue
+            graph[f"{module_name}:{name}"] = [f"{module_name}:{dep}" for dep in declared.get(name, [])]
+
+    for node, deps in graph.items():
+        missing = [d for d in deps if d not in graph]
+        if missing:
+            raise ValueError(f"Dependências desconhecidas de {node}: {missing}")
+    return graph
+
+
+def _preparar_entradas():
+    # Gera (uma vez, no processo principal) os snapshots Feather dos CSVs, as tabelas fato e os
+    # centroides de CEP. Os processos de análise apenas os abrem por memory-map, sem receber
+    # DataFrames serializados.
+    from src.api.order_facts import load_item_facts, load_order_facts
+    from src.api.geolocation import load_zip_centroids
+    load_item_facts(columns=["order_id"])
+    load_order_facts(columns=["order_id"])
+    load_zip_centroids()
+
+
+def _iniciar_processo():
+    # Sem janelas nos processos de análise: renderização direto para arquivo
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _executar(node: str):
+    import matplotlib.pyplot as plt
+    module_name, func_name = node.split(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+    # Eventos herdados do processo principal (fork) ou de nós anteriores não são reenviados
+    profiling.clear()
+    start = time.perf_counter()
+    func()
+    plt.close("all")
+    # Apenas o tempo, o estado do cache e os eventos de perfil (com OLIST_PROFILE=1) voltam para
+    # o processo principal; os resultados ficam nos arquivos em plots/
+    return time.perf_counter() - start, getattr(func, "last_status", None) or REBUILT, profiling.events()
+
+
+def executar_relatorio(workers: int = None, modules=None, only=None) -> dict:
+    """
+    Executa as análises em paralelo, respeitando o grafo de dependências: cada nó é enviado ao
+    pool assim que todas as suas dependências terminam.
+
+    Parâmetros:
+    - workers: número de processos (padrão: DEFAULT_WORKERS)
+    - modules: módulos de análise (padrão: REPORT_MODULES)
+    - only: lista opcional de nós ("modulo:funcao" ou só "funcao"); as dependências entram junto
+
+    Retorna:
+    - dicionário {nó: {"status": "ok" | "erro" | "ignorado", "segundos": float,
+      "artefatos": "reconstruído" | "em cache" | "", "erro": str}}
+    """
+    graph = descobrir_analises(modules)
+    if only:
+        wanted = [n for n in graph if n in only or n.split(":")[1] in only]
+        selected = set()
+        while wanted:
+            node = wanted.pop()
+            if node not in selected:
+                selected.add(node)
+                wanted.extend(graph[node])
+        graph = {n: d for n, d in graph.items() if n in selected}
+
+    start = time.perf_counter()
+    _preparar_entradas()
+    print(f"✅ Entradas preparadas em {time.perf_counter() - start:.1f}s.")
+
+    results = {}
+    pending = dict(graph)
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers or DEFAULT_WORKERS, initializer=_iniciar_processo) as pool:
+        while pending or running:
+            # Falhas se propagam até estabilizar: numa cadeia A→B→C com C antes de B em pending,
+            # C só é ignorado na volta seguinte, depois de B
+            failed = True
+            while failed:
+                failed = [node for node, deps in pending.items()
+                          if any(results.get(d, {}).get("status") in ("erro", "ignorado") for d in deps)]
+                for node in failed:
+                    results[node] = {"status": "ignorado", "segundos": 0.0, "artefatos": "", "erro": "dependência falhou"}
+                    del pending[node]
+            for node, deps in list(pending.items()):
+                if all(d in results for d in deps):
+                    running[pool.submit(_executar, node)] = node
+                    del pending[node]
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependências circulares entre: {sorted(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                try:
+                    seconds, artifacts, events = future.result()
+                    profiling.record(events)
+                    results[node] = {"status": "ok", "segundos": seconds, "artefatos": artifacts, "erro": ""}
+                except Exception as exc:
+                    results[node] = {"status": "erro", "segundos": 0.0, "artefatos": "", "erro": repr(exc)}
+
+    for node in graph:
+        r = results[node]
+        print(f"  {r['status']:>8}  {r['artefatos']:>12}  {r['segundos']:6.1f}s  {node} {r['erro']}".rstrip())
+    rebuilt = sum(r["artefatos"] == REBUILT for r in results.values())
+    cached = sum(r["artefatos"] == CACHED for r in results.values())
+    print(f"✅ {rebuilt} análise(s) reconstruída(s), {cached} reaproveitada(s) do cache.")
+    print(f"✅ Relatório concluído em {time.perf_counter() - start:.1f}s.")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa as análises do relatório em paralelo.")
+    parser.add_argument("--workers", type=int, default=None, help="número de processos")
+    parser.add_argument("--only", nargs="*", help="executa apenas estas análises (e suas dependências)")
+    args = parser.parse_args()
+    executar_relatorio(workers=args.workers, only=args.only)
@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pandas as pd
+from src.api.cube import DIMENSIONS, TIME_DIMENSIONS, parse_filters, load_cube
+from src.api.data_loader import load_dataset
+from src.api.engine import DEFAULT_ENGINE, run_plan
+from src.api.geolocation import load_zip_centroids
+from src.api.plans import PLANS
+from src.api.profiling import etapa
+from src.api.reviews_index import GROUPS, load_review_index
+
+# Respostas mantidas no cache LRU do serviço (OLIST_SERVICE_CACHE_SIZE)
+CACHE_SIZE = int(os.environ.get("OLIST_SERVICE_CACHE_SIZE", "256"))
+
+# Endereço padrão do serviço (OLIST_SERVICE_HOST / OLIST_SERVICE_PORT)
+DEFAULT_HOST = os.environ.get("OLIST_SERVICE_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.environ.get("OLIST_SERVICE_PORT", "8050"))
+
+
+class ResultCache:
+    """
+    Cache LRU de respostas já serializadas, compartilhado entre as threads do servidor.
+    """
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"itens": len(self._items), "capacidade": self.size, "acertos": self.hits, "faltas": self.misses}
+
+
+def _params(query: dict, allowed) -> dict:
+    # Parâmetros da query string ({nome: [valores]}); nomes fora de allowed são erro do cliente
+    unknown = sorted(set(query) - set(allowed))
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos: {unknown} (aceitos: {sorted(allowed)})")
+    return {name: ",".join(values) for name, values in query.items()}
+
+
+def _float(params: dict, name: str, default):
+    return float(params[name]) if name in params else default
+
+
+def _int(params: dict, name: str, default):
+    return int(params[name]) if name in params else default
+
+
+def _floats(params: dict, name: str, default):
+    return [float(v) for v in params[name].split(",")] if name in params else default
+
+
+def _top(df: pd.DataFrame, params: dict) -> pd.DataFrame:
+    n = _int(params, "top", None)
+    return df.head(n) if n is not None else df
+
+
+class InsightService:
+    """
+    Serviço de consultas das análises: os agregados de base (por categoria, por cliente, por
+    prefixo de CEP, por vendedor, o cubo de itens e o índice dos comentários das avaliações)
+    são calculados uma única vez na criação e
+    compartilhados, somente leitura, por todas as requisições. Cada requisição executa apenas a
+    parte parametrizada da análise, e a resposta serializada fica no cache LRU, com chave no
+    caminho e nos parâmetros.
+
+    Parâmetros:
+    - engine: engine dos agregados de base ('pandas', 'polars' ou 'duckdb'; padrão: as mesmas
+      agregações das análises sobre as tabelas fato)
+    - cache_size: respostas mantidas no cache
+    """
+
+    def __init__(self, engine: str = None, cache_size: int = CACHE_SIZE):
+        # Importado aqui: frete_vs_compra.py fica na raiz do projeto
+        import frete_vs_compra
+
+        self.analises = frete_vs_compra
+        self.cache = ResultCache(cache_size)
+        start = time.perf_counter()
+        with etapa("servico.carregar"):
+            self.margem = frete_vs_compra.agregados_margem(engine=engine)
+            self.ltv = frete_vs_compra.ltv_por_cliente(engine=engine)
+            self.zips = frete_vs_compra.resumo_zip(engine=engine)
+            load_zip_centroids()
+            self.cube = load_cube()
+            self.avaliacoes = load_review_index()
+            sellers = load_dataset("olist_sellers_dataset.csv", columns=["seller_id", "seller_city", "seller_state"])
+            items = run_plan(PLANS["seller_items"](), engine or DEFAULT_ENGINE)
+            self.vendedores = items.merge(sellers, on="seller_id", how="left").sort_values(
+                "items_sold", ascending=False, kind="stable").reset_index(drop=True)
+        self.carregado_em = time.perf_counter() - start
+
+        self.rotas = {
+            "/saude": (self.saude, []),
+            "/margem_latente": (self.margem_latente, ["cost_ratio", "cenarios", "top"]),
+            "/parcelas_ltv": (self.parcelas_ltv, []),
+            "/micro_mercados": (self.micro_mercados, ["min_pedidos", "top"]),
+            "/vendedores/estados": (self.estados, ["por"] + DIMENSIONS + list(TIME_DIMENSIONS)),
+            "/vendedores/top": (self.top_vendedores, ["seller_state", "top"]),
+            "/avaliacoes/busca": (self.busca_avaliacoes, ["q", "top"]),
+            "/avaliacoes/termos": (self.termos_avaliacoes, ["por", "termos", "q", "top"]),
+        }
+
+    def saude(self, params):
+        return {
+            "status": "ok",
+            "carregado_em_s": round(self.carregado_em, 3),
+            "cache": self.cache.stats(),
+            "rotas": sorted(self.rotas),
+        }
+
+    def margem_latente(self, params):
+        # Mesmos padrões e colunas de margem_latente_categorias (frete_vs_compra.py)
+        scenarios = _floats(params, "cenarios", [0.05, 0.10])
+        cat, prod_agg = self.margem
+        ranking = self.analises.ranking_margem_latente(cat, prod_agg, _float(params, "cost_ratio", 0.6), scenarios)
+        return _top(ranking[self.analises.colunas_ranking(scenarios)], params)
+
+    def parcelas_ltv(self, params):
+        return self.analises.resumo_parcelas_ltv(self.ltv)
+
+    def micro_mercados(self, params):
+        candidates = self.analises.candidatos_micro_mercados(self.zips, _int(params, "min_pedidos", None))
+        return _top(candidates, params)
+
+    def estados(self, params):
+        # Preço/frete médios, pedidos e entrega por estado (ou outra combinação de dimensões) no cubo
+        by = params.pop("por", "seller_state").split(",")
+        return self.cube.query(by, parse_filters(f"{k}={v}" for k, v in params.items()))
+
+    def top_vendedores(self, params):
+        df = self.vendedores
+        if "seller_state" in params:
+            df = df[df["seller_state"].astype(str).isin(params["seller_state"].split(","))]
+        return df.head(_int(params, "top", 10))
+
+    def busca_avaliacoes(self, params):
+        # Avaliações da consulta (termos, "frase", prefixo*, -exclusão) com pedido, vendedor e categoria
+        if not params.get("q"):
+            raise ValueError("Informe a consulta em q (ex: q=\"nao recebi\")")
+        return self.avaliacoes.reviews(params["q"], _int(params, "top", 50))
+
+    def termos_avaliacoes(self, params):
+        # Frequência de termos por grupo, opcionalmente só nas avaliações da consulta q
+        by = params.get("por", "seller_state")
+        if by not in GROUPS:
+            raise ValueError(f"Dimensão desconhecida: '{by}' (disponíveis: {GROUPS})")
+        docs = self.avaliacoes.search(params["q"]) if params.get("q") else None
+        terms = params["termos"].split(",") if params.get("termos") else None
+        result = self.avaliacoes.term_frequencies(by, terms, docs)
+        return _top(result.sort_values("occurrences", ascending=False, kind="stable"), params)
+
+    def responder(self, url: str) -> tuple:
+        """
+        Resposta de uma requisição GET.
+
+        Parâmetros:
+        - url: caminho com a query string (ex: '/margem_latente?cost_ratio=0.55&top=10')
+
+        Retorna:
+        - (status HTTP, corpo JSON em bytes)
+        """
+        parts = urlsplit(url)
+        path = parts.path.rstrip("/") or "/"
+        if path not in self.rotas:
+            return 404, _json({"erro": f"Rota desconhecida: {path}", "rotas": sorted(self.rotas)})
+        handler, allowed = self.rotas[path]
+        query = parse_qs(parts.query, keep_blank_values=True)
+        try:
+            params = _params(query, allowed)
+        except ValueError as exc:
+            return 400, _json({"erro": str(exc)})
+        if handler == self.saude:
+            return 200, _json(handler(params))
+
+        key = (path, tuple(sorted(params.items())))
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body
+        try:
+            with etapa(f"servico{path}", **params) as e:
+                result = e.saida(handler(dict(params)))
+        except (ValueError, KeyError, TypeError) as exc:
+            return 400, _json({"erro": f"{type(exc).__name__}: {exc}"})
+        body = _records(path, params, result)
+        self.cache.put(key, body)
+        return 200, body
+
+
+def _json(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False).encode()
+
+
+def _records(path: str, params: dict, df: pd.DataFrame) -> bytes:
+    # Serializado uma única vez (o cache guarda os bytes): NaN vira null e datas, ISO 8601
+    dados = df.to_json(orient="records", date_format="iso", force_ascii=False)
+    head = json.dumps({"rota": path, "parametros": params, "linhas": len(df)}, ensure_ascii=False)
+    return f"{head[:-1]}, \"dados\": {dados}}}".encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+    verbose = False
+
+    def do_GET(self):
+        status, body = self.service.responder(self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    # Fila de conexões maior que o padrão (5): vários painéis consultando ao mesmo tempo não
+    # esperam a retransmissão do SYN
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def criar_servidor(service: InsightService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, verbose: bool = False):
+    """
+    Servidor HTTP (biblioteca padrão, uma thread por requisição) para um InsightService.
+    As requisições rodam em paralelo sobre os mesmos agregados carregados, sem recarregar dados.
+    """
+    handler = type("Handler", (_Handler,), {"service": service, "verbose": verbose})
+    return _Server((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON local com as consultas das análises.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--porta", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--engine", default=None, help="engine dos agregados de base (pandas, polars ou duckdb)")
+    parser.add_argument("--cache", type=int, default=CACHE_SIZE, help="respostas mantidas no cache LRU")
+    parser.add_argument("--verbose", action="store_true", help="registra cada requisição")
+    args = parser.parse_args()
+
+    service = InsightService(engine=args.engine, cache_size=args.cache)
+    server = criar_servidor(service, args.host, args.porta, args.verbose)
+    print(f"✅ Agregados carregados em {service.carregado_em:.1f}s.")
+    print(f"✅ Serviço em http://{args.host}:{args.porta} (rotas: {', '.join(sorted(service.rotas))})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
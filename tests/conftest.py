@@ -0,0 +1,35 @@
+"""
+Configuração comum dos testes: cache isolado e um extrato sintético pequeno da Olist.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Snapshots, chaves e estados dos testes ficam fora do cache do usuário; precisa ser definido
+# antes da importação de src (CACHE_DIR é lido na importação)
+if "OLIST_CACHE_DIR" not in os.environ:
+    os.environ["OLIST_CACHE_DIR"] = tempfile.mkdtemp(prefix="olist-testes-")
+    atexit.register(shutil.rmtree, os.environ["OLIST_CACHE_DIR"], True)
+
+from benchmarks.synthetic import generate
+from src.api.data_loader import clear_cache
+
+
+@pytest.fixture(scope="session")
+def synthetic_source(tmp_path_factory):
+    # ~2 mil pedidos, gerados uma vez por sessão
+    return generate(str(tmp_path_factory.mktemp("sintetico")), scale=0.02, seed=1)
+
+
+@pytest.fixture
+def dataset(synthetic_source, tmp_path, monkeypatch):
+    # Cópia gravável do extrato sintético, usada como dataset do processo (OLIST_DATA_DIR)
+    data = tmp_path / "dados"
+    shutil.copytree(synthetic_source, data)
+    monkeypatch.setenv("OLIST_DATA_DIR", str(data))
+    clear_cache()
+    yield str(data)
+    clear_cache()
@@ -0,0 +1,175 @@
+"""
+Regressão das primitivas vetorizadas de src/analytics/aggregations.py contra as versões
+originais das análises (apply linha a linha com seg_install e groupby com lambda x: x.nunique()).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.aggregations import distinct_count, group_summary, segment
+from src.api.order_facts import aggregate_payments, aggregate_tickets
+from frete_vs_compra import INSTALLMENT_BINS, INSTALLMENT_SEGMENTS, resumo_parcelas_ltv
+
+
+def seg_install(x):
+    # Segmentação original de parcelas_e_ltv
+    if x <= 1:
+        return "sem_parcelas"
+    if 1 < x <= 3:
+        return "parcelas_baixas_2_3"
+    if 3 < x <= 6:
+        return "parcelas_medias_4_6"
+    return "parcelas_altas_7_plus"
+
+
+@pytest.fixture
+def olist():
+    # Amostra pequena das tabelas usadas por parcelas_e_ltv e micro_mercados_zip: clientes com
+    # vários pedidos, pedidos com vários pagamentos/itens, pagamentos sem pedido, pedidos sem
+    # item, parcelas e valores ausentes, CEP ausente e datas de entrega ausentes
+    rng = np.random.default_rng(13)
+    n_orders = 400
+    customers = pd.DataFrame({
+        "customer_id": [f"c{i:03d}" for i in range(150)],
+        "customer_zip_code_prefix": pd.array(rng.choice([1001, 1002, 2005, 30100, np.nan], 150), dtype="Int64"),
+    })
+    purchased = pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 600, n_orders), unit="D")
+    delivered = purchased + pd.to_timedelta(rng.integers(1, 40, n_orders), unit="D")
+    orders = pd.DataFrame({
+        "order_id": [f"o{i:04d}" for i in range(n_orders)],
+        "customer_id": rng.choice(customers["customer_id"], n_orders),
+        "order_purchase_timestamp": purchased,
+        "order_delivered_customer_date": delivered.where(rng.random(n_orders) > 0.1),
+    })
+    paid = rng.choice(orders["order_id"].tolist() + ["o_sem_pedido"], 600)
+    payments = pd.DataFrame({
+        "order_id": paid,
+        "payment_installments": rng.choice([0, 1, 2, 3, 4, 6, 8, 10, 24, np.nan], len(paid)),
+        "payment_value": np.where(rng.random(len(paid)) > 0.05, rng.gamma(2, 80, len(paid)).round(2), np.nan),
+    })
+    sold = rng.choice(orders["order_id"][:350], 700)
+    items = pd.DataFrame({
+        "order_id": sold,
+        "price": np.where(rng.random(len(sold)) > 0.05, rng.gamma(2, 60, len(sold)).round(2), np.nan),
+        "freight_value": rng.gamma(2, 10, len(sold)).round(2),
+    })
+    return {"orders": orders, "payments": payments, "items": items, "customers": customers}
+
+
+def test_segment_matches_seg_install_apply():
+    values = pd.Series(np.r_[np.arange(-2, 30, 0.25), np.nan, np.inf, -np.inf, 1, 3, 6])
+    for v in (values, values.round()):
+        expected = v.apply(seg_install)
+        got = segment(v, INSTALLMENT_BINS, INSTALLMENT_SEGMENTS, na_label="parcelas_altas_7_plus")
+        pd.testing.assert_series_equal(got, expected, check_dtype=False)
+
+
+def test_segment_matches_cut():
+    values = pd.Series([-1.0, 0, 0.5, 1, 2, 2.5, 3, np.nan, 10])
+    bins, labels = [0, 1, 2.5, 5], ["a", "b", "c"]
+    for right in (True, False):
+        expected = pd.cut(values, bins, labels=labels, right=right).astype(object)
+        got = segment(values, bins, labels, right=right)
+        pd.testing.assert_series_equal(got, expected, check_dtype=False)
+
+
+def test_segment_rejects_wrong_labels():
+    with pytest.raises(ValueError):
+        segment([1, 2], [0, 1, 2], ["a"])
+
+
+def test_distinct_count_matches_lambda_nunique():
+    df = pd.DataFrame({
+        "key": ["a", "a", "a", "b", "b", None, None, "c", "d"],
+        "value": ["x", "x", "y", None, None, "z", "w", "x", None],
+    })
+    expected = df.groupby("key")["value"].agg(lambda x: x.nunique())
+    # chave ausente fica de fora nos dois; grupo só com valores ausentes conta 0
+    pd.testing.assert_series_equal(distinct_count(df, "key", "value"), expected, check_dtype=False)
+    assert distinct_count(df, "key", "value")["d"] == 0
+
+
+def test_distinct_count_categorical_keys_skip_empty_groups():
+    df = pd.DataFrame({
+        "key": pd.Categorical(["a", "a", "b"], categories=["a", "b", "vazio"]),
+        "value": [1, 2, 2],
+    })
+    expected = df.groupby("key", observed=True)["value"].agg(lambda x: x.nunique())
+    got = distinct_count(df, "key", "value")
+    pd.testing.assert_series_equal(got, expected, check_dtype=False)
+    assert "vazio" not in got.index
+    empty = df.iloc[:0]
+    assert distinct_count(empty, "key", "value").empty
+
+
+def test_group_summary_rejects_python_functions(olist):
+    with pytest.raises(TypeError):
+        group_summary(olist["orders"], "customer_id", {"n": ("order_id", lambda x: x.nunique())})
+
+
+def test_group_summary_nunique_matches_lambda(olist):
+    df = olist["orders"].assign(customer_id=olist["orders"]["customer_id"].where(np.arange(400) % 7 > 0))
+    expected = df.groupby("customer_id").agg(n=("order_id", lambda x: x.nunique())).reset_index()
+    got = group_summary(df, "customer_id", {"n": ("order_id", "nunique")})
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_parcelas_e_ltv_summary_matches_original(olist):
+    orders, payments = olist["orders"], olist["payments"]
+
+    # Versão original: groupby sobre os pagamentos com lambda e apply(seg_install)
+    clean = payments.copy()
+    clean["payment_value"] = pd.to_numeric(clean["payment_value"], errors="coerce").fillna(0)
+    clean["payment_installments"] = pd.to_numeric(clean["payment_installments"], errors="coerce").fillna(1)
+    payments_orders = clean.merge(orders[["order_id", "customer_id"]], on="order_id", how="left")
+    ltv = payments_orders.groupby("customer_id").agg(
+        total_revenue=("payment_value", "sum"),
+        n_orders=("order_id", lambda x: x.nunique()),
+        avg_installments=("payment_installments", "mean"),
+    ).reset_index()
+    ltv["install_segment"] = ltv["avg_installments"].round().apply(seg_install)
+    expected = ltv.groupby("install_segment").agg(
+        clientes=("customer_id", "count"),
+        avg_ltv=("total_revenue", "mean"),
+        median_ltv=("total_revenue", "median"),
+        avg_orders=("n_orders", "mean"),
+    ).reset_index()
+
+    # Versão atual: agregados de pagamento por pedido (tabela fato) e primitivas vetorizadas
+    facts = orders.merge(aggregate_payments(payments), on="order_id", how="inner")
+    ltv_by_customer = group_summary(facts, "customer_id", {
+        "total_revenue": ("payment_value_total", "sum"),
+        "n_orders": ("order_id", "nunique"),
+        "installments_sum": ("payment_installments_sum", "sum"),
+        "payments_count": ("payment_count", "sum"),
+        "max_installments": ("payment_installments_max", "max"),
+    })
+    got = resumo_parcelas_ltv(ltv_by_customer)
+
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_micro_mercados_zip_summary_matches_original(olist):
+    orders, items, customers = olist["orders"], olist["items"], olist["customers"]
+    ticket = aggregate_tickets(items)[["order_id", "order_value"]]
+    orders_ticket = orders.merge(ticket, on="order_id", how="left").merge(customers, on="customer_id", how="left")
+    orders_ticket["delivery_time_days"] = (
+        orders_ticket["order_delivered_customer_date"] - orders_ticket["order_purchase_timestamp"]
+    ).dt.days
+
+    expected = orders_ticket.groupby("customer_zip_code_prefix").agg(
+        pedidos_count=("order_id", "count"),
+        avg_ticket=("order_value", "mean"),
+        median_ticket=("order_value", "median"),
+        avg_delivery_days=("delivery_time_days", "mean"),
+        unique_customers=("customer_id", lambda x: x.nunique()),
+    ).reset_index()
+    got = group_summary(orders_ticket, "customer_zip_code_prefix", {
+        "pedidos_count": ("order_id", "count"),
+        "avg_ticket": ("order_value", "mean"),
+        "median_ticket": ("order_value", "median"),
+        "avg_delivery_days": ("delivery_time_days", "mean"),
+        "unique_customers": ("customer_id", "nunique"),
+    })
+
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
@@ -0,0 +1,63 @@
+"""
+Coortes de src/analytics/cohorts.py contra o cálculo direto em pandas e com entradas vazias.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.cohorts import Cohorts
+
+
+@pytest.fixture
+def purchases():
+    rng = np.random.default_rng(22)
+    n = 2000
+    return pd.DataFrame({
+        "customer": rng.integers(-1, 300, n),
+        "purchased_at": (pd.Timestamp("2017-01-01") + pd.to_timedelta(rng.integers(0, 500, n), unit="D"))
+        .where(rng.random(n) > 0.02),
+        "revenue": rng.gamma(2, 50, n),
+    })
+
+
+def _reference(df):
+    df = df[(df["customer"] >= 0) & df["purchased_at"].notna()].copy()
+    df["month"] = df["purchased_at"].dt.to_period("M")
+    df["cohort"] = df.groupby("customer")["month"].transform("min")
+    df["period"] = (df["month"] - df["cohort"]).apply(lambda offset: offset.n)
+    return df
+
+
+def test_retention_and_revenue_match_pandas(purchases):
+    cohorts = Cohorts(purchases["customer"], purchases["purchased_at"], purchases["revenue"])
+    ref = _reference(purchases)
+
+    active = ref.groupby(["cohort", "period"])["customer"].nunique().unstack(fill_value=0)
+    retention = cohorts.retention(normalize=False)
+    observed = retention.notna()
+    expected = active.reindex(index=retention.index, columns=retention.columns, fill_value=0)
+    np.testing.assert_array_equal(retention.where(observed, 0).to_numpy(), expected.where(observed, 0).to_numpy())
+
+    revenue = ref.groupby(["cohort", "period"])["revenue"].sum().unstack(fill_value=0)
+    revenue = revenue.reindex(index=retention.index, columns=retention.columns, fill_value=0)
+    curve = cohorts.revenue_curve(cumulative=False, per_customer=False)
+    np.testing.assert_allclose(curve.where(observed, 0).to_numpy(), revenue.where(observed, 0).to_numpy())
+
+    summary = cohorts.summary()
+    sizes = ref.groupby("cohort")["customer"].nunique().reindex(summary.index, fill_value=0)
+    np.testing.assert_array_equal(summary["customers"].to_numpy(), sizes.to_numpy())
+    assert summary["orders"].sum() == len(ref)
+
+
+@pytest.mark.parametrize("customer, purchased_at", [
+    (np.array([], dtype=np.int32), pd.Series([], dtype="datetime64[ns]")),
+    (np.array([-1, 3]), pd.to_datetime(pd.Series([None, None]))),
+])
+def test_empty_input(customer, purchased_at):
+    cohorts = Cohorts(customer, purchased_at, n_customers=10)
+    assert cohorts.n_cohorts == 0
+    assert cohorts.retention().shape == (0, 0)
+    assert cohorts.revenue_curve().shape == (0, 0)
+    summary = cohorts.summary()
+    assert summary.empty and "repeat_rate_3m" in summary.columns
+    assert cohorts.customer_totals().empty
@@ -0,0 +1,81 @@
+"""
+Caminhos alternativos de execução dos agregados centrais (planos relacionais em pandas, Polars
+e DuckDB, leitura em blocos, atualização incremental e cubo) contra o cálculo em memória das
+análises, sobre um extrato sintético.
+"""
+import pandas as pd
+import pytest
+
+import frete_vs_compra as f
+from src.api.cube import load_cube
+from src.api.data_loader import load_dataset
+from src.api.engine import ENGINES, run_plan
+from src.api.incremental import AGGREGATES, refresh_aggregate
+from src.api.order_facts import ITEMS, SELLERS, load_item_facts
+from src.api.plans import PLANS
+from src.api.streaming import chunked_aggregate
+
+
+def in_memory(name):
+    # Caminho em memória de cada agregado, como nas análises
+    if name in ("category_summary", "category_product_summary"):
+        cat, prod_agg = f._agregados_categoria()
+        return cat if name == "category_summary" else prod_agg
+    if name == "ltv_by_customer":
+        return f.ltv_por_cliente()
+    if name == "zip_summary":
+        return f.resumo_zip()
+    # customers_order_and_sellers.relatorio_vendedores
+    items = load_dataset(ITEMS, columns=["order_id", "seller_id", "price", "freight_value"])
+    if name == "seller_items":
+        return items.groupby("seller_id", observed=True).size().rename("items_sold").reset_index()
+    sellers = load_dataset(SELLERS, columns=["seller_id", "seller_state"])
+    return items.merge(sellers, on="seller_id", how="inner").groupby("seller_state", observed=True).agg(
+        price=("price", "mean"), freight_value=("freight_value", "mean")
+    ).reset_index()
+
+
+def assert_same(got, expected, keys):
+    # Mesmas linhas e valores, independente da ordem das linhas e dos tipos das chaves
+    normalize = lambda df: (df.assign(**{k: df[k].astype(str) for k in keys})
+                            .sort_values(keys).reset_index(drop=True))
+    got = normalize(got)[list(expected.columns)]
+    pd.testing.assert_frame_equal(got, normalize(expected), check_dtype=False, check_categorical=False, rtol=1e-9)
+
+
+def test_registries_match():
+    assert set(PLANS) == set(AGGREGATES)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("name", list(PLANS))
+def test_plan_matches_in_memory(dataset, name, engine):
+    if engine != "pandas":
+        pytest.importorskip(engine)
+    assert_same(run_plan(PLANS[name](), engine), in_memory(name), AGGREGATES[name][1])
+
+
+@pytest.mark.parametrize("name", list(AGGREGATES))
+def test_chunked_matches_in_memory(dataset, name):
+    # Blocos e partições pequenos para exercitar a combinação entre blocos e entre partições
+    assert_same(chunked_aggregate(name, chunksize=300, n_partitions=5), in_memory(name), AGGREGATES[name][1])
+
+
+@pytest.mark.parametrize("name", list(AGGREGATES))
+def test_incremental_matches_in_memory(dataset, name):
+    assert_same(refresh_aggregate(name, rebuild=True), in_memory(name), AGGREGATES[name][1])
+
+
+@pytest.mark.parametrize("by", [["seller_state"], ["product_category_name"], ["customer_state", "seller_state"]])
+def test_cube_matches_item_facts(dataset, by):
+    items = load_item_facts(columns=["order_id", "price", "freight_value", "seller_state", "customer_state",
+                                     "product_category_name"])
+    expected = items.groupby(by, observed=True).agg(
+        items=("order_id", "size"),
+        price_sum=("price", "sum"),
+        freight_sum=("freight_value", "sum"),
+        avg_price=("price", "mean"),
+        avg_freight=("freight_value", "mean"),
+        orders=("order_id", "nunique"),
+    ).reset_index()
+    assert_same(load_cube().query(by), expected, by)
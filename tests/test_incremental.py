@@ -0,0 +1,34 @@
+"""
+Atualização incremental de src/api/incremental.py contra o reprocessamento completo do extrato.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api.incremental import AGGREGATES, WATERMARK_COLUMN, refresh_aggregate
+from src.api.order_facts import ORDERS
+
+
+@pytest.mark.parametrize("name", list(AGGREGATES))
+def test_append_matches_rebuild_with_missing_timestamps(dataset, name):
+    path = os.path.join(dataset, ORDERS)
+    orders = pd.read_csv(path, dtype=str)
+    ts = pd.to_datetime(orders[WATERMARK_COLUMN])
+    cut = ts.quantile(0.6)
+    # Pedidos sem data nos dois extratos: metade já no primeiro, metade só no acrescido
+    untimed = orders.sample(40, random_state=4).index
+    orders.loc[untimed, WATERMARK_COLUMN] = np.nan
+    # Empate na marca d'água: um pedido novo com o mesmo horário do último incorporado
+    last = ts[ts <= cut].idxmax()
+    orders.loc[ts[ts > cut].index[0], WATERMARK_COLUMN] = orders.loc[last, WATERMARK_COLUMN]
+
+    orders[(ts <= cut) & ~orders.index.isin(untimed[20:])].to_csv(path, index=False)
+    refresh_aggregate(name)
+    orders.to_csv(path, index=False)
+    got = refresh_aggregate(name)
+    expected = refresh_aggregate(name, rebuild=True)
+
+    assert not got.empty
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False, rtol=1e-9)
@@ -0,0 +1,82 @@
+"""
+Agendamento do grafo de dependências de src/report_runner.py com módulos de análise de teste.
+"""
+import textwrap
+
+import pytest
+
+from src import report_runner
+
+MODULO = """
+ANALISES = ["x", "y", "z", "base", "derivada", "_privada"]
+DEPENDENCIAS = {{"z": ["x"], "y": ["z"], "derivada": ["base"]}}
+
+def _privada():
+    pass
+
+def x():
+    raise RuntimeError("falhou")
+
+def y():
+    pass
+
+def z():
+    pass
+
+def base():
+    open(r"{saida}", "w").write("base")
+
+def derivada():
+    # Só roda depois de base
+    assert open(r"{saida}").read() == "base"
+
+def com_argumento(valor):
+    pass
+"""
+
+
+@pytest.fixture
+def modulo(tmp_path, monkeypatch):
+    (tmp_path / "analises_teste.py").write_text(textwrap.dedent(MODULO.format(saida=tmp_path / "base.txt")))
+    (tmp_path / "analises_ciclo.py").write_text('ANALISES = ["a", "b"]\nDEPENDENCIAS = {"a": ["b"], "b": ["a"]}\n'
+                                                "def a():\n    pass\n\ndef b():\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # Sem dataset: as entradas compartilhadas não são necessárias aqui
+    monkeypatch.setattr(report_runner, "_preparar_entradas", lambda: None)
+    return "analises_teste"
+
+
+def test_descobrir_analises(modulo):
+    graph = report_runner.descobrir_analises([modulo])
+    assert graph == {
+        "analises_teste:base": [],
+        "analises_teste:derivada": ["analises_teste:base"],
+        "analises_teste:x": [],
+        "analises_teste:y": ["analises_teste:z"],
+        "analises_teste:z": ["analises_teste:x"],
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_falha_transitiva(modulo, workers):
+    # y aparece antes de z no grafo e nada mais está rodando: a falha de x precisa chegar a y
+    # passando por z, sem ser confundida com um ciclo
+    results = report_runner.executar_relatorio(workers=workers, modules=[modulo], only=["y"])
+    status = {node.split(":")[1]: r["status"] for node, r in results.items()}
+    assert status == {"x": "erro", "y": "ignorado", "z": "ignorado"}
+
+
+def test_dependencias_executadas_em_ordem(modulo):
+    results = report_runner.executar_relatorio(workers=2, modules=[modulo])
+    status = {node.split(":")[1]: r["status"] for node, r in results.items()}
+    assert status == {"base": "ok", "derivada": "ok", "x": "erro", "y": "ignorado", "z": "ignorado"}
+
+
+def test_only_inclui_dependencias(modulo):
+    results = report_runner.executar_relatorio(workers=1, modules=[modulo], only=["derivada"])
+    assert sorted(results) == ["analises_teste:base", "analises_teste:derivada"]
+
+
+def test_dependencias_circulares(modulo):
+    with pytest.raises(ValueError, match="circulares"):
+        report_runner.executar_relatorio(workers=1, modules=["analises_ciclo"])